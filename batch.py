@@ -0,0 +1,269 @@
+import argparse
+import csv
+import functools
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from diagnostics import ConservationMonitor
+from parallel_gravity import gravity_for
+from physics import SOFTENING, total_energy
+from sim import PLANET_PRESETS, Simulation, TICK_DT
+from telemetry import TelemetryWriter, tick_record
+
+# Standardvärden för fält som en scenariodefinition kan utelämna
+DEFAULTS = {
+    "seed": 0,
+    "size": [1920, 1080],
+    "duration": 300.0,
+    "softening": SOFTENING,
+    "velocity_scale": 1.0,
+    "stop": ["merged", "escaped", "empty"],
+    "kernel": "python",
+}
+# Bevarandet mäts inte varje tick, potentialen följer med kraftberäkningen de tick det görs
+ENERGY_EVERY = 30
+
+CSV_FIELDS = (
+    "name", "params", "seed", "stop_reason", "ticks", "sim_time",
+    "bodies_start", "bodies_end", "merges", "absorbed", "escaped",
+    "energy_start", "energy_end", "energy_drift", "momentum_drift", "angular_drift",
+    "wall_s", "telemetry", "error",
+)
+
+
+def load_scenarios(path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    scenarios = data["scenarios"] if isinstance(data, dict) else data
+    for i, scenario in enumerate(scenarios):
+        scenario.setdefault("name", f"scenario{i}")
+    return scenarios
+
+
+def expand_sweeps(scenarios):
+    # Varje kombination av svepta värden blir en egen körning
+    runs = []
+    for scenario in scenarios:
+        sweep = scenario.get("sweep") or {}
+        keys = sorted(sweep)
+        for values in itertools.product(*(sweep[k] for k in keys)):
+            run = {k: v for k, v in scenario.items() if k != "sweep"}
+            params = dict(zip(keys, values))
+            for key, value in params.items():
+                if key.startswith("preset_mass."):
+                    presets = run.setdefault("preset_mass", {})
+                    presets[key.split(".", 1)[1]] = value
+                else:
+                    run[key] = value
+            run["params"] = params
+            runs.append(run)
+    return runs
+
+
+def _presets(run):
+    presets = {k: dict(v) for k, v in PLANET_PRESETS.items()}
+    for key, mass in (run.get("preset_mass") or {}).items():
+        presets[int(key)]["mass"] = mass
+    return presets
+
+
+def _setup_commands(run, presets):
+    commands = [tuple(c) for c in run.get("commands", ())]
+    for planet in run.get("planets", ()):
+        p = dict(presets[planet.get("preset", 1)])
+        p.update({k: planet[k] for k in ("mass", "radius", "color") if k in planet})
+        x, y = planet["pos"]
+        vx, vy = planet.get("vel", (0, 0))
+        commands.append(("spawn", x, y, vx, vy, p["mass"], p["radius"], p["color"]))
+    return commands
+
+
+def _body_state(b):
+    return {
+        "name": b.name,
+        "pos": [b.pos.x, b.pos.y],
+        "vel": [b.vel.x, b.vel.y],
+        "mass": b.mass,
+        "radius": b.radius,
+        "is_star": b.is_star,
+    }
+
+
+def _stop_reason(stop, planets, merges, escaped):
+    # merged: allt har slagits ihop till en planet, escaped: alla planeter har flytt,
+    # empty: inga planeter kvar alls, oavsett hur de försvann
+    if "merged" in stop and len(planets) == 1 and merges:
+        return "merged"
+    if "escaped" in stop and not planets and escaped:
+        return "escaped"
+    if "empty" in stop and not planets:
+        return "empty"
+    return None
+
+
+def run_scenario(run):
+    run = dict(DEFAULTS, **run)
+    t0 = time.perf_counter()
+    result = {"name": run["name"], "params": run.get("params", {}), "seed": run["seed"]}
+    telemetry = None
+
+    try:
+        presets = _presets(run)
+        softening = run["softening"]
+        sim = Simulation(tuple(run["size"]), seed=run["seed"], softening=softening, presets=presets)
+        gravity = functools.partial(gravity_for(run["kernel"]), softening=softening)
+
+        for command in _setup_commands(run, presets):
+            sim.apply(command)
+        # Bara planeternas starthastighet skalas, stjärnorna ligger kvar
+        for b in sim.bodies:
+            if not b.is_star:
+                b.vel *= run["velocity_scale"]
+
+        stop = set(run["stop"])
+        max_ticks = int(round(run["duration"] / TICK_DT))
+        events = []
+        merges = 0
+        escaped = 0
+        bodies_start = len(sim.bodies)
+
+        energy_start = total_energy(sim.bodies, softening)
+        monitor = sim.diagnostics = ConservationMonitor(every=ENERGY_EVERY)
+        reason = "time"
+
+        if run.get("telemetry"):
+            telemetry = TelemetryWriter(os.path.join(run["telemetry"], f"run{run['run_id']:05d}"), run.get("telemetry_format", "jsonl"))
+            result["telemetry"] = telemetry.base
+
+        while sim.tick < max_ticks:
+            before = {id(b): b for b in sim.bodies}
+            t_step = time.perf_counter()
+            step_events = sim.step(gravity)
+            if telemetry is not None:
+                step_ms = (time.perf_counter() - t_step) * 1000.0
+                telemetry.record(tick_record(sim, step_ms, step_ms, telemetry.t0))
+
+            gone = set(before) - {id(b) for b in sim.bodies}
+            for event in step_events:
+                gone -= {id(b) for b in event[1:]}
+                kind = event[0]
+                merges += kind == "merge"
+                lost = event[2:] if kind == "merge" else event[2:3]
+                events.append({
+                    "tick": sim.tick,
+                    "sim_time": sim.sim_time,
+                    "kind": kind,
+                    "into": event[1].name,
+                    "mass": event[1].mass,
+                    "names": [b.name for b in lost],
+                })
+            escaped += sum(1 for i in gone if not before[i].is_star)
+
+            planets = [b for b in sim.bodies if not b.is_star]
+            found = _stop_reason(stop, planets, merges, escaped)
+            if found is not None:
+                reason = found
+                break
+
+        energy_end = total_energy(sim.bodies, softening)
+        result.update({
+            "stop_reason": reason,
+            "ticks": sim.tick,
+            "sim_time": sim.sim_time,
+            "bodies_start": bodies_start,
+            "bodies_end": len(sim.bodies),
+            "merges": merges,
+            "absorbed": sum(1 for e in events if e["kind"] == "absorb"),
+            "escaped": escaped,
+            "energy_start": energy_start,
+            "energy_end": energy_end,
+            # Största driften mellan två händelser, kollisioner och flyktingar flyttar basen
+            "energy_drift": monitor.max_drift["energy"],
+            "momentum_drift": monitor.max_drift["momentum"],
+            "angular_drift": monitor.max_drift["angular"],
+            "events": events,
+            "final": [_body_state(b) for b in sim.bodies],
+        })
+    except Exception as e:
+        # En trasig definition ska inte stoppa en hel natts körning
+        result.update({"stop_reason": "error", "error": f"{type(e).__name__}: {e}"})
+    finally:
+        if telemetry is not None:
+            telemetry.close()
+
+    result["wall_s"] = time.perf_counter() - t0
+    return result
+
+
+class ResultWriter:
+    def __init__(self, path):
+        self.path = path
+        self.csv = path.lower().endswith(".csv")
+        self._file = sys.stdout if path == "-" else open(path, "w", encoding="utf-8", newline="")
+        self._writer = None
+        if self.csv:
+            self._writer = csv.DictWriter(self._file, CSV_FIELDS, extrasaction="ignore")
+            self._writer.writeheader()
+
+    def write(self, result):
+        if self.csv:
+            row = dict(result)
+            row["params"] = json.dumps(result.get("params", {}), sort_keys=True)
+            self._writer.writerow(row)
+        else:
+            self._file.write(json.dumps(result) + "\n")
+        # Resultaten ska finnas på disk även om körningen avbryts
+        self._file.flush()
+
+    def close(self):
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run Space Cadet scenarios headless and summarise the outcome")
+    parser.add_argument("scenarios", help="JSON file with a list of scenarios (or {\"scenarios\": [...]})")
+    parser.add_argument("--out", default="results.jsonl", help="results file, .jsonl or .csv, - for stdout")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of simulation processes")
+    parser.add_argument("--duration", type=float, default=None, help="override every scenario's time limit in seconds")
+    parser.add_argument("--telemetry", default=None, help="directory for per-tick telemetry, one file set per run")
+    parser.add_argument("--telemetry-format", choices=("jsonl", "bin"), default="bin", help="telemetry file format")
+    parser.add_argument("--kernel", choices=("python", "numpy"), default=None, help="override the gravity kernel")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    runs = expand_sweeps(load_scenarios(args.scenarios))
+    for i, run in enumerate(runs):
+        run["run_id"] = i
+        if args.telemetry:
+            run["telemetry"] = os.path.abspath(args.telemetry)
+            run["telemetry_format"] = args.telemetry_format
+        if args.duration is not None:
+            run["duration"] = args.duration
+        if args.kernel is not None:
+            run["kernel"] = args.kernel
+
+    writer = ResultWriter(args.out)
+    t0 = time.perf_counter()
+    done = failed = 0
+    try:
+        with multiprocessing.Pool(args.workers) as pool:
+            for result in pool.imap_unordered(run_scenario, runs):
+                writer.write(result)
+                done += 1
+                failed += result["stop_reason"] == "error"
+                print(f"\r{done}/{len(runs)} runs", end="", file=sys.stderr)
+    finally:
+        writer.close()
+
+    print(f"\nFinished {done} runs ({failed} failed) in {time.perf_counter() - t0:.1f}s, {args.workers} workers", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
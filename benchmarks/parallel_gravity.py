@@ -0,0 +1,70 @@
+# Kör från repo-roten: python -m benchmarks.parallel_gravity
+import os
+import random
+import time
+
+import numpy as np
+
+from bodies import Body
+from parallel_gravity import ParallelGravity
+from physics import compute_gravity
+
+SIZES = (256, 1024, 2048, 4096)
+# Den rena Python-loopen är O(N²) i tolken, mäts bara upp till den här storleken
+PYTHON_MAX = 1024
+REPEATS = 3
+
+
+def make_bodies(n, rng):
+    return [
+        Body((rng.uniform(0, 4000), rng.uniform(0, 4000)), (0, 0), mass=rng.uniform(1, 50), radius=3, color=(200, 200, 200))
+        for _ in range(n)
+    ]
+
+
+def best_of(fn):
+    best = float("inf")
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    rng = random.Random(7)
+    cores = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, 8, 16, cores} & set(range(1, cores + 1)))
+
+    header = f"{'N':>6} {'python ms':>10}" + "".join(f" {f'{w}w ms':>9}" for w in counts) + f" {'speedup':>8} {'max err':>9}"
+    print(f"{cores} cores")
+    print(header)
+
+    pools = {w: ParallelGravity(w, min_bodies=0) for w in counts}
+    try:
+        for n in SIZES:
+            bodies = make_bodies(n, rng)
+            for gravity in pools.values():
+                gravity(bodies)
+
+            t_python = best_of(lambda: compute_gravity(bodies)) if n <= PYTHON_MAX else None
+            times = {w: best_of(lambda: pools[w](bodies)) for w in counts}
+
+            ref = np.array([(f.x, f.y) for f in pools[1](bodies)])
+            err = 0.0
+            if t_python is not None:
+                err = float(np.abs(np.array([(f.x, f.y) for f in compute_gravity(bodies)]) - ref).max() / np.abs(ref).max())
+            for w in counts[1:]:
+                # Samma summeringsordning per rad oavsett hur raderna delats upp
+                assert np.array_equal(np.array([(f.x, f.y) for f in pools[w](bodies)]), ref)
+
+            python_ms = f"{t_python * 1000:>10.1f}" if t_python is not None else f"{'-':>10}"
+            cols = "".join(f" {times[w] * 1000:>9.1f}" for w in counts)
+            print(f"{n:>6} {python_ms}{cols} {times[1] / times[counts[-1]]:>8.2f} {err:>9.1e}")
+    finally:
+        for gravity in pools.values():
+            gravity.close()
+
+
+if __name__ == "__main__":
+    main()
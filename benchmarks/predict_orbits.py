@@ -0,0 +1,63 @@
+# Kör från repo-roten: python -m benchmarks.predict_orbits
+import random
+import time
+
+import numpy as np
+import pygame
+
+from bodies import Body
+from orbit_assist import predict_orbit, predict_orbits
+from physics import G
+
+SIZES = (1, 8, 32, 128, 512)
+STEPS = 400
+REPEATS = 3
+
+
+def make_stars():
+    return [
+        Body((960, 540), (0, 0), mass=5000, radius=18, color=(250, 220, 120), is_star=True),
+        Body((1500, 300), (0, 0), mass=1500, radius=12, color=(250, 200, 160), is_star=True),
+    ]
+
+
+def make_starts(k, rng):
+    pos = np.array([(960 + rng.uniform(80, 400), 540 + rng.uniform(-40, 40)) for _ in range(k)])
+    vel = np.array([(rng.uniform(-10, 10), -rng.uniform(20, 70)) for _ in range(k)])
+    return pos, vel
+
+
+def best_of(fn):
+    best = float("inf")
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    rng = random.Random(7)
+    stars = make_stars()
+
+    print(f"{'K':>6} {'loop ms':>10} {'batched ms':>11} {'speedup':>8} {'max err':>9}")
+    for k in SIZES:
+        pos, vel = make_starts(k, rng)
+
+        def loop():
+            return [predict_orbit(pygame.Vector2(*p), pygame.Vector2(*v), stars, steps=STEPS, G=G) for p, v in zip(pos, vel)]
+
+        def batched():
+            return predict_orbits(pos, vel, stars, steps=STEPS, G=G)
+
+        t_loop = best_of(loop)
+        t_batch = best_of(batched)
+
+        ref = np.array([[(p.x, p.y) for p in pts] for pts in loop()])
+        err = float(np.abs(batched() - ref).max())
+
+        print(f"{k:>6} {t_loop * 1000:>10.2f} {t_batch * 1000:>11.2f} {t_loop / t_batch:>8.1f} {err:>9.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -30,7 +30,9 @@ class Body:
 
     def update(self, dt):
         self.pos += self.vel * dt
+        self.update_trail(dt)
 
+    def update_trail(self, dt):
         self.trail_timer += dt
         if self.trail_timer >= 0.05:
             self.trail.append(self.pos.copy())
@@ -38,12 +40,23 @@ class Body:
             if len(self.trail) > 200:
                 self.trail.pop(0)
 
-    def draw(self, screen, camera_offset, zoom, draw_trail=True):
-        if draw_trail and len(self.trail) > 1:
-            pts = [((p - camera_offset) * zoom) for p in self.trail]
+    def draw(self, screen, camera_offset, zoom, draw_trail=True, trail_max=None, trail_step=1, lod_px=0.0):
+        sp = (self.pos - camera_offset) * zoom
+        if self.radius * zoom < lod_px:
+            # Så liten på skärmen att en fyrkant räcker, och svansen syns ändå knappt
+            screen.fill(self.color, (int(sp.x), int(sp.y), 2, 2))
+            return
+
+        trail = self.trail
+        if trail_max is not None and len(trail) > trail_max:
+            trail = trail[-trail_max:]
+        if trail_step > 1:
+            # Glesare svans, räknat bakifrån så att den alltid slutar vid kroppen
+            trail = trail[::-trail_step][::-1]
+        if draw_trail and len(trail) > 1:
+            pts = [((p - camera_offset) * zoom) for p in trail]
             pygame.draw.lines(screen, self.color, False, pts, 1)
 
-        sp = (self.pos - camera_offset) * zoom
         r = max(1, int(self.radius * zoom))
         pygame.draw.circle(screen, self.color, (int(sp.x), int(sp.y)), r)
 
@@ -0,0 +1,144 @@
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+import pygame
+
+from paths import data_path
+
+# Antal bilder som får vänta på kodning, är kön full släpps nästa bild
+QUEUE_SIZE = 6
+# Snabb komprimering, kodaren ska hinna med i bildtakt snarare än ge små filer
+PNG_LEVEL = 1
+
+
+def _chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+def encode_png(rgb, width, height):
+    # Varje rad får filterbyte 0, zlib släpper GIL medan den komprimerar
+    rows = np.frombuffer(rgb, dtype=np.uint8).reshape(height, width * 3)
+    raw = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    raw[:, 1:] = rows
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"".join((
+        b"\x89PNG\r\n\x1a\n",
+        _chunk(b"IHDR", header),
+        _chunk(b"IDAT", zlib.compress(raw.tobytes(), PNG_LEVEL)),
+        _chunk(b"IEND", b""),
+    ))
+
+
+class FrameCapture:
+    def __init__(self, queue_size=QUEUE_SIZE):
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._free = queue.LifoQueue()
+        self._pool_size = queue_size + 1
+        self._allocated = 0
+        self._thread = None
+
+        self.recording = False
+        self.directory = None
+        self.frame_index = 0
+        self.saved = 0
+        self.dropped = 0
+        self.last_error = None
+        self.last_path = None
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                break
+
+            surface, path = item
+            try:
+                w, h = surface.get_size()
+                rgb = pygame.image.tobytes(surface, "RGB")
+                self._free.put(surface)
+                data = encode_png(rgb, w, h)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(data)
+                self.saved += 1
+                self.last_path = path
+            except (OSError, pygame.error) as e:
+                self.last_error = e
+            finally:
+                self._queue.task_done()
+
+    def _buffer(self, screen):
+        size = screen.get_size()
+        while True:
+            try:
+                surface = self._free.get_nowait()
+            except queue.Empty:
+                break
+            if surface.get_size() == size:
+                return surface
+            # Fönstret har bytt storlek, gamla buffertar passar inte längre
+            self._allocated -= 1
+
+        if self._allocated < self._pool_size:
+            self._allocated += 1
+            return pygame.Surface(size, 0, screen)
+        return None
+
+    def _submit(self, screen, path):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="frame-capture", daemon=True)
+            self._thread.start()
+
+        surface = self._buffer(screen)
+        if surface is None or self._queue.full():
+            if surface is not None:
+                self._free.put(surface)
+            self.dropped += 1
+            return False
+
+        surface.blit(screen, (0, 0))
+        self._queue.put_nowait((surface, path))
+        return True
+
+    def screenshot(self, screen):
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = data_path("screenshots", f"shot_{stamp}_{self.saved + self.dropped:04d}.png")
+        return self._submit(screen, path)
+
+    def start(self):
+        self.directory = data_path("captures", time.strftime("%Y%m%d-%H%M%S"))
+        self.frame_index = 0
+        self.dropped = 0
+        self.recording = True
+
+    def stop(self):
+        self.recording = False
+
+    def toggle(self):
+        if self.recording:
+            self.stop()
+        else:
+            self.start()
+
+    def capture_frame(self, screen):
+        if not self.recording:
+            return
+        # Numreringen hoppar inte över släppta bilder, så sekvensen går att koda direkt
+        path = os.path.join(self.directory, f"frame_{self.frame_index:06d}.png")
+        if self._submit(screen, path):
+            self.frame_index += 1
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._queue.join()
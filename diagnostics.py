@@ -0,0 +1,242 @@
+import numpy as np
+import pygame
+
+# Diagnostiken tas var K:e tick, potentialen följer med från samma kraftberäkning
+SAMPLE_EVERY = 10
+HISTORY = 240
+# Relativ drift över det här larmar, 0.5 % i energi är mer än integratorn borde tappa
+DRIFT_WARNING = 0.005
+
+SERIES = ("kinetic", "potential", "energy", "momentum", "angular")
+DRIFTS = ("energy", "momentum", "angular")
+
+
+class DownsampledSeries:
+    # Fast storlek som ändå täcker hela körningen: när bufferten är full slås
+    # intilliggande par ihop och varje plats får medelvärdet av dubbelt så många prov
+    def __init__(self, capacity=HISTORY):
+        self.values = np.zeros(capacity, dtype=np.float64)
+        self.count = 0
+        self.stride = 1
+        self._sum = 0.0
+        self._n = 0
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+        self.stride = 1
+        self._sum = 0.0
+        self._n = 0
+
+    def add(self, value):
+        self._sum += value
+        self._n += 1
+        if self._n < self.stride:
+            return
+
+        self.values[self.count] = self._sum / self._n
+        self.count += 1
+        self._sum = 0.0
+        self._n = 0
+
+        if self.count == len(self.values):
+            half = self.count // 2
+            self.values[:half] = 0.5 * (self.values[0:2 * half:2] + self.values[1:2 * half:2])
+            self.count = half
+            self.stride *= 2
+
+    def array(self):
+        return self.values[:self.count]
+
+    def copy(self):
+        other = DownsampledSeries(len(self.values))
+        other.values[:self.count] = self.values[:self.count]
+        other.count = self.count
+        other.stride = self.stride
+        other._sum = self._sum
+        other._n = self._n
+        return other
+
+
+class ConservationMonitor:
+    def __init__(self, every=SAMPLE_EVERY, capacity=HISTORY, threshold=DRIFT_WARNING):
+        self.every = every
+        self.threshold = threshold
+        self.series = {name: DownsampledSeries(capacity) for name in SERIES}
+        self.drift_series = {name: DownsampledSeries(capacity) for name in DRIFTS}
+        self.reset()
+
+    def reset(self):
+        for s in self.series.values():
+            s.clear()
+        for s in self.drift_series.values():
+            s.clear()
+        self.samples = 0
+        self.latest = None
+        self.drift = {name: 0.0 for name in DRIFTS}
+        self.max_drift = {name: 0.0 for name in DRIFTS}
+        self.rebaselines = 0
+        self.warnings = 0
+        self.warning = None
+        self._warned = set()
+        self._baseline = None
+        self._signature = None
+        self._last_tick = None
+
+    def copy(self):
+        # Ögonblicksbild för panelen när simuleringen går i en egen tråd, latest byts bara ut
+        other = ConservationMonitor.__new__(ConservationMonitor)
+        other.__dict__.update(self.__dict__)
+        other.series = {name: s.copy() for name, s in self.series.items()}
+        other.drift_series = {name: s.copy() for name, s in self.drift_series.items()}
+        other.drift = dict(self.drift)
+        other.max_drift = dict(self.max_drift)
+        other._warned = set(self._warned)
+        return other
+
+    def due(self, tick):
+        return tick % self.every == 0
+
+    def _measure(self, bodies, potential):
+        if not bodies:
+            return {"kinetic": 0.0, "potential": potential, "energy": potential, "momentum": (0.0, 0.0), "angular": 0.0, "scale_p": 0.0, "scale_l": 0.0}
+
+        state = np.array([c for b in bodies for c in (b.pos.x, b.pos.y, b.vel.x, b.vel.y, b.mass)], dtype=np.float64).reshape(-1, 5)
+        x, y, vx, vy, m = state.T
+        kinetic = float(0.5 * (m * (vx * vx + vy * vy)).sum())
+        px = m * vx
+        py = m * vy
+        lz = x * py - y * px
+        return {
+            "kinetic": kinetic,
+            "potential": potential,
+            "energy": kinetic + potential,
+            "momentum": (float(px.sum()), float(py.sum())),
+            "angular": float(lz.sum()),
+            # Skalor för den relativa driften, så att ett system i vila inte delar med noll
+            "scale_p": float(np.hypot(px, py).sum()),
+            "scale_l": float(np.abs(lz).sum()),
+        }
+
+    def record(self, sim, potential, bodies=None):
+        bodies = sim.bodies if bodies is None else bodies
+        m = self._measure(bodies, potential)
+        self.latest = m
+        self.samples += 1
+
+        self.series["kinetic"].add(m["kinetic"])
+        self.series["potential"].add(m["potential"])
+        self.series["energy"].add(m["energy"])
+        self.series["momentum"].add(float(np.hypot(*m["momentum"])))
+        self.series["angular"].add(m["angular"])
+
+        # Nya, sammanslagna eller försvunna kroppar, spolning och dragkraft ändrar
+        # bevarade storheter på riktigt, då börjar mätningen om därifrån
+        signature = tuple(map(id, bodies))
+        driven = any(b.user_acc.x or b.user_acc.y for b in bodies)
+        went_back = self._last_tick is not None and sim.tick <= self._last_tick
+        self._last_tick = sim.tick
+        if self._baseline is None or driven or went_back or signature != self._signature:
+            if self._baseline is not None:
+                self.rebaselines += 1
+            self._baseline = m
+            self._signature = signature
+            return
+
+        base = self._baseline
+        dp = np.hypot(m["momentum"][0] - base["momentum"][0], m["momentum"][1] - base["momentum"][1])
+        self.drift = {
+            "energy": abs(m["energy"] - base["energy"]) / max(abs(base["energy"]), 1e-12),
+            "momentum": float(dp) / max(base["scale_p"], 1e-12),
+            "angular": abs(m["angular"] - base["angular"]) / max(base["scale_l"], 1e-12),
+        }
+        for name, value in self.drift.items():
+            self.drift_series[name].add(value)
+            self.max_drift[name] = max(self.max_drift[name], value)
+
+            # Bara när gränsen passeras uppåt, inte varje prov så länge den ligger över
+            if value > self.threshold and name not in self._warned:
+                self._warned.add(name)
+                self.warnings += 1
+                self.warning = f"{name.capitalize()} drift {value * 100:.2f}% (limit {self.threshold * 100:.2f}%)"
+            elif value <= self.threshold:
+                self._warned.discard(name)
+
+    def pop_warning(self):
+        warning = self.warning
+        self.warning = None
+        return warning
+
+
+def draw_sparkline(screen, rect, values, color, baseline=None):
+    if len(values) < 2:
+        return
+
+    lo = float(values.min())
+    hi = float(values.max())
+    if baseline is not None:
+        lo = min(lo, baseline)
+        hi = max(hi, baseline)
+    span = hi - lo or 1.0
+
+    xs = rect.x + np.linspace(0, rect.w - 1, len(values))
+    ys = rect.bottom - 1 - (values - lo) / span * (rect.h - 1)
+    if baseline is not None:
+        by = rect.bottom - 1 - (baseline - lo) / span * (rect.h - 1)
+        pygame.draw.line(screen, (70, 70, 80), (rect.x, by), (rect.right - 1, by))
+    pygame.draw.lines(screen, color, False, np.stack([xs, ys], axis=1).tolist())
+
+
+class DiagnosticsPanel:
+    ROWS = (
+        ("energy", "Energy", (240, 210, 120)),
+        ("kinetic", "Kinetic", (140, 200, 255)),
+        ("potential", "Potential", (200, 150, 255)),
+        ("momentum", "|p|", (150, 230, 160)),
+        ("angular", "L", (255, 160, 140)),
+    )
+
+    def __init__(self, font, width=360):
+        self.font = font
+        self.width = width
+        self.row_h = 34
+        self.visible = False
+
+    def toggle(self):
+        self.visible = not self.visible
+
+    def draw(self, screen, monitor, pos):
+        if not self.visible:
+            return
+
+        x, y = pos
+        h = 30 + self.row_h * len(self.ROWS) + 22 * len(DRIFTS)
+        panel = pygame.Rect(x, y, self.width, h)
+        bg = pygame.Surface(panel.size, pygame.SRCALPHA)
+        bg.fill((10, 12, 20, 200))
+        screen.blit(bg, panel.topleft)
+        pygame.draw.rect(screen, (70, 80, 110), panel, 1)
+
+        stride = monitor.series["energy"].stride
+        title = f"Conservation   every {monitor.every} ticks   x{stride}   rebase {monitor.rebaselines}"
+        screen.blit(self.font.render(title, True, (220, 220, 230)), (x + 8, y + 6))
+
+        cy = y + 28
+        latest = monitor.latest or {}
+        for name, label, color in self.ROWS:
+            value = latest.get(name)
+            if name == "momentum" and value is not None:
+                value = float(np.hypot(*value))
+            text = f"{label} {value:.4g}" if value is not None else label
+            screen.blit(self.font.render(text, True, color), (x + 8, cy + 8))
+            draw_sparkline(screen, pygame.Rect(x + 170, cy + 2, self.width - 180, self.row_h - 6), monitor.series[name].array(), color)
+            cy += self.row_h
+
+        for name in DRIFTS:
+            value = monitor.drift[name]
+            color = (255, 110, 110) if value > monitor.threshold else (170, 170, 180)
+            text = f"{name} drift {value * 100:.3f}%   max {monitor.max_drift[name] * 100:.3f}%"
+            screen.blit(self.font.render(text, True, color), (x + 8, cy + 2))
+            cy += 22
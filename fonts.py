@@ -0,0 +1,30 @@
+from collections.abc import Mapping
+
+import pygame
+
+# Alla fonter är pygames standardfont. Font(None, ...) läser den inbyggda filen direkt
+# utan att skanna systemfonterna, så det finns ingen sökväg att slå upp eller cacha
+FONT_SIZES = {
+    "title": 64,
+    "ui": 20,
+    "label": 18,
+}
+
+
+class LazyFonts(Mapping):
+    def __init__(self, sizes=FONT_SIZES):
+        self.sizes = dict(sizes)
+        self._fonts = {}
+
+    def __getitem__(self, key):
+        font = self._fonts.get(key)
+        if font is None:
+            font = pygame.font.Font(None, self.sizes[key])
+            self._fonts[key] = font
+        return font
+
+    def __iter__(self):
+        return iter(self.sizes)
+
+    def __len__(self):
+        return len(self.sizes)
@@ -1,5 +1,7 @@
 import pygame
 
+from scheduler import LOW
+
 
 class HUD:
     def __init__(self, font):
@@ -117,3 +119,25 @@ class HUD:
                     y += 4
 
         screen.blit(box, hud_rect.topleft)
+
+
+class LabelCache:
+    # Namnskyltar renderas en gång, nya renderas av schemaläggaren efter framen
+    # och syns från nästa frame i stället för att kosta två font.render per kropp och frame
+    def __init__(self, font, color=(205, 205, 205), shadow=(20, 20, 25)):
+        self.font = font
+        self.color = color
+        self.shadow = shadow
+        self._surfaces = {}
+
+    def _render(self, text):
+        self._surfaces[text] = (self.font.render(text, True, self.color), self.font.render(text, True, self.shadow))
+
+    def get(self, text, scheduler=None):
+        surfaces = self._surfaces.get(text)
+        if surfaces is None:
+            if scheduler is None:
+                self._render(text)
+                return self._surfaces[text]
+            scheduler.submit_once(("label", text), lambda: self._render(text), LOW)
+        return surfaces
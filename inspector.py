@@ -2,6 +2,7 @@ import math
 import pygame
 
 from physics import G, SOFTENING
+from scheduler import NORMAL
 
 
 class InspectorPanel:
@@ -35,6 +36,13 @@ class InspectorPanel:
         self.vel_step = 5.0
         self.acc_step = 1.0
 
+        # Sätts av scener som vill att ändringar går via deras kommandon
+        self.on_tweak = None
+        # Med en schemaläggare räknas banelementen om efter framen och visas en frame sent
+        self.scheduler = None
+        self._orbit = None
+        self._orbit_for = None
+
         self._row_h = 32
         self._toggle_h = 34
         self._gap = 10
@@ -56,10 +64,22 @@ class InspectorPanel:
 
     def clear(self):
         self.selected = None
+        self._orbit = None
+        self._orbit_for = None
 
     def _has_tweaks(self, body):
         return hasattr(body, "user_acc") and not getattr(body, "is_star", False)
 
+    def _tweak(self, body, what, dx, dy):
+        if self.on_tweak is not None:
+            self.on_tweak(body, what, dx, dy)
+        elif what == "vel":
+            body.vel += (dx, dy)
+        elif what == "thrust":
+            body.user_acc += (dx, dy)
+        else:
+            body.user_acc.update(0, 0)
+
     def handle_event(self, event):
         if not self.enabled or self.selected is None:
             return False
@@ -82,33 +102,33 @@ class InspectorPanel:
             b = self.selected
             if self.mode == "sandbox" and self._has_tweaks(b):
                 if self._vx_minus.collidepoint(p):
-                    b.vel.x -= self.vel_step
+                    self._tweak(b, "vel", -self.vel_step, 0.0)
                     return True
                 if self._vx_plus.collidepoint(p):
-                    b.vel.x += self.vel_step
+                    self._tweak(b, "vel", self.vel_step, 0.0)
                     return True
                 if self._vy_minus.collidepoint(p):
-                    b.vel.y -= self.vel_step
+                    self._tweak(b, "vel", 0.0, -self.vel_step)
                     return True
                 if self._vy_plus.collidepoint(p):
-                    b.vel.y += self.vel_step
+                    self._tweak(b, "vel", 0.0, self.vel_step)
                     return True
 
                 if self._tx_minus.collidepoint(p):
-                    b.user_acc.x -= self.acc_step
+                    self._tweak(b, "thrust", -self.acc_step, 0.0)
                     return True
                 if self._tx_plus.collidepoint(p):
-                    b.user_acc.x += self.acc_step
+                    self._tweak(b, "thrust", self.acc_step, 0.0)
                     return True
                 if self._ty_minus.collidepoint(p):
-                    b.user_acc.y -= self.acc_step
+                    self._tweak(b, "thrust", 0.0, -self.acc_step)
                     return True
                 if self._ty_plus.collidepoint(p):
-                    b.user_acc.y += self.acc_step
+                    self._tweak(b, "thrust", 0.0, self.acc_step)
                     return True
 
                 if self._reset_tweaks.collidepoint(p):
-                    b.user_acc.update(0, 0)
+                    self._tweak(b, "reset_thrust", 0.0, 0.0)
                     return True
 
         return False
@@ -235,6 +255,21 @@ class InspectorPanel:
             "ra": ra,
         }
 
+    def _refresh_orbit(self, body):
+        star = self._find_primary_star(body)
+        self._orbit = self._orbit_params_about_star(body, star) if star is not None else None
+        self._orbit_for = getattr(body, "body", body)
+
+    def _orbit_elements(self, body, star):
+        if star is None or getattr(body, "is_star", False):
+            return None
+        # En vy från simuleringstråden byts varje bild men gäller samma kropp
+        if self.scheduler is None or self._orbit_for is not getattr(body, "body", body):
+            self._refresh_orbit(body)
+        else:
+            self.scheduler.submit_once("inspector orbit", lambda: self._refresh_orbit(body), NORMAL)
+        return self._orbit
+
     def draw(self, screen):
         if not self.enabled or self.selected is None:
             return
@@ -273,9 +308,7 @@ class InspectorPanel:
             bound_tag = "BOUND" if TE < 0 else "UNBOUND"
 
         
-        orbit = None
-        if star is not None and not getattr(b, "is_star", False):
-            orbit = self._orbit_params_about_star(b, star)
+        orbit = self._orbit_elements(b, star)
 
         has_tweaks = self.mode == "sandbox" and self._has_tweaks(b)
 
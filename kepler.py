@@ -0,0 +1,128 @@
+import math
+
+import numpy as np
+import pygame
+
+KEPLER_ITERATIONS = 8
+KEPLER_TOLERANCE = 1e-12
+
+
+def _solve_kepler(M, e):
+    M = math.fmod(M, 2.0 * math.pi)
+    E = M + e * math.sin(M) if e < 0.8 else math.pi
+    for _ in range(KEPLER_ITERATIONS):
+        f = E - e * math.sin(E) - M
+        E -= f / (1.0 - e * math.cos(E))
+        if abs(f) < KEPLER_TOLERANCE:
+            break
+    return E
+
+
+def _solve_kepler_array(M, e):
+    M = np.fmod(M, 2.0 * np.pi)
+    E = M + e * np.sin(M) if e < 0.8 else np.full_like(M, np.pi)
+    for _ in range(KEPLER_ITERATIONS):
+        E -= (E - e * np.sin(E) - M) / (1.0 - e * np.cos(E))
+    return E
+
+
+class KeplerOrbit:
+    def __init__(self, mu, rel_pos, rel_vel, epoch=0.0):
+        x, y = rel_pos
+        vx, vy = rel_vel
+
+        r = math.hypot(x, y)
+        v2 = vx * vx + vy * vy
+        if r <= 0 or mu <= 0:
+            raise ValueError("degenerate orbit")
+
+        inv_a = 2.0 / r - v2 / mu
+        if inv_a <= 0:
+            raise ValueError("orbit is not bound")
+
+        self.mu = mu
+        self.epoch = epoch
+        # Räcker för att återskapa banan exakt, t.ex. ur en snapshot
+        self.init = (mu, x, y, vx, vy, epoch)
+        self.a = 1.0 / inv_a
+
+        h = x * vy - y * vx
+        self.sense = 1.0 if h >= 0 else -1.0
+
+        rv = x * vx + y * vy
+        ex = ((v2 - mu / r) * x - rv * vx) / mu
+        ey = ((v2 - mu / r) * y - rv * vy) / mu
+        self.e = min(math.hypot(ex, ey), 0.999999)
+        self.omega = math.atan2(ey, ex) if self.e > 1e-9 else 0.0
+
+        self.b = self.a * math.sqrt(1.0 - self.e * self.e)
+        self.n = math.sqrt(mu / self.a ** 3)
+        self.period = 2.0 * math.pi / self.n
+
+        nu = self.sense * (math.atan2(y, x) - self.omega)
+        E = 2.0 * math.atan2(math.sqrt(1.0 - self.e) * math.sin(nu / 2.0), math.sqrt(1.0 + self.e) * math.cos(nu / 2.0))
+        self.M0 = E - self.e * math.sin(E)
+
+        self._cos_w = math.cos(self.omega)
+        self._sin_w = math.sin(self.omega)
+
+    def state_at(self, t):
+        E = _solve_kepler(self.M0 + self.n * (t - self.epoch), self.e)
+        cos_e = math.cos(E)
+        sin_e = math.sin(E)
+
+        px = self.a * (cos_e - self.e)
+        py = self.sense * self.b * sin_e
+        k = self.n / (1.0 - self.e * cos_e)
+        pvx = -self.a * sin_e * k
+        pvy = self.sense * self.b * cos_e * k
+
+        c, s = self._cos_w, self._sin_w
+        return (
+            px * c - py * s,
+            px * s + py * c,
+            pvx * c - pvy * s,
+            pvx * s + pvy * c,
+        )
+
+    def positions_at(self, times):
+        E = _solve_kepler_array(self.M0 + self.n * (np.asarray(times, dtype=np.float64) - self.epoch), self.e)
+        px = self.a * (np.cos(E) - self.e)
+        py = self.sense * self.b * np.sin(E)
+        c, s = self._cos_w, self._sin_w
+        return np.stack([px * c - py * s, px * s + py * c], axis=-1)
+
+
+def put_on_rails(body, parent, G, epoch=0.0):
+    rel_pos = body.pos - parent.pos
+    rel_vel = body.vel - parent.vel
+    body.parent = parent
+    body.orbit = KeplerOrbit(G * parent.mass, rel_pos, rel_vel, epoch)
+
+
+def propagate(bodies, t):
+    # Föräldrar måste komma före sina barn i listan
+    for body in bodies:
+        orbit = getattr(body, "orbit", None)
+        if orbit is None:
+            continue
+
+        parent = body.parent
+        x, y, vx, vy = orbit.state_at(t)
+        body.pos.update(parent.pos.x + x, parent.pos.y + y)
+        body.vel.update(parent.vel.x + vx, parent.vel.y + vy)
+
+        r3 = (x * x + y * y) ** 1.5
+        if r3 > 0:
+            body.last_acc.update(-orbit.mu * x / r3, -orbit.mu * y / r3)
+
+
+def sample_trail(body, t, samples, fraction):
+    orbit = getattr(body, "orbit", None)
+    if orbit is None:
+        return []
+
+    times = t - np.linspace(fraction * orbit.period, 0.0, samples)
+    rel = orbit.positions_at(times)
+    px, py = body.parent.pos.x, body.parent.pos.y
+    return [pygame.Vector2(px + x, py + y) for x, y in rel.tolist()]
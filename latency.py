@@ -0,0 +1,135 @@
+import time
+from collections import deque
+
+import numpy as np
+import pygame
+
+# Ordningen är bitordningen i telemetrins input_kinds
+KINDS = ("click", "drag", "zoom", "key", "motion")
+HISTORY = 600
+PERCENTILES = (50, 90, 99)
+# Input vars frame inte ändrade något på skärmen väntar så här många frames på en
+# som gör det, sedan räknas den som utan synlig effekt och släpps
+CARRY_FRAMES = 4
+
+
+def event_kind(event):
+    if event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+        return "zoom" if event.button in (4, 5) else "click"
+    if event.type == pygame.MOUSEWHEEL:
+        return "zoom"
+    if event.type == pygame.MOUSEMOTION:
+        return "drag" if any(event.buttons) else "motion"
+    if event.type == pygame.KEYDOWN:
+        return "key"
+    return None
+
+
+def kind_mask(kinds):
+    mask = 0
+    for kind in kinds:
+        mask |= 1 << KINDS.index(kind)
+    return mask
+
+
+class LatencyTracker:
+    # Tiden från att pygame.event.get lämnade händelsen till att framen som
+    # hanterade den skickats till skärmen. Väntan i SDL:s kö före get syns inte
+    def __init__(self, history=HISTORY):
+        self.samples = {kind: deque(maxlen=history) for kind in KINDS}
+        self.counts = dict.fromkeys(KINDS, 0)
+        self.frame = 0
+        self.last_ms = float("nan")
+        self.last_mask = 0
+        self.dropped = 0
+        self._pending = []
+
+    def stamp(self, events, now=None):
+        now = time.perf_counter() if now is None else now
+        for event in events:
+            kind = event_kind(event)
+            if kind is not None:
+                self._pending.append((kind, now, self.frame))
+
+    def presented(self, now=None):
+        # Anropas direkt efter en flip eller update som faktiskt skickade något,
+        # alla händelser sedan förra anropet visas i den här framen
+        now = time.perf_counter() if now is None else now
+        self.frame += 1
+        self.last_ms = float("nan")
+        self.last_mask = 0
+        if not self._pending:
+            return 0
+
+        worst = 0.0
+        for kind, stamp, _ in self._pending:
+            ms = (now - stamp) * 1000.0
+            self.samples[kind].append(ms)
+            self.counts[kind] += 1
+            worst = max(worst, ms)
+        self.last_ms = worst
+        self.last_mask = kind_mask({kind for kind, _, _ in self._pending})
+        count = len(self._pending)
+        self._pending = []
+        return count
+
+    def skipped(self):
+        # Framen skickades aldrig till fönstret, händelserna följer med till nästa
+        self.frame += 1
+        self.dropped += sum(1 for _, _, frame in self._pending if self.frame - frame > CARRY_FRAMES)
+        self._pending = [p for p in self._pending if self.frame - p[2] <= CARRY_FRAMES]
+
+    def stats(self, kind):
+        values = self.samples[kind]
+        if not values:
+            return None
+        values = np.fromiter(values, dtype=np.float64, count=len(values))
+        stats = {f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+        stats["max"] = float(values.max())
+        stats["n"] = len(values)
+        return stats
+
+
+class LatencyPanel:
+    COLUMNS = (("p50", 90), ("p90", 160), ("p99", 230), ("max", 300), ("n", 370))
+
+    def __init__(self, font, width=430):
+        self.font = font
+        self.width = width
+        self.row_h = 22
+        self.visible = False
+
+    def toggle(self):
+        self.visible = not self.visible
+
+    def draw(self, screen, tracker, pos):
+        if not self.visible:
+            return
+
+        x, y = pos
+        h = 56 + self.row_h * len(KINDS)
+        panel = pygame.Rect(x, y, self.width, h)
+        bg = pygame.Surface(panel.size, pygame.SRCALPHA)
+        bg.fill((10, 12, 20, 200))
+        screen.blit(bg, panel.topleft)
+        pygame.draw.rect(screen, (70, 80, 110), panel, 1)
+
+        title = f"Input latency (ms)   frame {tracker.frame}   no effect {tracker.dropped}"
+        screen.blit(self.font.render(title, True, (220, 220, 230)), (x + 8, y + 6))
+        for name, cx in self.COLUMNS:
+            screen.blit(self.font.render(name, True, (150, 150, 165)), (x + cx, y + 30))
+
+        cy = y + 52
+        for kind in KINDS:
+            stats = tracker.stats(kind)
+            if stats is None:
+                color = (120, 120, 130)
+            else:
+                # Över två frames vid 60 FPS känns trögt
+                color = (255, 110, 110) if stats["p90"] > 33.0 else (200, 200, 210)
+            screen.blit(self.font.render(kind, True, color), (x + 8, cy))
+            if stats is not None:
+                values = (f"{stats['p50']:.1f}", f"{stats['p90']:.1f}", f"{stats['p99']:.1f}", f"{stats['max']:.1f}", str(tracker.counts[kind]))
+                for (_, cx), text in zip(self.COLUMNS, values):
+                    screen.blit(self.font.render(text, True, color), (x + cx, cy))
+            cy += self.row_h
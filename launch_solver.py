@@ -0,0 +1,217 @@
+import math
+import time
+
+import numpy as np
+import pygame
+
+from orbit_assist import _dominant_star, predict_orbits
+from physics import circular_speed
+
+LAUNCH_GOALS = ("circular", "apsides", "intercept")
+
+SOLVER_BUDGET_S = 0.012
+SAMPLES_PER_ORBIT = 160
+MAX_SEARCH_STEPS = 320
+COARSE_SPEEDS = 12
+COARSE_ANGLES = 20
+REFINE_SIZE = 8
+REFINE_SHRINK = 0.35
+MAX_REFINES = 6
+# Banorna integreras i bitar om så många steg, en bit är en skiva i schemaläggaren
+SOLVER_CHUNK_STEPS = 40
+IMPACT_PENALTY = 1000.0
+
+
+class LaunchSolution:
+    def __init__(self, velocity, error, evaluated, elapsed):
+        self.velocity = velocity
+        self.error = error
+        self.evaluated = evaluated
+        self.elapsed = elapsed
+
+
+def _orbit_period(mu, a):
+    if a <= 0 or mu <= 0:
+        return 0.0
+    return 2.0 * math.pi * math.sqrt(a ** 3 / mu)
+
+
+def _candidates(speeds, angles, radial, tangent):
+    s, a = np.meshgrid(speeds, angles, indexing="ij")
+    s = s.ravel()
+    a = a.ravel()
+    ct = np.cos(a) * s
+    cr = np.sin(a) * s
+    vx = ct * tangent[0] + cr * radial[0]
+    vy = ct * tangent[1] + cr * radial[1]
+    return s, a, np.stack([vx, vy], axis=1)
+
+
+def _score(kind, traj, star_pos, star_radius, r0, rp, ra, target_traj):
+    rel = traj - star_pos
+    radii = np.sqrt(rel[..., 0] ** 2 + rel[..., 1] ** 2)
+    r_min = radii.min(axis=1)
+    r_max = radii.max(axis=1)
+
+    if kind == "circular":
+        err = (r_max - r_min) / r0
+    elif kind == "apsides":
+        err = (np.abs(r_min - rp) + np.abs(r_max - ra)) / ra
+    else:
+        d = traj - target_traj[None, :, :]
+        err = np.sqrt(d[..., 0] ** 2 + d[..., 1] ** 2).min(axis=1) / r0
+
+    return err + np.where(r_min < star_radius, IMPACT_PENALTY, 0.0)
+
+
+def iter_solve_launch(
+    start_pos,
+    stars,
+    kind="circular",
+    G=1.0,
+    softening=1200.0,
+    hint=None,
+    periapsis=None,
+    apoapsis=None,
+    target=None,
+    budget=SOLVER_BUDGET_S,
+):
+    # Lämnar tillbaka kontrollen mellan bitarna av varje omgång, lösningen kommer som
+    # generatorns returvärde. budget gäller räknetiden, inte väntan mellan skivorna
+    t0 = time.perf_counter()
+
+    start = pygame.Vector2(start_pos)
+    star = _dominant_star(start, stars)
+    if star is None:
+        return None
+
+    offset = start - star.pos
+    r0 = offset.length()
+    mu = G * star.mass
+    if r0 <= 1e-6 or mu <= 0:
+        return None
+
+    radial = offset / r0
+    # Standardvarv moturs på skärmen (samma som demo-planeterna)
+    sense = -1.0
+    if hint is not None and hint.length_squared() > 1e-9:
+        cross = offset.x * hint.y - offset.y * hint.x
+        if cross > 0:
+            sense = 1.0
+    tangent = pygame.Vector2(-radial.y, radial.x) * sense
+
+    vc = circular_speed(mu, r0, softening)
+
+    rp = ra = r0
+    target_traj = None
+
+    if kind == "circular":
+        a = r0
+        base_speed = vc
+        speed_span = (0.85, 1.15)
+        angle_span = 0.3
+    elif kind == "apsides":
+        rp = periapsis if periapsis is not None else r0
+        ra = apoapsis if apoapsis is not None else r0
+        rp, ra = min(rp, ra), max(rp, ra)
+        a = 0.5 * (rp + ra)
+        base_speed = math.sqrt(max(0.0, mu * (2.0 / r0 - 1.0 / a)))
+        speed_span = (0.8, 1.2)
+        angle_span = 0.4
+    elif kind == "intercept":
+        if target is None or getattr(target, "is_star", False):
+            return None
+        a = max(r0, (target.pos - star.pos).length())
+        base_speed = vc
+        speed_span = (0.2, 2.2)
+        angle_span = math.pi
+    else:
+        raise ValueError(f"unknown launch goal: {kind}")
+
+    period = _orbit_period(mu, a)
+    if period <= 0:
+        return None
+
+    steps = SAMPLES_PER_ORBIT
+    if kind == "intercept":
+        steps = MAX_SEARCH_STEPS
+    dt = period / SAMPLES_PER_ORBIT
+
+    star_pos = np.array([star.pos.x, star.pos.y], dtype=np.float64)
+    radial_a = np.array([radial.x, radial.y], dtype=np.float64)
+    tangent_a = np.array([tangent.x, tangent.y], dtype=np.float64)
+
+    lo = base_speed * speed_span[0]
+    hi = base_speed * speed_span[1]
+    speeds = np.linspace(lo, hi, COARSE_SPEEDS)
+    angles = np.linspace(-angle_span, angle_span, COARSE_ANGLES, endpoint=(kind != "intercept"))
+    speed_step = speeds[1] - speeds[0]
+    angle_step = angles[1] - angles[0]
+
+    work = time.perf_counter() - t0
+    best_err = math.inf
+    best_vel = None
+    evaluated = 0
+    refines = 0
+
+    while True:
+        s, ang, vels = _candidates(speeds, angles, radial_a, tangent_a)
+        starts = np.broadcast_to(np.array([start.x, start.y], dtype=np.float64), vels.shape)
+
+        # Målet integreras i samma batch som kandidaterna
+        if kind == "intercept":
+            vels = np.vstack([vels, [[target.vel.x, target.vel.y]]])
+            starts = np.vstack([starts, [[target.pos.x, target.pos.y]]])
+
+        t = time.perf_counter()
+        parts = []
+        pos, vel = starts, vels
+        for first in range(0, steps, SOLVER_CHUNK_STEPS):
+            part = predict_orbits(
+                pos, vel, stars, steps=min(SOLVER_CHUNK_STEPS, steps - first), dt=dt, G=G, softening=softening
+            )
+            parts.append(part)
+            # Hastigheten efter sista steget går att läsa ut ur de två sista positionerna
+            prev = part[:, -2] if part.shape[1] > 1 else pos
+            pos, vel = part[:, -1], (part[:, -1] - prev) / dt
+            work += time.perf_counter() - t
+            yield
+            t = time.perf_counter()
+        traj = np.concatenate(parts, axis=1)
+
+        if kind == "intercept":
+            target_traj = traj[-1]
+            traj = traj[:-1]
+            vels = vels[:-1]
+
+        err = _score(kind, traj, star_pos, getattr(star, "radius", 0.0), r0, rp, ra, target_traj)
+        evaluated += len(err)
+
+        i = int(np.argmin(err))
+        if err[i] < best_err:
+            best_err = float(err[i])
+            best_vel = pygame.Vector2(float(vels[i, 0]), float(vels[i, 1]))
+        work += time.perf_counter() - t
+
+        per_candidate = work / evaluated
+        if refines >= MAX_REFINES or work + per_candidate * REFINE_SIZE * REFINE_SIZE > budget:
+            break
+        refines += 1
+
+        speed_step *= REFINE_SHRINK
+        angle_step *= REFINE_SHRINK
+        half = 0.5 * (REFINE_SIZE - 1)
+        speeds = np.maximum(0.0, s[i] + (np.arange(REFINE_SIZE) - half) * speed_step)
+        angles = ang[i] + (np.arange(REFINE_SIZE) - half) * angle_step
+
+    return LaunchSolution(best_vel, best_err, evaluated, work)
+
+
+def solve_launch(*args, **kwargs):
+    # Hela sökningen på en gång, inom samma budget
+    solver = iter_solve_launch(*args, **kwargs)
+    while True:
+        try:
+            next(solver)
+        except StopIteration as e:
+            return e.value
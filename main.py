@@ -1,43 +1,141 @@
+import time
+
+_T0 = time.perf_counter()
+
+import argparse
 import sys
 import pygame
 
 from physics import compute_gravity
-from scenes.menu import MenuScene
-from scenes.sandbox import SandboxScene
-from scenes.demo import DemoScene
+from parallel_gravity import ParallelGravity, numpy_gravity
+from capture import FrameCapture
+from presenter import Presenter
+from latency import LatencyPanel, LatencyTracker
+from fonts import LazyFonts
+from scene_manager import SceneManager
+from startup import StartupTimer
 
 WIDTH = 1920
 HEIGHT = 1080
 FPS = 60
+# Står scenen still och ingen input kommit på så här länge väntar loopen på händelser
+# och ritar bara IDLE_FPS gånger per sekund
+IDLE_AFTER_S = 1.5
+IDLE_FPS = 4
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Space Cadet")
+    parser.add_argument("--startup-times", action="store_true", help="print how long each startup phase took")
+    parser.add_argument("--sim-thread", action="store_true", help="run the sandbox physics in its own thread")
+    parser.add_argument("--scenario", default=None, help="load this scenario file (.jsonl) when the sandbox starts")
+    parser.add_argument("--telemetry", choices=("jsonl", "bin"), default=None, help="write per-tick sandbox metrics to the data directory")
+    parser.add_argument("--workers", type=int, default=0, help="compute gravity in this many processes (0 = off)")
+    parser.add_argument("--no-idle", action="store_true", help="keep drawing at full rate while nothing moves")
+    return parser.parse_args(argv)
+
+
+def coalesce_motion(events):
+    # En snabb mus skickar hundratals MOUSEMOTION per sekund. Följande rörelser utan
+    # något annat emellan slås ihop till den sista, med summerad rel
+    out = []
+    for event in events:
+        if event.type == pygame.MOUSEMOTION and out and out[-1].type == pygame.MOUSEMOTION:
+            prev = out[-1]
+            rel = (prev.rel[0] + event.rel[0], prev.rel[1] + event.rel[1])
+            out[-1] = pygame.event.Event(pygame.MOUSEMOTION, dict(event.dict, rel=rel))
+        else:
+            out.append(event)
+    return out
 
 
 def main():
-    pygame.init()
+    args = parse_args()
+    timer = StartupTimer(_T0)
+    timer.mark("imports")
+
+    # Arbetsprocesserna startas innan pygame och alla andra trådar
+    if args.workers > 0:
+        gravity = ParallelGravity(args.workers)
+        gravity.start()
+        timer.mark("gravity pool")
+    elif args.sim_thread:
+        # NumPy-kärnan släpper GIL så att ritningen kan gå under tiden
+        gravity = numpy_gravity
+    else:
+        gravity = compute_gravity
+
+    # Bara de moduler vi använder, pygame.init() drar även igång ljud och joystick
+    pygame.display.init()
+    pygame.font.init()
+    timer.mark("pygame init")
+
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("Space Cadet")
+    screen.fill((0, 0, 0))
+    pygame.display.flip()
     clock = pygame.time.Clock()
+    timer.mark("window")
 
-    fonts = {
-        "title": pygame.font.SysFont(None, 64),
-        "ui": pygame.font.SysFont(None, 20),
-        "label": pygame.font.SysFont(None, 18),
-    }
+    fonts = LazyFonts()
+    scenes = SceneManager(fonts, (WIDTH, HEIGHT))
 
-    menu = MenuScene(fonts, (WIDTH, HEIGHT))
+    capture = FrameCapture()
+    presenter = Presenter()
+    latency = LatencyTracker()
+    latency_panel = LatencyPanel(fonts["ui"])
+
+    menu = scenes.get("MENU")
+    timer.mark("menu scene")
+    first_frame = True
 
     state = "MENU"
     sandbox = None
     demo = None
 
+    last_input = time.perf_counter()
+    idle = False
+    draw_ms = 0.0
+
     running = True
     while running:
-        dt = clock.tick(FPS) / 1000.0
-
-        for event in pygame.event.get():
+        events = []
+        if idle:
+            event = pygame.event.wait(1000 // IDLE_FPS)
+            if event.type != pygame.NOEVENT:
+                events.append(event)
+            dt = clock.tick() / 1000.0
+        else:
+            dt = clock.tick(FPS) / 1000.0
+        frame_start = time.perf_counter()
+
+        events = coalesce_motion(events + pygame.event.get())
+        if events:
+            last_input = frame_start
+            latency.stamp(events)
+
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
                 break
 
+            # Fönstret har ritats om av systemet, nästa frame måste skickas hel
+            if event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+                presenter.reset()
+
+            # F12 sparar en skärmdump, Shift+F12 spelar in varje frame
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F12:
+                if event.mod & pygame.KMOD_SHIFT:
+                    capture.toggle()
+                else:
+                    capture.screenshot(screen)
+                continue
+
+            # F3 visar latensen från input till skärm per händelsetyp
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                latency_panel.toggle()
+                continue
+
             if state == "MENU":
                 next_state = menu.handle_event(event)
                 if next_state == "QUIT":
@@ -45,11 +143,19 @@ def main():
                     break
 
                 if next_state == "SANDBOX":
-                    sandbox = SandboxScene(fonts, (WIDTH, HEIGHT))
+                    sandbox = scenes.enter("SANDBOX")
+                    # Inspelningar som startas innan första update ska få rätt kärna i huvudet
+                    sandbox.compute_gravity = gravity
+                    if args.scenario:
+                        sandbox.load_scenario(args.scenario)
+                    if args.telemetry:
+                        sandbox.start_telemetry(args.telemetry)
+                    if args.sim_thread:
+                        sandbox.start_sim_thread()
                     state = "SANDBOX"
 
                 elif next_state == "DEMO":
-                    demo = DemoScene(fonts, (WIDTH, HEIGHT))
+                    demo = scenes.enter("DEMO")
                     state = "DEMO"
 
             elif state == "SANDBOX":
@@ -73,18 +179,68 @@ def main():
 
         if state == "MENU":
             menu.update(dt)
-            menu.draw(screen)
-
         elif state == "SANDBOX":
-            sandbox.update(dt, compute_gravity)
-            sandbox.draw(screen)
-
+            sandbox.update(dt, gravity)
         elif state == "DEMO":
             demo.update(dt)
-            demo.draw(screen)
-
-        pygame.display.flip()
 
+        # Uppskjutet arbete körs före draw så att resultatet syns i samma frame,
+        # med det som blir kvar av budgeten när förra framens draw räknats bort
+        scene = {"MENU": menu, "SANDBOX": sandbox, "DEMO": demo}[state]
+        scheduler = getattr(scene, "scheduler", None)
+        job_ms = 0.0
+        if scheduler is not None:
+            scheduler.run(1000.0 / FPS - (time.perf_counter() - frame_start) * 1000.0 - draw_ms)
+            job_ms = scheduler.last_ms
+
+        draw_start = time.perf_counter()
+        scene.draw(screen)
+
+        capture.capture_frame(screen)
+        if capture.recording:
+            label = fonts["ui"].render(f"REC {capture.frame_index} frames   dropped {capture.dropped}", True, (255, 110, 110))
+            screen.blit(label, (WIDTH - label.get_width() - 16, HEIGHT - label.get_height() - 12))
+
+        latency_panel.draw(screen, latency, (WIDTH - latency_panel.width - 16, HEIGHT - 240))
+
+        # Scener utan animating() räknas som att de alltid rör sig, som menyn
+        animating = getattr(scene, "animating", None)
+        still = animating is not None and not animating() and not capture.recording
+        # En frame som inte ändrade något på skärmen visar inte heller inputen,
+        # händelserna väntar då kvar till nästa frame som faktiskt skickas
+        if presenter.present(screen, partial=still):
+            latency.presented()
+            if state == "SANDBOX" and latency.last_mask:
+                sandbox.note_input(latency.last_mask, latency.last_ms)
+        else:
+            latency.skipped()
+
+        now = time.perf_counter()
+        draw_ms = (now - draw_start) * 1000.0
+        if state == "SANDBOX" and not idle:
+            # Arbetstiden utan väntan i clock.tick och utan de uppskjutna jobben,
+            # det är den som kvalitetsnivån ska få att rymmas i budgeten
+            sandbox.quality.observe((now - frame_start) * 1000.0 - job_ms)
+
+        idle = still and not args.no_idle and time.perf_counter() - last_input > IDLE_AFTER_S
+
+        if state == "MENU" and not first_frame:
+            # Ett steg med det som är kvar innan clock.tick börjar vänta
+            scenes.prewarm_step(1000.0 / FPS - (time.perf_counter() - frame_start) * 1000.0)
+
+        if first_frame:
+            first_frame = False
+            timer.mark("first frame")
+            if args.startup_times:
+                print(timer.report())
+
+    capture.close()
+    if sandbox is not None:
+        sandbox.stop_sim_thread()
+        sandbox.stop_telemetry()
+    close = getattr(gravity, "close", None)
+    if close is not None:
+        close()
     pygame.quit()
     sys.exit()
 
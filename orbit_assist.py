@@ -1,3 +1,4 @@
+import numpy as np
 import pygame
 
 
@@ -35,12 +36,13 @@ def classify_orbit(pos, vel, stars, G=1.0, softening=1200.0):
     return "BOUND" if eps < 0 else "ESCAPE"
 
 
-def predict_orbit(start_pos, start_vel, stars, steps=400, dt=0.06, G=1.0, softening=1200.0):
+def iter_predict_orbit(start_pos, start_vel, stars, steps=400, dt=0.06, G=1.0, softening=1200.0, chunk=50):
+    # Ger banan hittills efter var chunk:e steg, så att en lång förutsägelse kan delas på flera frames
     pos = pygame.Vector2(start_pos)
     vel = pygame.Vector2(start_vel)
 
     pts = []
-    for _ in range(steps):
+    for i in range(steps):
         acc = pygame.Vector2(0, 0)
 
         for s in stars:
@@ -60,9 +62,84 @@ def predict_orbit(start_pos, start_vel, stars, steps=400, dt=0.06, G=1.0, soften
         pos += vel * dt
         pts.append(pos.copy())
 
+        if (i + 1) % chunk == 0 or i + 1 == steps:
+            yield pts
+
+
+def predict_orbit(start_pos, start_vel, stars, steps=400, dt=0.06, G=1.0, softening=1200.0):
+    pts = []
+    for pts in iter_predict_orbit(start_pos, start_vel, stars, steps, dt, G, softening, chunk=max(1, steps)):
+        pass
     return pts
 
 
+def star_arrays(stars):
+    pos = np.array([(s.pos.x, s.pos.y) for s in stars], dtype=np.float64).reshape(-1, 2)
+    mass = np.array([s.mass for s in stars], dtype=np.float64)
+    return pos, mass
+
+
+def predict_orbits(
+    start_pos,
+    start_vel,
+    stars,
+    steps=400,
+    dt=0.06,
+    G=1.0,
+    softening=1200.0,
+    escape_distance=None,
+    stop_on_impact=False,
+):
+    vel = np.array(start_vel, dtype=np.float64).reshape(-1, 2)
+    pos = np.empty_like(vel)
+    pos[:] = np.asarray(start_pos, dtype=np.float64).reshape(-1, 2)
+
+    star_pos, star_mass = star_arrays(stars)
+    star_radius = np.array([getattr(s, "radius", 0.0) for s in stars], dtype=np.float64)
+    gm = G * star_mass
+    center = star_pos[0] if len(star_pos) else pos.mean(axis=0)
+
+    terminate = escape_distance is not None or stop_on_impact
+    out = np.full((len(pos), steps, 2), np.nan) if terminate else np.empty((len(pos), steps, 2))
+
+    # Banor som kraschat eller rymt slutar integreras, resten av raden blir NaN
+    alive = np.arange(len(pos))
+
+    for i in range(steps):
+        d = star_pos[None, :, :] - pos[:, None, :]
+        dist_sq = d[..., 0] * d[..., 0] + d[..., 1] * d[..., 1] + softening
+        k = gm / (dist_sq * np.sqrt(dist_sq))
+        vel[:, 0] += (d[..., 0] * k).sum(axis=1) * dt
+        vel[:, 1] += (d[..., 1] * k).sum(axis=1) * dt
+        pos += vel * dt
+        out[alive, i] = pos
+
+        if not terminate:
+            continue
+
+        keep = np.ones(len(pos), dtype=bool)
+        if escape_distance is not None:
+            off = pos - center
+            keep &= off[:, 0] * off[:, 0] + off[:, 1] * off[:, 1] < escape_distance * escape_distance
+        if stop_on_impact and len(star_pos):
+            d = star_pos[None, :, :] - pos[:, None, :]
+            hit = d[..., 0] * d[..., 0] + d[..., 1] * d[..., 1] <= star_radius * star_radius
+            keep &= ~hit.any(axis=1)
+
+        if not keep.all():
+            alive = alive[keep]
+            pos = pos[keep]
+            vel = vel[keep]
+            if len(alive) == 0:
+                break
+
+    return out
+
+
+def trajectory_lengths(traj):
+    return (~np.isnan(traj[..., 0])).sum(axis=1)
+
+
 def draw_faded_orbit(screen, overlay, points, camera_offset, zoom, color):
     if len(points) < 2:
         return
@@ -0,0 +1,182 @@
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+from pygame import Vector2
+
+from physics import G, SOFTENING, compute_gravity
+
+# Under så här många kroppar kostar processbytet mer än det ger
+PARALLEL_MIN_BODIES = 384
+# Max antal element i (rader x kroppar)-matrisen per delsteg
+CHUNK_ELEMENTS = 1 << 20
+START_CAPACITY = 1024
+# fork kopierar bara den anropande tråden, med SDL- och arbetstrådar igång kan barnet
+# ärva lås som aldrig släpps. forkserver finns inte på Windows, där blir det spawn
+POOL_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# Bilagda minnesblock per arbetsprocess, nyckel är blockets namn
+_attached = {}
+
+
+def _attach(names):
+    # Blocken byts bara när kapaciteten växer, då släpps de gamla
+    if names not in _attached:
+        for blocks in _attached.values():
+            for shm in blocks:
+                shm.close()
+        _attached.clear()
+        # Arbetsprocesserna delar huvudprocessens resource_tracker, bara ägaren tar bort blocken
+        _attached[names] = tuple(shared_memory.SharedMemory(name=name) for name in names)
+    return _attached[names]
+
+
+def gravity_rows(bodies, out, lo, hi, G=G, softening=SOFTENING, potential=False):
+    # bodies är (n, 3) med x, y, massa, raderna lo..hi av kraftmatrisen summeras till out
+    # Med potential fylls out[:, 2] med radens halva potentiella energi, summan är systemets
+    pos = bodies[:, :2]
+    mass = bodies[:, 2]
+    chunk = max(1, CHUNK_ELEMENTS // max(1, len(bodies)))
+
+    for a in range(lo, hi, chunk):
+        b = min(hi, a + chunk)
+        dx = pos[None, :, 0] - pos[a:b, None, 0]
+        dy = pos[None, :, 1] - pos[a:b, None, 1]
+        dist_sq = dx * dx + dy * dy + softening
+        inv_dist = 1.0 / np.sqrt(dist_sq)
+        m_inv = mass[None, :] * inv_dist
+        k = m_inv / dist_sq
+        scale = G * mass[a:b]
+        out[a:b, 0] = (dx * k).sum(axis=1) * scale
+        out[a:b, 1] = (dy * k).sum(axis=1) * scale
+        if potential:
+            # Diagonalen är kroppen mot sig själv, m / sqrt(softening), och dras bort
+            self_term = mass[a:b] / np.sqrt(softening)
+            out[a:b, 2] = -0.5 * scale * (m_inv.sum(axis=1) - self_term)
+
+
+def _run_tile(job):
+    names, capacity, n, lo, hi, g, softening, potential = job
+    shm_in, shm_out = _attach(names)
+    bodies = np.ndarray((capacity, 3), dtype=np.float64, buffer=shm_in.buf)[:n]
+    out = np.ndarray((capacity, 3), dtype=np.float64, buffer=shm_out.buf)
+    gravity_rows(bodies, out, lo, hi, g, softening, potential)
+    return hi - lo
+
+
+def _to_array(bodies, out):
+    n = len(bodies)
+    out[:n] = np.array([c for b in bodies for c in (b.pos.x, b.pos.y, b.mass)], dtype=np.float64).reshape(n, 3)
+
+
+def numpy_gravity(bodies, softening=SOFTENING, stats=None):
+    # Samma kärna som arbetsprocesserna, i den egna processen
+    n = len(bodies)
+    if n < 2:
+        if stats is not None:
+            stats["potential"] = 0.0
+        return [Vector2(0, 0) for _ in bodies]
+    arr = np.empty((n, 3), dtype=np.float64)
+    _to_array(bodies, arr)
+    out = np.empty((n, 3), dtype=np.float64)
+    gravity_rows(arr, out, 0, n, G, softening, stats is not None)
+    if stats is not None:
+        stats["potential"] = float(out[:, 2].sum())
+    return [Vector2(x, y) for x, y in out[:, :2].tolist()]
+
+
+numpy_gravity.kernel = "numpy"
+
+
+def gravity_for(kernel):
+    # Kärnan en inspelning gjordes med, resultatet beror inte på antalet processer
+    return numpy_gravity if kernel == "numpy" else compute_gravity
+
+
+class ParallelGravity:
+    kernel = "numpy"
+
+    def __init__(self, workers=None, G=G, softening=SOFTENING, min_bodies=PARALLEL_MIN_BODIES):
+        self.workers = workers or os.cpu_count() or 1
+        self.G = G
+        self.softening = softening
+        self.min_bodies = min_bodies
+        self._pool = None
+        self._in = None
+        self._out = None
+        self.bodies = None
+        self.forces = None
+        self.capacity = 0
+        self.parallel_calls = 0
+
+    def start(self):
+        # Anropas innan några trådar startats, annars skapas poolen första gången den behövs
+        if self._pool is None and self.workers > 1:
+            context = multiprocessing.get_context(POOL_START_METHOD)
+            if POOL_START_METHOD == "forkserver":
+                # Servern importerar kärnan en gång, processerna som forkas från den har den redan
+                context.set_forkserver_preload([__name__])
+            self._pool = context.Pool(self.workers)
+
+    def _ensure_capacity(self, n):
+        if n <= self.capacity:
+            return
+        self._release()
+        capacity = max(START_CAPACITY, self.capacity)
+        while capacity < n:
+            capacity *= 2
+
+        # Positioner och massor in, krafter och potential ut, inget av det skickas genom pickle
+        self._in = shared_memory.SharedMemory(create=True, size=capacity * 3 * 8)
+        self._out = shared_memory.SharedMemory(create=True, size=capacity * 3 * 8)
+        self.bodies = np.ndarray((capacity, 3), dtype=np.float64, buffer=self._in.buf)
+        self.forces = np.ndarray((capacity, 3), dtype=np.float64, buffer=self._out.buf)
+        self.capacity = capacity
+
+    def _release(self):
+        for shm in (self._in, self._out):
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        self._in = self._out = None
+        self.bodies = self.forces = None
+
+    def _tiles(self, n):
+        # Fler rader än processer så att en långsam process inte håller uppe de andra
+        count = min(n, self.workers * 2)
+        edges = np.linspace(0, n, count + 1).astype(int)
+        return [(int(lo), int(hi)) for lo, hi in zip(edges[:-1], edges[1:]) if hi > lo]
+
+    def compute(self, n, potential=False):
+        if n < self.min_bodies or self.workers <= 1:
+            gravity_rows(self.bodies[:n], self.forces, 0, n, self.G, self.softening, potential)
+            return self.forces[:n]
+
+        self.start()
+
+        names = (self._in.name, self._out.name)
+        jobs = [(names, self.capacity, n, lo, hi, self.G, self.softening, potential) for lo, hi in self._tiles(n)]
+        self._pool.map(_run_tile, jobs)
+        self.parallel_calls += 1
+        return self.forces[:n]
+
+    def __call__(self, bodies, stats=None):
+        n = len(bodies)
+        if n < 2:
+            if stats is not None:
+                stats["potential"] = 0.0
+            return [Vector2(0, 0) for _ in bodies]
+        self._ensure_capacity(n)
+        _to_array(bodies, self.bodies)
+        out = self.compute(n, stats is not None)
+        if stats is not None:
+            stats["potential"] = float(out[:, 2].sum())
+        return [Vector2(x, y) for x, y in out[:, :2].tolist()]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        self._release()
@@ -0,0 +1,128 @@
+import numpy as np
+import pygame
+
+from physics import circular_speed
+
+# Max antal element i (partiklar x kroppar)-matrisen per delsteg
+CHUNK_ELEMENTS = 1 << 20
+
+
+class ParticleField:
+    def __init__(self):
+        self.pos = np.zeros((0, 2), dtype=np.float64)
+        self.vel = np.zeros((0, 2), dtype=np.float64)
+        self.color = np.zeros((0, 3), dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.pos)
+
+    def clear(self):
+        self.pos = self.pos[:0]
+        self.vel = self.vel[:0]
+        self.color = self.color[:0]
+
+    def add(self, pos, vel, color):
+        pos = np.asarray(pos, dtype=np.float64).reshape(-1, 2)
+        vel = np.asarray(vel, dtype=np.float64).reshape(-1, 2)
+        color = np.broadcast_to(np.asarray(color, dtype=np.uint8), (len(pos), 3))
+        self.pos = np.concatenate([self.pos, pos])
+        self.vel = np.concatenate([self.vel, vel])
+        self.color = np.concatenate([self.color, color])
+
+    def _keep(self, mask):
+        self.pos = self.pos[mask]
+        self.vel = self.vel[mask]
+        self.color = self.color[mask]
+
+    def step(self, dt, bodies, G, softening):
+        n = len(self.pos)
+        massive = [b for b in bodies if b.mass > 0]
+        if n == 0 or not massive:
+            if n:
+                self.pos += self.vel * dt
+            return
+
+        src = np.array([(b.pos.x, b.pos.y) for b in massive], dtype=np.float64)
+        gm = G * np.array([b.mass for b in massive], dtype=np.float64)
+
+        chunk = max(1, CHUNK_ELEMENTS // len(massive))
+        for lo in range(0, n, chunk):
+            p = self.pos[lo:lo + chunk]
+            dx = src[None, :, 0] - p[:, None, 0]
+            dy = src[None, :, 1] - p[:, None, 1]
+            dist_sq = dx * dx + dy * dy + softening
+            k = gm / (dist_sq * np.sqrt(dist_sq))
+            v = self.vel[lo:lo + chunk]
+            v[:, 0] += (dx * k).sum(axis=1) * dt
+            v[:, 1] += (dy * k).sum(axis=1) * dt
+
+        self.pos += self.vel * dt
+
+    def absorb(self, stars):
+        if not len(self.pos) or not stars:
+            return 0
+
+        hit = np.zeros(len(self.pos), dtype=bool)
+        for s in stars:
+            dx = self.pos[:, 0] - s.pos.x
+            dy = self.pos[:, 1] - s.pos.y
+            hit |= dx * dx + dy * dy <= s.radius * s.radius
+
+        count = int(hit.sum())
+        if count:
+            self._keep(~hit)
+        return count
+
+    def remove_far(self, center, despawn_distance):
+        if not len(self.pos) or center is None:
+            return 0
+
+        dx = self.pos[:, 0] - center.x
+        dy = self.pos[:, 1] - center.y
+        keep = dx * dx + dy * dy < despawn_distance * despawn_distance
+
+        count = len(keep) - int(keep.sum())
+        if count:
+            self._keep(keep)
+        return count
+
+    def draw(self, screen, camera_offset, zoom):
+        if not len(self.pos):
+            return
+
+        w, h = screen.get_size()
+        sx = ((self.pos[:, 0] - camera_offset.x) * zoom).astype(np.int32)
+        sy = ((self.pos[:, 1] - camera_offset.y) * zoom).astype(np.int32)
+        vis = (sx >= 0) & (sy >= 0) & (sx < w) & (sy < h)
+        if not vis.any():
+            return
+
+        pixels = pygame.surfarray.pixels3d(screen)
+        pixels[sx[vis], sy[vis]] = self.color[vis]
+        del pixels
+
+
+def scatter_ring(center, r_in, r_out, count, mu, softening, rng, color, jitter=24, sense=-1.0):
+    r = np.sqrt(rng.uniform(r_in * r_in, r_out * r_out, count))
+    ang = rng.uniform(0.0, 2.0 * np.pi, count)
+    c = np.cos(ang)
+    s = np.sin(ang)
+
+    v = circular_speed(mu, r, softening)
+    pos = np.stack([center.x + r * c, center.y + r * s], axis=1)
+    vel = np.stack([-s * v * sense, c * v * sense], axis=1)
+
+    base = np.asarray(color, dtype=np.int16)
+    cols = np.clip(base + rng.integers(-jitter, jitter + 1, (count, 3)), 0, 255).astype(np.uint8)
+    return pos, vel, cols
+
+
+def scatter_debris(pos, vel, count, speed, rng, color, jitter=30):
+    ang = rng.uniform(0.0, 2.0 * np.pi, count)
+    spd = speed * np.sqrt(rng.uniform(0.0, 1.0, count))
+    p = np.stack([pos.x + rng.normal(0.0, 2.0, count), pos.y + rng.normal(0.0, 2.0, count)], axis=1)
+    v = np.stack([vel.x + np.cos(ang) * spd, vel.y + np.sin(ang) * spd], axis=1)
+
+    base = np.asarray(color, dtype=np.int16)
+    cols = np.clip(base + rng.integers(-jitter, jitter + 1, (count, 3)), 0, 255).astype(np.uint8)
+    return p, v, cols
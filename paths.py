@@ -0,0 +1,13 @@
+import os
+
+DATA_DIR_ENV = "SPACE_CADET_HOME"
+
+
+def data_dir():
+    path = os.environ.get(DATA_DIR_ENV) or os.path.join(os.path.expanduser("~"), ".space_cadet")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def data_path(*parts):
+    return os.path.join(data_dir(), *parts)
@@ -5,8 +5,15 @@ G = 100.0
 SOFTENING = 1000.0
 
 
-def compute_gravity(bodies):
+def circular_speed(mu, r, softening=SOFTENING):
+    # Cirkelhastigheten i den mjukade kraften nedan, fungerar för både tal och arrayer
+    return (mu * r * r / (r * r + softening) ** 1.5) ** 0.5
+
+
+def compute_gravity(bodies, softening=SOFTENING, stats=None):
     forces = [Vector2(0, 0) for _ in bodies]
+    # Potentialen faller ut av samma par, -force_mag * dist, så den kostar nästan inget
+    potential = 0.0
 
     for i in range(len(bodies)):
         for j in range(i + 1, len(bodies)):
@@ -14,7 +21,7 @@ def compute_gravity(bodies):
             b = bodies[j]
 
             direction = b.pos - a.pos
-            dist_sq = direction.length_squared() + SOFTENING
+            dist_sq = direction.length_squared() + softening
             dist = math.sqrt(dist_sq)
 
             if dist == 0:
@@ -25,5 +32,24 @@ def compute_gravity(bodies):
 
             forces[i] += force
             forces[j] -= force
+            potential -= force_mag * dist
 
+    if stats is not None:
+        stats["potential"] = potential
     return forces
+
+
+def total_energy(bodies, softening=SOFTENING):
+    # Potentialen hör ihop med den mjukade kraften ovan, -G m1 m2 / sqrt(r² + softening)
+    kinetic = 0.0
+    potential = 0.0
+
+    for i in range(len(bodies)):
+        a = bodies[i]
+        kinetic += 0.5 * a.mass * a.vel.length_squared()
+        for j in range(i + 1, len(bodies)):
+            b = bodies[j]
+            dist = math.sqrt((b.pos - a.pos).length_squared() + softening)
+            potential -= G * a.mass * b.mass / dist
+
+    return kinetic + potential
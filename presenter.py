@@ -0,0 +1,92 @@
+import numpy as np
+import pygame
+
+# Skärmen jämförs med förra framen i rutor, bara ändrade rutor skickas till fönstret
+DIRTY_TILE = 64
+# Ändras mer än så här stor del av ytan blir en hel flip billigare än många rektanglar
+DIRTY_MAX_FRACTION = 0.35
+
+
+class Presenter:
+    def __init__(self, tile=DIRTY_TILE, max_fraction=DIRTY_MAX_FRACTION):
+        self.tile = tile
+        self.max_fraction = max_fraction
+        self._last = None
+
+        self.full = 0
+        self.partial = 0
+        self.skipped = 0
+        self.last_rects = []
+
+    def reset(self):
+        self._last = None
+
+    def _frame(self, screen):
+        # Rå rader i så breda heltal som pitch och rutbredd tillåter, jämförelsen går
+        # mycket fortare mot den sammanhängande bufferten än via surfarray.pixels2d
+        pitch = screen.get_pitch()
+        step = self.tile * screen.get_bytesize()
+        itemsize = next(n for n in (8, 4, 2, 1) if pitch % n == 0 and step % n == 0)
+        view = screen.get_buffer()
+        rows = np.frombuffer(view, dtype=f"u{itemsize}").reshape(screen.get_height(), pitch // itemsize)
+        return view, rows, step // itemsize
+
+    def _dirty_rects(self, rows, per_tile, size):
+        w, h = size
+        t = self.tile
+        changed = rows != self._last
+        # Rutvis "något ändrat", först band om t rader och sedan rutor längs x
+        tiles = np.logical_or.reduceat(changed, np.arange(0, h, t), axis=0)
+        tiles = np.logical_or.reduceat(tiles, np.arange(0, rows.shape[1], per_tile), axis=1)
+        tiles = tiles[:, :(w + t - 1) // t]
+        if tiles.mean() > self.max_fraction:
+            return None
+
+        # Intilliggande rutor på samma rad slås ihop till en rektangel
+        rects = []
+        for ty, row in enumerate(tiles):
+            tx = 0
+            while tx < len(row):
+                if not row[tx]:
+                    tx += 1
+                    continue
+                start = tx
+                while tx < len(row) and row[tx]:
+                    tx += 1
+                rects.append(pygame.Rect(start * t, ty * t, (tx - start) * t, t).clip(0, 0, w, h))
+        return rects
+
+    def present(self, screen, partial=False):
+        # partial bara när scenen står still, då är skillnaden mot förra framen liten.
+        # Falskt tillbaka när ingenting skickades till fönstret
+        if not partial:
+            self._last = None
+            self.last_rects = []
+            self.full += 1
+            pygame.display.flip()
+            return True
+
+        view, rows, per_tile = self._frame(screen)
+        if self._last is None or self._last.shape != rows.shape or self._last.dtype != rows.dtype:
+            rects = None
+            self._last = rows.copy()
+        else:
+            rects = self._dirty_rects(rows, per_tile, screen.get_size())
+            if rects is None or rects:
+                np.copyto(self._last, rows)
+        # Ytan är låst så länge bufferten lever
+        del rows, view
+
+        if rects is None:
+            self.last_rects = []
+            self.full += 1
+            pygame.display.flip()
+            return True
+        if rects:
+            self.last_rects = rects
+            self.partial += 1
+            pygame.display.update(rects)
+            return True
+        self.last_rects = []
+        self.skipped += 1
+        return False
@@ -0,0 +1,94 @@
+from collections import deque
+
+import numpy as np
+
+# Från högsta till lägsta nivå, varje steg neråt ger lite bättre bildtakt för lite sämre bild
+QUALITY_LEVELS = (
+    {"name": "Ultra", "trail_max": 200, "trail_step": 1, "star_density": 1.0, "predict_steps": 400, "labels": True, "lod_px": 0.0, "render_scale": 1.0},
+    {"name": "High", "trail_max": 150, "trail_step": 1, "star_density": 0.75, "predict_steps": 300, "labels": True, "lod_px": 1.5, "render_scale": 1.0},
+    {"name": "Medium", "trail_max": 100, "trail_step": 2, "star_density": 0.5, "predict_steps": 200, "labels": True, "lod_px": 2.5, "render_scale": 0.85},
+    {"name": "Low", "trail_max": 60, "trail_step": 3, "star_density": 0.25, "predict_steps": 120, "labels": False, "lod_px": 3.5, "render_scale": 0.7},
+    {"name": "Minimal", "trail_max": 30, "trail_step": 4, "star_density": 0.0, "predict_steps": 80, "labels": False, "lod_px": 5.0, "render_scale": 0.5},
+)
+
+FRAME_BUDGET_MS = 1000.0 / 60.0
+# Så många frames per bedömning, och vilken percentil av dem som räknas
+WINDOW = 30
+PERCENTILE = 90
+# Hysteres: sänk direkt över budget, höj först efter flera fönster med god marginal
+DOWNGRADE_AT = 1.0
+UPGRADE_AT = 0.6
+UPGRADE_WINDOWS = 4
+# Fönster att vänta efter ett byte innan nästa, så att den nya nivån hinner mätas
+COOLDOWN_WINDOWS = 2
+
+
+class QualityGovernor:
+    def __init__(self, budget_ms=FRAME_BUDGET_MS, window=WINDOW, levels=QUALITY_LEVELS):
+        self.budget_ms = budget_ms
+        self.window = window
+        self.levels = levels
+        self.auto = True
+        self.level = 0
+
+        self._samples = deque(maxlen=window)
+        self._good = 0
+        self._cooldown = 0
+        self.last_ms = 0.0
+        self.changes = 0
+
+    @property
+    def settings(self):
+        return self.levels[self.level]
+
+    @property
+    def name(self):
+        return self.settings["name"]
+
+    def set_level(self, level):
+        level = max(0, min(len(self.levels) - 1, level))
+        if level != self.level:
+            self.level = level
+            self.changes += 1
+        self._samples.clear()
+        self._good = 0
+        self._cooldown = COOLDOWN_WINDOWS
+
+    def cycle(self):
+        # Auto -> varje fast nivå uppifrån och ner -> Auto
+        if self.auto:
+            self.auto = False
+            self.set_level(0)
+        elif self.level == len(self.levels) - 1:
+            self.auto = True
+            self._samples.clear()
+        else:
+            self.set_level(self.level + 1)
+
+    def label(self):
+        return f"Auto ({self.name})" if self.auto else self.name
+
+    def observe(self, frame_ms):
+        # frame_ms är arbetstiden för en frame, utan väntan i clock.tick
+        self._samples.append(frame_ms)
+        if not self.auto or len(self._samples) < self.window:
+            return False
+
+        self.last_ms = float(np.percentile(self._samples, PERCENTILE))
+        self._samples.clear()
+        if self._cooldown > 0:
+            self._cooldown -= 1
+            return False
+
+        if self.last_ms > self.budget_ms * DOWNGRADE_AT and self.level < len(self.levels) - 1:
+            self.set_level(self.level + 1)
+            return True
+
+        if self.last_ms < self.budget_ms * UPGRADE_AT:
+            self._good += 1
+            if self._good >= UPGRADE_WINDOWS and self.level > 0:
+                self.set_level(self.level - 1)
+                return True
+        else:
+            self._good = 0
+        return False
@@ -0,0 +1,213 @@
+import math
+
+import numpy as np
+
+from kepler import KeplerOrbit, propagate
+from orbit_assist import _dominant_star
+from physics import circular_speed
+
+PROMOTE_THRESHOLD = 0.002
+DEMOTE_THRESHOLD = 0.004
+CALM_TICKS = 90
+CHECK_SLICES = 8
+# Max skillnad i mjukad gravitation mellan peri- och apoapsis för att en Kepler-bana ska räcka
+SOFTENING_TOLERANCE = 0.004
+# Så många par aktiv-räls räknas åt gången, håller mellanresultaten små vid tusentals kroppar
+RAIL_FORCE_BLOCK = 1 << 16
+
+
+def effective_mu(mu, r, softening):
+    # μ för en Kepler-bana med samma cirkelhastighet som den mjukade kraften vid r
+    return circular_speed(mu, r, softening) ** 2 * r
+
+
+def _on_rails(body):
+    return getattr(body, "orbit", None) is not None
+
+
+class RailsManager:
+    def __init__(self, G, softening):
+        self.G = G
+        self.softening = softening
+        self.enabled = True
+        self._slice = 0
+
+    def split(self, bodies):
+        active = []
+        railed = []
+        for b in bodies:
+            (railed if _on_rails(b) else active).append(b)
+        return active, railed
+
+    def demote(self, body):
+        body.orbit = None
+        body.parent = None
+        body.calm_ticks = 0
+
+    def demote_all(self, bodies):
+        for b in bodies:
+            if _on_rails(b):
+                self.demote(b)
+
+    def add_rail_forces(self, active, forces, railed, stats=None):
+        soft = self.softening
+        potential = 0.0
+        if active and railed:
+            apos = np.array([(a.pos.x, a.pos.y) for a in active], dtype=np.float64)
+            amass = np.array([a.mass for a in active], dtype=np.float64)
+            rpos = np.array([(b.pos.x, b.pos.y) for b in railed], dtype=np.float64)
+            rmass = np.array([b.mass for b in railed], dtype=np.float64)
+
+            block = max(1, RAIL_FORCE_BLOCK // len(railed))
+            for start in range(0, len(active), block):
+                d = rpos[None, :, :] - apos[start:start + block, None, :]
+                dist_sq = d[..., 0] ** 2 + d[..., 1] ** 2 + soft
+                k = self.G * amass[start:start + block, None] * rmass[None, :] / (dist_sq * np.sqrt(dist_sq))
+                f = (d * k[..., None]).sum(axis=1)
+                potential -= float((k * dist_sq).sum())
+                for i, (fx, fy) in enumerate(f.tolist(), start):
+                    forces[i] += (fx, fy)
+
+        if stats is not None:
+            stats["potential"] = stats.get("potential", 0.0) + potential
+
+    def observe(self, active, forces, stars):
+        if not self.enabled:
+            return
+
+        for body, force in zip(active, forces):
+            if body.is_star or body.mass <= 0 or body.user_acc.length_squared() > 0:
+                body.calm_ticks = 0
+                continue
+
+            star = _dominant_star(body.pos, stars)
+            if star is None:
+                body.calm_ticks = 0
+                continue
+
+            dx = star.pos.x - body.pos.x
+            dy = star.pos.y - body.pos.y
+            dist_sq = dx * dx + dy * dy + self.softening
+            k = self.G * star.mass / (dist_sq * math.sqrt(dist_sq))
+            ax, ay = dx * k, dy * k
+
+            px = force.x / body.mass - ax
+            py = force.y / body.mass - ay
+            ratio = math.sqrt((px * px + py * py) / max(1e-18, ax * ax + ay * ay))
+
+            if ratio < PROMOTE_THRESHOLD:
+                body.calm_ticks = getattr(body, "calm_ticks", 0) + 1
+                body.rails_star = star
+            else:
+                body.calm_ticks = 0
+
+    def promote(self, active, sim_time):
+        if not self.enabled:
+            return
+
+        for body in active:
+            if getattr(body, "calm_ticks", 0) < CALM_TICKS:
+                continue
+
+            star = body.rails_star
+            rel = body.pos - star.pos
+            r = rel.length()
+            mu = self.G * star.mass
+            try:
+                orbit = KeplerOrbit(effective_mu(mu, r, self.softening), rel, body.vel - star.vel, sim_time)
+            except ValueError:
+                body.calm_ticks = 0
+                continue
+
+            rp = orbit.a * (1.0 - orbit.e)
+            ra = orbit.a * (1.0 + orbit.e)
+            drift = effective_mu(mu, ra, self.softening) / effective_mu(mu, rp, self.softening) - 1.0
+            if rp <= getattr(star, "radius", 0.0) + body.radius or drift > SOFTENING_TOLERANCE:
+                body.calm_ticks = 0
+                continue
+
+            body.orbit = orbit
+            body.parent = star
+            body.rails_vel = None
+
+    def release_tweaked(self, bodies):
+        # Inspector-tweaks eller thrusters tar kroppen av rälsen
+        for body in bodies:
+            if not _on_rails(body):
+                continue
+            if body.user_acc.length_squared() > 0 or (body.rails_vel is not None and body.vel != body.rails_vel):
+                self.demote(body)
+
+    def advance(self, railed, sim_time, dt):
+        propagate(railed, sim_time)
+        for body in railed:
+            body.rails_vel = body.vel.copy()
+            body.update_trail(dt)
+
+    def check(self, bodies, stars):
+        railed = [i for i, b in enumerate(bodies) if _on_rails(b)]
+        if not railed:
+            return
+
+        self._slice = (self._slice + 1) % CHECK_SLICES
+        idx = railed[self._slice::CHECK_SLICES]
+        if not idx:
+            return
+
+        # Byter kroppen dominerande stjärna går den av rälsen direkt
+        kept = []
+        for i in idx:
+            body = bodies[i]
+            star = body.parent
+            if star not in stars or _dominant_star(body.pos, stars) is not star:
+                self.demote(body)
+            else:
+                kept.append(i)
+        if not kept:
+            return
+
+        index = {id(b): i for i, b in enumerate(bodies)}
+        pos = np.array([(b.pos.x, b.pos.y) for b in bodies], dtype=np.float64)
+        mass = np.array([b.mass for b in bodies], dtype=np.float64)
+        heavy = np.array([bool(getattr(b, "is_star", False)) for b in bodies], dtype=bool)
+        idx = np.array(kept)
+        parent = np.array([index[id(bodies[i].parent)] for i in kept])
+        soft = self.softening
+
+        rel = pos[parent] - pos[idx]
+        r2 = rel[:, 0] ** 2 + rel[:, 1] ** 2
+        dist_sq = r2 + soft
+        dom = self.G * mass[parent] * np.sqrt(r2) / (dist_sq * np.sqrt(dist_sq))
+
+        # Övriga stjärnor är få och räknas alltid med
+        star_idx = np.flatnonzero(heavy)
+        d = pos[None, star_idx, :] - pos[idx, None, :]
+        dist_sq = d[..., 0] ** 2 + d[..., 1] ** 2 + soft
+        k = self.G * mass[star_idx][None, :] / (dist_sq * np.sqrt(dist_sq))
+        k[star_idx[None, :] == parent[:, None]] = 0.0
+        px = (d[..., 0] * k).sum(axis=1)
+        py = (d[..., 1] * k).sum(axis=1)
+
+        # Längre bort än reach kan ingen enskild kropp störa mer än tröskeln. Kandidaterna
+        # hittas med ett svep över kropparna sorterade efter x, alla par i klump
+        light = np.flatnonzero(~heavy)
+        if len(light):
+            with np.errstate(divide="ignore"):
+                reach = np.sqrt(self.G * mass[light].max() / (DEMOTE_THRESHOLD * dom))
+            order = light[np.argsort(pos[light, 0], kind="stable")]
+            xs = pos[order, 0]
+            lo = np.searchsorted(xs, pos[idx, 0] - reach, side="left")
+            counts = np.searchsorted(xs, pos[idx, 0] + reach, side="right") - lo
+            rows = np.repeat(np.arange(len(idx)), counts)
+            cols = order[np.arange(counts.sum()) + np.repeat(lo - (np.cumsum(counts) - counts), counts)]
+
+            d = pos[cols] - pos[idx[rows]]
+            r2 = d[:, 0] ** 2 + d[:, 1] ** 2
+            near = (r2 <= reach[rows] ** 2) & (cols != idx[rows])
+            rows, d, dist_sq = rows[near], d[near], r2[near] + soft
+            k = self.G * mass[cols[near]] / (dist_sq * np.sqrt(dist_sq))
+            px += np.bincount(rows, weights=d[:, 0] * k, minlength=len(idx))
+            py += np.bincount(rows, weights=d[:, 1] * k, minlength=len(idx))
+
+        for row in np.flatnonzero(np.hypot(px, py) > DEMOTE_THRESHOLD * dom).tolist():
+            self.demote(bodies[kept[row]])
@@ -0,0 +1,132 @@
+import argparse
+import math
+import multiprocessing
+import os
+import sys
+import time
+
+import pygame
+
+from parallel_gravity import gravity_for
+from replay import Replay, ReplayPlayer
+from scenes.sandbox import draw_world
+from sim import Simulation, TICK_DT
+from starfield import Starfield
+
+# Spelets vy, --zoom anges i samma skala som i sandboxen
+VIEW_WIDTH = 1920
+# Fler bitar än processer jämnar ut lasten när vissa delar har fler kroppar
+CHUNKS_PER_WORKER = 4
+
+
+def parse_size(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+def parse_point(text):
+    x, y = text.split(",")
+    return float(x), float(y)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Render a Space Cadet replay to numbered PNG frames")
+    parser.add_argument("replay", help="a .screplay file recorded in the sandbox (F6)")
+    parser.add_argument("--out", default="frames", help="output directory")
+    parser.add_argument("--size", type=parse_size, default=(3840, 2160), help="frame size, e.g. 3840x2160")
+    parser.add_argument("--start", type=float, default=0.0, help="first second of the recording to render")
+    parser.add_argument("--end", type=float, default=None, help="last second of the recording to render")
+    parser.add_argument("--step", type=int, default=1, help="simulation ticks per output frame")
+    parser.add_argument("--zoom", type=float, default=1.0, help="zoom as in the sandbox")
+    parser.add_argument("--center", type=parse_point, default=None, help="world point in the middle of the frame, default the first star")
+    parser.add_argument("--no-trails", action="store_true", help="do not draw trails")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of render processes")
+    return parser.parse_args(argv)
+
+
+def _render_chunk(job):
+    path, first, count, opts = job
+    # Ingen skärm behövs, men pygame vill ha en videodrivrutin för ytor
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+    replay = Replay(path)
+    sim = Simulation(replay.size)
+    tick = opts["first_tick"] + first * opts["step"]
+    player = ReplayPlayer(replay, sim, gravity_for(replay.gravity), tick=tick)
+
+    w, h = opts["size"]
+    surface = pygame.Surface((w, h))
+    starfield = Starfield(w, h, count=300 * w * h // (1920 * 1080), seed=1337)
+    zoom = opts["zoom"]
+    camera = pygame.Vector2(opts["center"]) - pygame.Vector2(w, h) / (2 * zoom)
+
+    for i in range(first, first + count):
+        draw_world(surface, sim, starfield, camera, zoom, opts["trails"])
+        pygame.image.save(surface, os.path.join(opts["out"], f"frame_{i:06d}.png"))
+
+        for _ in range(opts["step"]):
+            if player.done:
+                break
+            player.step()
+
+    replay.close()
+    return count
+
+
+def plan_chunks(frames, step, keyframe_interval, workers):
+    # Bitarna börjar helst på en keyframe så att ingen behöver simulera ikapp
+    per_chunk = max(1, math.ceil(frames / (workers * CHUNKS_PER_WORKER)))
+    aligned = max(1, keyframe_interval // step)
+    per_chunk = math.ceil(per_chunk / aligned) * aligned
+
+    chunks = []
+    for first in range(0, frames, per_chunk):
+        chunks.append((first, min(per_chunk, frames - first)))
+    return chunks
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    replay = Replay(args.replay)
+
+    first_tick = replay.start_tick + int(round(args.start / TICK_DT))
+    last_tick = replay.end_tick if args.end is None else min(replay.end_tick, replay.start_tick + int(round(args.end / TICK_DT)))
+    frames = max(0, (last_tick - first_tick) // args.step + 1)
+
+    center = args.center
+    if center is None:
+        _, snap = replay.keyframe_before(first_tick)
+        stars = [b for b in snap.bodies() if b.is_star]
+        center = (stars[0].pos.x, stars[0].pos.y) if stars else (replay.size[0] / 2, replay.size[1] / 2)
+        snap.close()
+    keyframe_interval = replay.keyframe_interval
+    replay.close()
+
+    os.makedirs(args.out, exist_ok=True)
+    opts = {
+        "out": args.out,
+        "size": args.size,
+        "step": args.step,
+        "zoom": args.zoom * args.size[0] / VIEW_WIDTH,
+        "center": center,
+        "trails": not args.no_trails,
+        "first_tick": first_tick,
+    }
+
+    chunks = plan_chunks(frames, args.step, keyframe_interval, args.workers)
+    jobs = [(args.replay, first, count, opts) for first, count in chunks]
+
+    t0 = time.perf_counter()
+    done = 0
+    with multiprocessing.Pool(args.workers) as pool:
+        for count in pool.imap_unordered(_render_chunk, jobs):
+            done += count
+            print(f"\r{done}/{frames} frames", end="", file=sys.stderr)
+    elapsed = time.perf_counter() - t0
+
+    realtime = frames * args.step * TICK_DT
+    print(f"\nRendered {frames} frames to {args.out} in {elapsed:.1f}s ({realtime / max(elapsed, 1e-9):.2f}x realtime, {args.workers} workers)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import pygame
+
+# Världslagrets upplösning relativt skärmen, HUD och menyer ritas alltid i full upplösning
+RENDER_SCALES = (1.0, 0.85, 0.75, 0.6, 0.5)
+MIN_SCALE = 0.5
+
+
+class WorldLayer:
+    def __init__(self, size, auto=False):
+        self.size = size
+        self.auto = auto
+        self.scale = 1.0
+        self._surface = None
+
+    def cycle(self, has_auto=True):
+        # Auto -> 100% -> ... -> 50% -> Auto, utan governor hoppas Auto över
+        if self.auto:
+            self.auto = False
+            self.scale = RENDER_SCALES[0]
+            return
+        smaller = [s for s in RENDER_SCALES if s < self.scale - 1e-6]
+        if smaller:
+            self.scale = smaller[0]
+        elif has_auto:
+            self.auto = True
+        else:
+            self.scale = RENDER_SCALES[0]
+
+    def label(self, auto_scale=None):
+        if self.auto:
+            return f"Auto ({int(round(self.current(auto_scale) * 100))}%)"
+        return f"{int(round(self.scale * 100))}%"
+
+    def current(self, auto_scale=None):
+        scale = auto_scale if self.auto and auto_scale is not None else self.scale
+        return max(MIN_SCALE, min(1.0, scale))
+
+    def target(self, screen, scale):
+        # Full skala ritar direkt på skärmen, annars på en mindre yta som återanvänds
+        if scale >= 1.0:
+            return screen
+        w, h = self.size
+        size = (max(1, int(w * scale)), max(1, int(h * scale)))
+        if self._surface is None or self._surface.get_size() != size:
+            self._surface = pygame.Surface(size, 0, screen)
+        return self._surface
+
+    def present(self, screen, target):
+        if target is not screen:
+            pygame.transform.scale(target, screen.get_size(), screen)
@@ -0,0 +1,227 @@
+import bisect
+import json
+import os
+import queue
+import struct
+import threading
+
+import snapshot
+from sim import TICK_DT
+
+MAGIC = b"SCREPLAY"
+VERSION = 1
+# En full keyframe var 5:e sekund, sökning simulerar som mest så här många tick
+KEYFRAME_INTERVAL = 300
+# Kommandon samlas ihop och lämnas till skrivtråden i klump
+FLUSH_RECORDS = 64
+
+KEYFRAME = 1
+COMMAND = 2
+INDEX = 3
+
+_HEADER = struct.Struct("<8sII")
+_RECORD = struct.Struct("<BQI")
+_FOOTER = struct.Struct("<Q8s")
+
+
+class ReplayWriter:
+    def __init__(self, path, sim, keyframe_interval=KEYFRAME_INTERVAL, gravity="python"):
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.start_tick = sim.tick
+        self.end_tick = sim.tick
+        self.last_error = None
+
+        self._pending = []
+        self._queue = queue.Queue()
+        self._keyframes = []
+        self._commands = []
+
+        self._file = open(path, "wb")
+        head = json.dumps({
+            "tick_dt": TICK_DT,
+            "start_tick": self.start_tick,
+            "keyframe_interval": keyframe_interval,
+            "size": [sim.w, sim.h],
+            # Kärnorna avrundar olika, uppspelningen måste räkna gravitationen likadant
+            "gravity": gravity,
+        }).encode("utf-8")
+        self._file.write(_HEADER.pack(MAGIC, VERSION, len(head)) + head)
+
+        self._thread = threading.Thread(target=self._run, name="replay-writer", daemon=True)
+        self._thread.start()
+
+        self._last_keyframe = None
+        self.keyframe(sim)
+
+    def _write(self, kind, tick, payload):
+        self._file.write(_RECORD.pack(kind, tick, len(payload)))
+        self._file.write(payload)
+
+    def _run(self):
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                break
+            try:
+                for kind, tick, item in batch:
+                    if kind == KEYFRAME:
+                        # Kodningen av tillståndet sker här, inte i spelloopen
+                        self._keyframes.append((tick, self._file.tell()))
+                        self._write(KEYFRAME, tick, snapshot.encode(item))
+                    else:
+                        self._commands.append((tick, item))
+                        self._write(COMMAND, tick, json.dumps(item).encode("utf-8"))
+            except OSError as e:
+                self.last_error = e
+
+    def _flush(self):
+        if self._pending:
+            self._queue.put(self._pending)
+            self._pending = []
+
+    def command(self, tick, command):
+        self._pending.append((COMMAND, tick, command))
+        if len(self._pending) >= FLUSH_RECORDS:
+            self._flush()
+
+    def keyframe(self, sim):
+        self._last_keyframe = sim.tick
+        self._pending.append((KEYFRAME, sim.tick, snapshot.capture(sim)))
+        self._flush()
+
+    def after_tick(self, sim):
+        self.end_tick = sim.tick
+        if sim.tick - self._last_keyframe >= self.keyframe_interval:
+            self.keyframe(sim)
+
+    def close(self):
+        self._flush()
+        self._queue.put(None)
+        self._thread.join()
+
+        index = json.dumps({
+            "end_tick": self.end_tick,
+            "keyframes": self._keyframes,
+            "commands": self._commands,
+        }).encode("utf-8")
+        offset = self._file.tell()
+        self._write(INDEX, self.end_tick, index)
+        self._file.write(_FOOTER.pack(offset, MAGIC))
+        self._file.close()
+
+
+class Replay:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+
+        head = self._file.read(_HEADER.size)
+        if len(head) < _HEADER.size:
+            raise ValueError("truncated replay")
+        magic, version, head_len = _HEADER.unpack(head)
+        if magic != MAGIC:
+            raise ValueError("not a replay file")
+        if version > VERSION:
+            raise ValueError(f"replay version {version} is newer than supported ({VERSION})")
+
+        info = json.loads(self._file.read(head_len).decode("utf-8"))
+        self.start_tick = info["start_tick"]
+        self.keyframe_interval = info["keyframe_interval"]
+        # Stjärnan i "clear"/"demo" placeras mitt i den här ytan
+        self.size = tuple(info.get("size", (1920, 1080)))
+        self.gravity = info.get("gravity", "python")
+        self._data_start = _HEADER.size + head_len
+
+        index = self._read_index()
+        if index is None:
+            index = self._scan()
+
+        self.end_tick = index["end_tick"]
+        self.keyframes = [tuple(k) for k in index["keyframes"]]
+        self.commands = {}
+        for tick, command in index["commands"]:
+            self.commands.setdefault(tick, []).append(command)
+
+        if not self.keyframes:
+            raise ValueError("replay has no keyframes")
+
+    def _read_index(self):
+        size = os.fstat(self._file.fileno()).st_size
+        if size < self._data_start + _FOOTER.size:
+            return None
+
+        self._file.seek(size - _FOOTER.size)
+        offset, magic = _FOOTER.unpack(self._file.read(_FOOTER.size))
+        if magic != MAGIC:
+            return None
+
+        self._file.seek(offset)
+        kind, _, length = _RECORD.unpack(self._file.read(_RECORD.size))
+        if kind != INDEX:
+            return None
+        return json.loads(self._file.read(length).decode("utf-8"))
+
+    def _scan(self):
+        # Inspelningen avslutades aldrig (krasch), bygg indexet från posterna
+        index = {"end_tick": self.start_tick, "keyframes": [], "commands": []}
+        size = os.fstat(self._file.fileno()).st_size
+        self._file.seek(self._data_start)
+        while True:
+            offset = self._file.tell()
+            head = self._file.read(_RECORD.size)
+            if len(head) < _RECORD.size:
+                break
+            kind, tick, length = _RECORD.unpack(head)
+            if kind == COMMAND:
+                payload = self._file.read(length)
+                if len(payload) < length:
+                    break
+            else:
+                self._file.seek(length, os.SEEK_CUR)
+                if self._file.tell() > size:
+                    break
+
+            if kind == KEYFRAME:
+                index["keyframes"].append((tick, offset))
+            elif kind == COMMAND:
+                index["commands"].append((tick, json.loads(payload.decode("utf-8"))))
+            index["end_tick"] = max(index["end_tick"], tick)
+        return index
+
+    def keyframe_before(self, tick):
+        i = bisect.bisect_right([t for t, _ in self.keyframes], tick) - 1
+        key_tick, offset = self.keyframes[max(0, i)]
+
+        self._file.seek(offset)
+        _, _, length = _RECORD.unpack(self._file.read(_RECORD.size))
+        return key_tick, snapshot.decode(self._file.read(length))
+
+    def close(self):
+        self._file.close()
+
+
+class ReplayPlayer:
+    def __init__(self, replay, sim, compute_gravity, tick=None):
+        self.replay = replay
+        self.sim = sim
+        self.compute_gravity = compute_gravity
+        self.seek(replay.start_tick if tick is None else tick)
+
+    @property
+    def done(self):
+        return self.sim.tick >= self.replay.end_tick
+
+    def step(self):
+        for command in self.replay.commands.get(self.sim.tick, ()):
+            self.sim.apply(command)
+        return self.sim.step(self.compute_gravity)
+
+    def seek(self, tick):
+        tick = max(self.replay.start_tick, min(self.replay.end_tick, tick))
+        _, snap = self.replay.keyframe_before(tick)
+        snapshot.restore(self.sim, snap)
+        snap.close()
+
+        while self.sim.tick < tick:
+            self.step()
@@ -0,0 +1,181 @@
+import sys
+from collections import deque
+
+import numpy as np
+import pygame
+
+import snapshot
+
+REWIND_BUDGET_MB = 96
+KEYFRAME_EVERY = 30
+
+# Upplösning på de kvantiserade skillnaderna mot segmentets keyframe
+BODY_POS_Q = 1 / 1024
+BODY_VEL_Q = 1 / 4096
+PARTICLE_POS_Q = 1 / 32
+PARTICLE_VEL_Q = 1 / 128
+
+# Svansarnas punkter delas med kropparna tills kroppen släpper dem, sedan är det
+# segmentet som håller dem vid liv, så varje punkt räknas som en egen Vector2
+_LIST_BYTES = sys.getsizeof([])
+_POINT_BYTES = 8 + sys.getsizeof(pygame.Vector2())
+
+
+def _frame_bytes(frame):
+    return sum(a.nbytes for a in frame[3:]) if frame is not None else 0
+
+
+def _quantize(values, base, quantum, dtype):
+    q = np.rint((values - base) / quantum)
+    info = np.iinfo(dtype)
+    if q.size and (q.min() < info.min or q.max() > info.max):
+        return None
+    return q.astype(dtype)
+
+
+class _Segment:
+    def __init__(self, sim, bodies):
+        self.data = snapshot.encode(snapshot.capture(sim, trails=False))
+        self.bodies = bodies
+        self.trails = [tuple(b.trail) for b in bodies]
+        # Keyframens kolumner läses direkt ur data, inga egna kopior
+        snap = snapshot.decode(self.data)
+        self.body_pos = snap.column("body_pos")
+        self.body_vel = snap.column("body_vel")
+        self.particle_pos = snap.column("particle_pos")
+        self.particle_vel = snap.column("particle_vel")
+        self.clock = (sim.tick, sim.sim_time, sim.time_scale)
+        self.frames = [None]
+        points = sum(len(t) for t in self.trails)
+        # Kroppslistan, listan med svansar och varje svanslista med sina punkter
+        self.nbytes = len(self.data) + 2 * (_LIST_BYTES + 8 * len(bodies)) + _LIST_BYTES * len(self.trails) + _POINT_BYTES * points
+
+    def total_bytes(self):
+        return self.nbytes + sum(_frame_bytes(f) for f in self.frames)
+
+
+class RewindBuffer:
+    def __init__(self, budget_mb=REWIND_BUDGET_MB, keyframe_every=KEYFRAME_EVERY):
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.keyframe_every = keyframe_every
+        self._segments = deque()
+        self._restored = None
+        self._restored_bodies = None
+        self.nbytes = 0
+        self.frames = 0
+
+    def __len__(self):
+        return self.frames
+
+    def clear(self):
+        self._segments.clear()
+        self._restored = None
+        self.nbytes = 0
+        self.frames = 0
+
+    def _same_bodies(self, segment, bodies):
+        # Body saknar __eq__, så listjämförelsen blir en identitetsjämförelse i C
+        return segment.bodies == bodies
+
+    def _delta(self, segment, sim, body_pos, body_vel):
+        particles = sim.particles
+        if len(particles) != len(segment.particle_pos):
+            return None
+
+        parts = (
+            _quantize(body_pos, segment.body_pos, BODY_POS_Q, np.int32),
+            _quantize(body_vel, segment.body_vel, BODY_VEL_Q, np.int32),
+            _quantize(particles.pos, segment.particle_pos, PARTICLE_POS_Q, np.int16),
+            _quantize(particles.vel, segment.particle_vel, PARTICLE_VEL_Q, np.int16),
+        )
+        if any(p is None for p in parts):
+            return None
+        return (sim.tick, sim.sim_time, sim.time_scale) + parts
+
+    def push(self, sim):
+        bodies = list(sim.bodies)
+        segment = self._segments[-1] if self._segments else None
+
+        frame = None
+        if segment is not None and len(segment.frames) < self.keyframe_every and self._same_bodies(segment, bodies):
+            state = np.array([c for b in bodies for c in (b.pos.x, b.pos.y, b.vel.x, b.vel.y)], dtype=np.float64).reshape(-1, 4)
+            frame = self._delta(segment, sim, state[:, :2], state[:, 2:])
+
+        # Ny keyframe när segmentet är fullt, kropparna ändrats eller skillnaden inte ryms
+        if frame is None:
+            segment = _Segment(sim, bodies)
+            self._segments.append(segment)
+            self.nbytes += segment.nbytes
+        else:
+            segment.frames.append(frame)
+            self.nbytes += _frame_bytes(frame)
+        self.frames += 1
+
+        while self.nbytes > self.budget and len(self._segments) > 1:
+            old = self._segments.popleft()
+            self.nbytes -= old.total_bytes()
+            self.frames -= len(old.frames)
+
+    def _locate(self, index):
+        for segment in self._segments:
+            if index < len(segment.frames):
+                return segment, index
+            index -= len(segment.frames)
+        raise IndexError("rewind index out of range")
+
+    def restore(self, sim, index):
+        segment, i = self._locate(index)
+
+        # Inom samma segment räcker det att skriva över positioner och hastigheter.
+        # Har kropparna inte bytts sedan förra keyframen skrivs de som redan finns över
+        if self._restored is not segment or sim.bodies is not self._restored_bodies:
+            # Antingen de levande kropparna som segmentet själv pekar på, eller de som
+            # byggdes för ett tidigare segment med samma medlemmar
+            members = sim.bodies
+            if self._restored is not None and sim.bodies is self._restored_bodies:
+                members = self._restored.bodies
+            reuse = sim.bodies if len(sim.bodies) == len(segment.bodies) and self._same_bodies(segment, members) else None
+            snapshot.restore(sim, snapshot.decode(segment.data), reuse)
+            for b, trail in zip(sim.bodies, segment.trails):
+                b.trail = list(trail)
+            self._restored = segment
+            self._restored_bodies = sim.bodies
+
+        frame = segment.frames[i]
+        if frame is None:
+            pos, vel = segment.body_pos, segment.body_vel
+            ppos, pvel = segment.particle_pos, segment.particle_vel
+            sim.tick, sim.sim_time, sim.time_scale = segment.clock
+        else:
+            sim.tick, sim.sim_time, sim.time_scale = frame[0], frame[1], frame[2]
+            pos = segment.body_pos + frame[3] * BODY_POS_Q
+            vel = segment.body_vel + frame[4] * BODY_VEL_Q
+            ppos = segment.particle_pos + frame[5] * PARTICLE_POS_Q
+            pvel = segment.particle_vel + frame[6] * PARTICLE_VEL_Q
+
+        for b, p, v in zip(sim.bodies, pos.tolist(), vel.tolist()):
+            b.pos.update(p)
+            b.vel.update(v)
+            if getattr(b, "orbit", None) is not None:
+                b.rails_vel = b.vel.copy()
+
+        if len(sim.particles) == len(ppos):
+            sim.particles.pos = np.array(ppos)
+            sim.particles.vel = np.array(pvel)
+
+    def truncate(self, count):
+        # Historiken efter den punkt man spolat tillbaka till kastas
+        while self._segments and self.frames > count:
+            segment = self._segments[-1]
+            extra = self.frames - count
+            if extra >= len(segment.frames):
+                self._segments.pop()
+                self.nbytes -= segment.total_bytes()
+                self.frames -= len(segment.frames)
+                continue
+
+            for f in segment.frames[len(segment.frames) - extra:]:
+                self.nbytes -= _frame_bytes(f)
+            del segment.frames[len(segment.frames) - extra:]
+            self.frames -= extra
+        self._restored = None
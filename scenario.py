@@ -0,0 +1,258 @@
+import json
+import math
+
+import numpy as np
+
+from bodies import Body
+from physics import G, circular_speed
+
+# En rad per objekt, {"type": ...}, tomma rader och rader som börjar med # hoppas över
+PARTICLE_BATCH = 4096
+DEFAULT_COLOR = (200, 200, 210)
+PLUMMER_MAX_RADII = 10.0
+
+
+def iter_entries(path):
+    # Filen läses rad för rad, stora scenarion hålls aldrig i minnet som en helhet
+    with open(path, "r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{lineno}: {e.msg}") from None
+            if "type" not in entry:
+                raise ValueError(f"{path}:{lineno}: entry has no type")
+            yield lineno, entry
+
+
+def _colors(color, count, rng, jitter):
+    base = np.asarray(color, dtype=np.int16)
+    if not jitter:
+        return np.broadcast_to(base.astype(np.uint8), (count, 3))
+    return np.clip(base + rng.integers(-jitter, jitter + 1, (count, 3)), 0, 255).astype(np.uint8)
+
+
+def _orbit(center_pos, center_vel, mu, r, ang, softening, sense):
+    c = np.cos(ang)
+    s = np.sin(ang)
+    v = circular_speed(mu, r, softening)
+    pos = np.stack([center_pos[0] + r * c, center_pos[1] + r * s], axis=1)
+    vel = np.stack([center_vel[0] - s * v * sense, center_vel[1] + c * v * sense], axis=1)
+    return pos, vel
+
+
+def keplerian_disk(center_pos, center_vel, mu, r_in, r_out, count, softening, rng, power=-1.0, dispersion=0.0, sense=-1.0):
+    # Ytdensitet ∝ r^power, radierna dras med inversa fördelningsfunktionen
+    u = rng.uniform(0.0, 1.0, count)
+    k = power + 2.0
+    if abs(k) < 1e-9:
+        r = r_in * (r_out / r_in) ** u
+    else:
+        r = (r_in ** k + u * (r_out ** k - r_in ** k)) ** (1.0 / k)
+    ang = rng.uniform(0.0, 2.0 * np.pi, count)
+
+    pos, vel = _orbit(center_pos, center_vel, mu, r, ang, softening, sense)
+    if dispersion:
+        vel += rng.normal(0.0, dispersion, (count, 2)) * circular_speed(mu, r, softening)[:, None]
+    return pos, vel
+
+
+def ring(center_pos, center_vel, mu, radius, count, softening, rng, thickness=0.0, sense=-1.0):
+    # Jämnt fördelade vinklar, till skillnad från bältets slumpade
+    ang = np.linspace(0.0, 2.0 * np.pi, count, endpoint=False) + rng.uniform(0.0, 2.0 * np.pi)
+    r = radius + rng.normal(0.0, thickness, count) if thickness else np.full(count, float(radius))
+    return _orbit(center_pos, center_vel, mu, r, ang, softening, sense)
+
+
+def plummer_sphere(center_pos, center_vel, mass, scale, count, rng, max_radii=PLUMMER_MAX_RADII):
+    # Radierna från Plummers kumulativa massa, projicerade i planet, avskurna vid max_radii skalradier
+    u_max = (max_radii ** 2 / (1.0 + max_radii ** 2)) ** 1.5
+    u = rng.uniform(0.0, u_max, count)
+    r = scale / np.sqrt(u ** (-2.0 / 3.0) - 1.0)
+    ang = rng.uniform(0.0, 2.0 * np.pi, count)
+    pos = np.stack([center_pos[0] + r * np.cos(ang), center_pos[1] + r * np.sin(ang)], axis=1)
+
+    # Isotropa hastigheter med den lokala dispersionen σ² = GM / (6 sqrt(r² + a²))
+    sigma = np.sqrt(G * mass / (6.0 * np.sqrt(r * r + scale * scale)))
+    vel = rng.normal(0.0, 1.0, (count, 2)) * sigma[:, None] + center_vel
+    return pos, vel
+
+
+def binary(center, vel, masses, separation, softening, eccentricity=0.0, angle=0.0):
+    # Båda startar i apoapsis kring det gemensamma masscentrumet
+    m1, m2 = masses
+    total = m1 + m2
+    d = separation
+    v_rel = circular_speed(G * total, d, softening) * math.sqrt(1.0 - eccentricity)
+
+    ax, ay = math.cos(angle), math.sin(angle)
+    tx, ty = -ay, ax
+    pos = [
+        (center[0] - ax * d * m2 / total, center[1] - ay * d * m2 / total),
+        (center[0] + ax * d * m1 / total, center[1] + ay * d * m1 / total),
+    ]
+    vel = [
+        (vel[0] + tx * v_rel * m2 / total, vel[1] + ty * v_rel * m2 / total),
+        (vel[0] - tx * v_rel * m1 / total, vel[1] - ty * v_rel * m1 / total),
+    ]
+    return pos, vel
+
+
+class ScenarioLoader:
+    def __init__(self, sim, path):
+        self.sim = sim
+        self.path = path
+        self.rng = sim.rng
+        self.info = {"name": path}
+        self.bodies = []
+        self.by_name = {}
+
+        self._particles = []
+        self._pending = []
+
+    def _color(self, entry, default=DEFAULT_COLOR):
+        return tuple(entry.get("color", default))
+
+    def _add_body(self, body):
+        self.bodies.append(body)
+        if body.name:
+            self.by_name[body.name] = body
+        return body
+
+    def _center(self, entry):
+        # Antingen runt en namngiven kropp eller en fri punkt med egen massa
+        if "around" in entry:
+            parent = self.by_name.get(entry["around"])
+            if parent is None:
+                raise ValueError(f"unknown body {entry['around']!r}")
+            return (parent.pos.x, parent.pos.y), (parent.vel.x, parent.vel.y), G * parent.mass
+        center = entry.get("center", (self.sim.w / 2, self.sim.h / 2))
+        return tuple(center), tuple(entry.get("vel", (0.0, 0.0))), G * entry.get("center_mass", 0.0)
+
+    def _emit(self, entry, pos, vel, total_mass=0.0):
+        count = len(pos)
+        cols = _colors(self._color(entry), count, self.rng, entry.get("jitter", 24))
+
+        if entry.get("into", "particles") == "particles":
+            self._particles.append((pos, vel, cols))
+            return
+
+        # Som riktiga kroppar delar de på massan, bara rimligt för några hundra
+        mass = entry.get("body_mass", total_mass / max(1, count))
+        radius = entry.get("radius", 2)
+        for p, v, c in zip(pos.tolist(), vel.tolist(), cols.tolist()):
+            self.bodies.append(Body(p, v, mass, radius, tuple(c)))
+
+    def _flush_pending(self):
+        if not self._pending:
+            return
+        data = np.asarray(self._pending, dtype=np.float64)
+        self._particles.append((data[:, 0:2], data[:, 2:4], data[:, 4:7].astype(np.uint8)))
+        self._pending = []
+
+    def load(self):
+        for lineno, entry in iter_entries(self.path):
+            try:
+                self.add(entry)
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"{self.path}:{lineno}: {entry['type']}: {e}") from None
+        self._flush_pending()
+        return self.finish()
+
+    def add(self, entry):
+        kind = entry["type"]
+        sim = self.sim
+        soft = sim.softening
+
+        if kind == "scenario":
+            self.info.update(entry)
+            if "seed" in entry:
+                self.rng = np.random.default_rng(entry["seed"])
+
+        elif kind in ("star", "planet", "body"):
+            preset = sim.presets.get(entry.get("preset"), {}) if kind == "planet" else {}
+            mass = entry.get("mass", preset.get("mass", 1.0))
+            radius = entry.get("radius", preset.get("radius", 6))
+            color = self._color(entry, preset.get("color", DEFAULT_COLOR))
+
+            if "distance" in entry:
+                center, center_vel, mu = self._center(entry)
+                ang = np.radians([entry.get("angle", 0.0)])
+                pos, vel = _orbit(center, center_vel, mu, np.array([entry["distance"]], dtype=np.float64), ang, soft, entry.get("sense", -1.0))
+                pos, vel = pos[0].tolist(), vel[0].tolist()
+            else:
+                pos, vel = entry.get("pos", (sim.w / 2, sim.h / 2)), entry.get("vel", (0.0, 0.0))
+            self._add_body(Body(pos, vel, mass, radius, color, is_star=kind == "star", name=entry.get("name")))
+
+        elif kind == "binary":
+            masses = entry["masses"]
+            radii = entry.get("radii", (18, 18))
+            colors = entry.get("colors", ((250, 220, 120), (250, 200, 160)))
+            names = entry.get("names", (None, None))
+            center = entry.get("center", (sim.w / 2, sim.h / 2))
+            pos, vel = binary(center, entry.get("vel", (0.0, 0.0)), masses, entry["separation"], soft,
+                              entry.get("eccentricity", 0.0), math.radians(entry.get("angle", 0.0)))
+            for i in range(2):
+                self._add_body(Body(pos[i], vel[i], masses[i], radii[i], tuple(colors[i]), is_star=True, name=names[i]))
+
+        elif kind == "belt":
+            center, center_vel, mu = self._center(entry)
+            r = entry["radius"]
+            width = entry.get("width", 0.12)
+            pos, vel = keplerian_disk(center, center_vel, mu, r * (1.0 - width), r * (1.0 + width), entry["count"], soft, self.rng,
+                                      power=0.0, sense=entry.get("sense", -1.0))
+            self._emit(entry, pos, vel)
+
+        elif kind == "disk":
+            center, center_vel, mu = self._center(entry)
+            pos, vel = keplerian_disk(center, center_vel, mu, entry["r_in"], entry["r_out"], entry["count"], soft, self.rng,
+                                      entry.get("power", -1.0), entry.get("dispersion", 0.0), entry.get("sense", -1.0))
+            self._emit(entry, pos, vel)
+
+        elif kind == "ring":
+            center, center_vel, mu = self._center(entry)
+            pos, vel = ring(center, center_vel, mu, entry["radius"], entry["count"], soft, self.rng,
+                            entry.get("thickness", 0.0), entry.get("sense", -1.0))
+            self._emit(entry, pos, vel)
+
+        elif kind == "plummer":
+            center = entry.get("center", (sim.w / 2, sim.h / 2))
+            pos, vel = plummer_sphere(center, entry.get("vel", (0.0, 0.0)), entry["mass"], entry["scale"], entry["count"], self.rng,
+                                      entry.get("max_radii", PLUMMER_MAX_RADII))
+            if entry.get("into", "particles") == "particles":
+                # Testpartiklar drar inte i varandra, hopens massa sitter i en kropp i mitten
+                self._add_body(Body(center, entry.get("vel", (0.0, 0.0)), entry["mass"], entry.get("core_radius", 6), self._color(entry),
+                                    name=entry.get("name")))
+            self._emit(entry, pos, vel, entry["mass"])
+
+        elif kind == "particle":
+            # Enstaka partiklar buffras och läggs till i klump
+            x, y = entry["pos"]
+            vx, vy = entry.get("vel", (0.0, 0.0))
+            self._pending.append((x, y, vx, vy) + self._color(entry))
+            if len(self._pending) >= PARTICLE_BATCH:
+                self._flush_pending()
+
+        else:
+            raise ValueError(f"unknown entry type {kind!r}")
+
+    def finish(self):
+        sim = self.sim
+        sim.bodies = self.bodies
+        sim.particles.clear()
+        if self._particles:
+            # En enda sammanslagning i stället för en per generator
+            sim.particles.add(
+                np.concatenate([p for p, _, _ in self._particles]),
+                np.concatenate([v for _, v, _ in self._particles]),
+                np.concatenate([c for _, _, c in self._particles]),
+            )
+        self.info.update({"bodies": len(sim.bodies), "particles": len(sim.particles)})
+        return self.info
+
+
+def load(path, sim):
+    return ScenarioLoader(sim, path).load()
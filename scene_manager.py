@@ -0,0 +1,86 @@
+import importlib
+import time
+
+import pygame
+
+SCENES = {
+    "MENU": ("scenes.menu", "MenuScene"),
+    "SANDBOX": ("scenes.sandbox", "SandboxScene"),
+    "DEMO": ("scenes.demo", "DemoScene"),
+}
+
+PREWARM_ORDER = ("SANDBOX", "DEMO")
+# Tunga beroenden som scenen annars drar in vid första användningen, ett per steg
+PREWARM_IMPORTS = {
+    "SANDBOX": ("numpy.random",),
+}
+# Mindre kvar av framen än så här och inget steg tas, det största steget är runt 7 ms
+PREWARM_MIN_MS = 4.0
+
+
+class SceneManager:
+    def __init__(self, fonts, size):
+        self.fonts = fonts
+        self.size = size
+        self._classes = {}
+        self._instances = {}
+        self._prewarm = self._prewarm_steps()
+        self.last_prewarm_ms = 0.0
+
+    def scene_class(self, name):
+        cls = self._classes.get(name)
+        if cls is None:
+            # Scenmoduler importeras först när scenen används
+            module_name, class_name = SCENES[name]
+            cls = getattr(importlib.import_module(module_name), class_name)
+            self._classes[name] = cls
+        return cls
+
+    def create(self, name):
+        return self.scene_class(name)(self.fonts, self.size)
+
+    def get(self, name):
+        scene = self._instances.get(name)
+        if scene is None:
+            scene = self.create(name)
+            self._instances[name] = scene
+        return scene
+
+    def enter(self, name):
+        fresh = name not in self._instances
+        scene = self.get(name)
+        if not fresh:
+            scene.reset()
+        return scene
+
+    def _prewarm_steps(self):
+        # Import, konstruktion och uppvärmningen i separata steg så att inget av dem
+        # tar en hel frame, scenens prewarm_steps delar upp den första renderingen
+        surface = None
+        for name in PREWARM_ORDER:
+            if name in self._instances:
+                continue
+            for module_name in PREWARM_IMPORTS.get(name, ()):
+                importlib.import_module(module_name)
+                yield name
+            self.scene_class(name)
+            yield name
+            scene = self.get(name)
+            yield name
+            if surface is None:
+                surface = pygame.Surface(self.size)
+                yield name
+            yield from scene.prewarm_steps(surface)
+
+    def prewarm_step(self, budget_ms):
+        # budget_ms är det som är kvar av framen innan clock.tick börjar vänta
+        if self._prewarm is None or budget_ms < PREWARM_MIN_MS:
+            return False
+        start = time.perf_counter()
+        try:
+            next(self._prewarm)
+        except StopIteration:
+            self._prewarm = None
+            return False
+        self.last_prewarm_ms = (time.perf_counter() - start) * 1000.0
+        return True
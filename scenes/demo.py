@@ -9,14 +9,25 @@ from camera import (
     world_to_screen,
 )
 from physics import G
+from kepler import put_on_rails, propagate, sample_trail
 from starfield import Starfield
-from hud import HUD
+from render_scale import WorldLayer
+from scheduler import FrameScheduler
+from spatial import BodyIndex
+from hud import HUD, LabelCache
 from inspector import InspectorPanel
 from scenes.pause_menu import PauseMenu
 
 
 DOUBLECLICK_MS = 320
 
+# Demon har alltid gått i halv realtid (dt klämdes till 1/120 vid 60 FPS)
+DEMO_TIME_RATE = 0.5
+WARP_LEVELS = (1, 2, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+SCRUB_SPEED = 40.0
+TRAIL_SAMPLES = 48
+TRAIL_FRACTION = 0.3
+
 
 def circular_speed(star_mass, r):
     if r <= 0:
@@ -49,7 +60,15 @@ def create_solar_system(center):
         ("Pluto", 680, (210, 210, 210), 6, 12),
     ]
 
+    moon_data = [
+        ("Moon", "Earth", 18, (200, 200, 200), 3, 1),
+        ("Io", "Jupiter", 22, (240, 220, 140), 3, 1),
+        ("Europa", "Jupiter", 30, (215, 205, 190), 3, 1),
+        ("Titan", "Saturn", 24, (230, 190, 120), 3, 1),
+    ]
+
     bodies = [sun]
+    by_name = {}
 
     for name, r, col, radius, mass in planet_data:
         pos = pygame.Vector2(sun.pos.x + r, sun.pos.y)
@@ -58,35 +77,22 @@ def create_solar_system(center):
 
         planet = Body(pos, vel, mass=mass, radius=radius, color=col, name=name)
         planet.parent_star = sun
+        put_on_rails(planet, sun, G)
         bodies.append(planet)
+        by_name[name] = planet
 
-    return bodies
-
-
-def compute_demo_forces(bodies, softening=1200.0):
-    forces = [pygame.Vector2(0, 0) for _ in bodies]
-
-    for i, body in enumerate(bodies):
-        if body.is_star:
-            continue
+    for name, parent_name, r, col, radius, mass in moon_data:
+        parent = by_name[parent_name]
+        pos = pygame.Vector2(parent.pos.x + r, parent.pos.y)
+        v = circular_speed(parent.mass, r)
+        vel = pygame.Vector2(parent.vel.x, parent.vel.y - v)
 
-        star = getattr(body, "parent_star", None)
-        if star is None:
-            continue
+        moon = Body(pos, vel, mass=mass, radius=radius, color=col, name=name)
+        moon.parent_star = parent
+        put_on_rails(moon, parent, G)
+        bodies.append(moon)
 
-        dx = star.pos.x - body.pos.x
-        dy = star.pos.y - body.pos.y
-
-        dist_sq = dx * dx + dy * dy + softening
-        dist = dist_sq ** 0.5
-        if dist == 0.0:
-            continue
-
-        inv_dist = 1.0 / dist
-        force_mag = G * body.mass * star.mass / dist_sq
-        forces[i] = pygame.Vector2(dx * inv_dist * force_mag, dy * inv_dist * force_mag)
-
-    return forces
+    return bodies
 
 
 class DemoScene:
@@ -97,15 +103,31 @@ class DemoScene:
 
         self.starfield = Starfield(self.w, self.h, count=300, seed=2024)
         self.hud = HUD(self.font_ui)
+        # Demot har ingen governor, skalan väljs bara för hand
+        self.world_layer = WorldLayer((self.w, self.h))
 
         self.inspector = InspectorPanel(self.font_ui, (self.w, self.h))
         self.inspector.set_mode("demo")
 
+        self.scheduler = FrameScheduler()
+        self.inspector.scheduler = self.scheduler
+        self.labels = LabelCache(self.font_label)
+        self.body_index = BodyIndex()
+
         
         self.pause_menu = PauseMenu(fonts, (self.w, self.h))
+
+        self.reset()
+
+    def reset(self):
+        self.pause_menu.close()
+        self.inspector.clear()
         self._paused_before_menu = False
 
         self.bodies = create_solar_system((self.w / 2, self.h / 2))
+        self.sim_time = 0.0
+        self.warp_index = 0
+        self.scrub = 0
 
         self.zoom = 1.0
         self.camera_offset = pygame.Vector2(0, 0)
@@ -119,12 +141,20 @@ class DemoScene:
 
         self.follow_target = None
         self.hover_target = None
+        self._hover_pos = None
 
         self.paused = False  
 
         self._last_click_ms = 0
         self._last_click_body = None
 
+    def prewarm_steps(self, surface):
+        self.starfield.prewarm((self.w, self.h))
+        yield
+        self.update(0.0)
+        yield
+        self.draw(surface)
+
     def _follow_candidates(self):
         planets = [b for b in self.bodies if not getattr(b, "is_star", False)]
         return planets if planets else list(self.bodies)
@@ -149,21 +179,11 @@ class DemoScene:
         self.camera_offset = desired_camera_offset_for_target(target.pos, (self.w, self.h), self.zoom)
 
     def _pick_body_at_screen(self, screen_pos):
-        p = pygame.Vector2(screen_pos)
-        best = None
-        best_d = 1e9
-
-        for b in self.bodies:
-            if getattr(b, "is_star", False):
-                continue
-            sp = world_to_screen(b.pos, self.camera_offset, self.zoom)
-            r = max(8, int((getattr(b, "radius", 10) + 6) * self.zoom))
-            d = (sp - p).length()
-            if d <= r and d < best_d:
-                best = b
-                best_d = d
-
-        return best
+        # Banorna är analytiska, samma tid och samma lista ger samma positioner
+        planets = [b for b in self.bodies if not getattr(b, "is_star", False)]
+        self.body_index.update(planets, (self.sim_time, id(self.bodies), len(self.bodies)))
+        world = screen_to_world(pygame.Vector2(screen_pos), self.camera_offset, self.zoom)
+        return self.body_index.pick(world, self.zoom)
 
     def _double_clicked(self, body):
         now = pygame.time.get_ticks()
@@ -221,10 +241,24 @@ class DemoScene:
                 self.show_labels = not self.show_labels
             if event.key == pygame.K_t:
                 self.show_trails = not self.show_trails
+            if event.key == pygame.K_v:
+                self.world_layer.cycle(has_auto=False)
 
             if event.key == pygame.K_f:
                 self._cycle_follow()
 
+            if event.key in (pygame.K_RIGHTBRACKET, pygame.K_PERIOD):
+                self.warp_index = min(len(WARP_LEVELS) - 1, self.warp_index + 1)
+            elif event.key in (pygame.K_LEFTBRACKET, pygame.K_COMMA):
+                self.warp_index = max(0, self.warp_index - 1)
+            elif event.key == pygame.K_HOME:
+                self.sim_time = 0.0
+
+            if event.key == pygame.K_RIGHT:
+                self.scrub = 1
+            elif event.key == pygame.K_LEFT:
+                self.scrub = -1
+
             if event.key == pygame.K_c:
                 target = self.follow_target
                 if target is None:
@@ -232,6 +266,9 @@ class DemoScene:
                     target = stars[0] if stars else (self.bodies[0] if self.bodies else None)
                 self._center_on_target(target)
 
+        if event.type == pygame.KEYUP and event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+            self.scrub = 0
+
         if event.type == pygame.MOUSEWHEEL:
             mouse_screen = pygame.Vector2(pygame.mouse.get_pos())
             before = screen_to_world(mouse_screen, self.camera_offset, self.zoom)
@@ -246,7 +283,7 @@ class DemoScene:
             self.camera_offset += before - after
 
         if event.type == pygame.MOUSEMOTION:
-            self.hover_target = self._pick_body_at_screen(event.pos)
+            self._hover_pos = event.pos
 
             if self.panning:
                 delta = pygame.Vector2(event.pos) - self.pan_start_screen
@@ -273,29 +310,26 @@ class DemoScene:
         return None
 
     def update(self, dt):
-        dt = min(dt, 1 / 120)
+        ui_dt = min(dt, 1 / 30)
 
         stars = [b for b in self.bodies if getattr(b, "is_star", False)]
         self.inspector.set_context_stars(stars)
 
-        if self.paused:
-            if self.follow_target is not None:
-                self.camera_offset = smooth_follow(
-                    self.camera_offset,
-                    self.follow_target.pos,
-                    (self.w, self.h),
-                    self.zoom,
-                    dt,
-                    strength=10.0,
-                )
-            return None
+        if self._hover_pos is not None:
+            self.hover_target = self._pick_body_at_screen(self._hover_pos)
+            self._hover_pos = None
 
-        forces = compute_demo_forces(self.bodies)
-        for body, force in zip(self.bodies, forces):
-            body.apply_force(force, dt)
+        warp = WARP_LEVELS[self.warp_index]
+        if self.scrub:
+            self.sim_time += self.scrub * SCRUB_SPEED * max(1, warp) * ui_dt
+        elif not self.paused:
+            self.sim_time += dt * DEMO_TIME_RATE * warp
 
-        for body in self.bodies:
-            body.update(dt)
+        # Analytisk bana: kostnaden per kropp är densamma oavsett warp
+        propagate(self.bodies, self.sim_time)
+        if self.show_trails:
+            for body in self.bodies:
+                body.trail = sample_trail(body, self.sim_time, TRAIL_SAMPLES, TRAIL_FRACTION)
 
         if self.inspector.selected is not None and self.inspector.selected not in self.bodies:
             self.inspector.clear()
@@ -306,12 +340,15 @@ class DemoScene:
                 self.follow_target.pos,
                 (self.w, self.h),
                 self.zoom,
-                dt,
+                ui_dt,
                 strength=10.0,
             )
 
         return None
 
+    def animating(self):
+        return not self.paused or self.scrub != 0 or len(self.scheduler) > 0
+
     def _draw_labels(self, screen):
         if not self.show_labels:
             return
@@ -327,8 +364,10 @@ class DemoScene:
             sp = world_to_screen(body.pos, self.camera_offset, self.zoom)
             r = max(6, int(getattr(body, "radius", 10) * self.zoom))
 
-            label = self.font_label.render(str(name), True, (205, 205, 205))
-            shadow = self.font_label.render(str(name), True, (20, 20, 25))
+            surfaces = self.labels.get(str(name), self.scheduler)
+            if surfaces is None:
+                continue
+            label, shadow = surfaces
 
             x = int(sp.x - label.get_width() // 2)
             y = int(sp.y - r - 14)
@@ -337,11 +376,14 @@ class DemoScene:
             screen.blit(label, (x, y))
 
     def draw(self, screen):
-        screen.fill((5, 5, 15))
-        self.starfield.draw(screen, self.camera_offset, self.zoom)
+        scale = self.world_layer.current()
+        world = self.world_layer.target(screen, scale)
+        world.fill((5, 5, 15))
+        self.starfield.draw(world, self.camera_offset, self.zoom, scale=scale)
 
         for body in self.bodies:
-            body.draw(screen, self.camera_offset, self.zoom, draw_trail=self.show_trails)
+            body.draw(world, self.camera_offset, self.zoom * scale, draw_trail=self.show_trails)
+        self.world_layer.present(screen, world)
 
         self._draw_labels(screen)
 
@@ -365,10 +407,14 @@ class DemoScene:
             )
 
         follow_text = "Off" if self.follow_target is None else (self.follow_target.name or "Object")
-        status = [f"Zoom {self.zoom:.2f}   Follow {follow_text}" + ("   PAUSED" if self.paused else "")]
+        status = [
+            f"Zoom {self.zoom:.2f}   Follow {follow_text}" + ("   PAUSED" if self.paused else ""),
+            f"Time {self.sim_time:,.1f}   Warp x{WARP_LEVELS[self.warp_index]:,}   Render {self.world_layer.label()}".replace(",", " "),
+        ]
         controls = (
             "Click planet inspect+follow   Doubleclick: center   Scroll zoom   RMB pan   SPACE pause   "
-            "F cycle   C center   T trails   L labels   TAB help   ESC options"
+            "[ ] warp   Left/Right scrub   HOME reset time   "
+            "F cycle   C center   T trails   L labels   V render scale   TAB help   ESC options"
         )
 
         right_margin = self.inspector.panel_w + 30 if self.inspector.selected is not None else 0
@@ -1,5 +1,6 @@
 import math
 import random
+import numpy as np
 import pygame
 from starfield import Starfield
 
@@ -25,43 +26,82 @@ def _make_vignette(size):
     return surf
 
 
-def _blend_plot(surf, x, y, col):
-    if x < 0 or y < 0 or x >= LOW_W or y >= LOW_H:
-        return
-    if len(col) == 3:
-        r, g, b = col
-        a = 255
-    else:
-        r, g, b, a = col
-    if a <= 0:
-        return
-    old = surf.get_at((x, y))
-    nr = max(old.r, int(r))
-    ng = max(old.g, int(g))
-    nb = max(old.b, int(b))
-    na = max(old.a, int(a))
-    surf.set_at((x, y), (nr, ng, nb, na))
-
-
-def _draw_segment(surf, a, b, col, thickness=0):
-    ax, ay = a
-    bx, by = b
-    dx = bx - ax
-    dy = by - ay
-    steps = int(max(abs(dx), abs(dy)))
-    if steps <= 0:
-        _blend_plot(surf, int(ax), int(ay), col)
-        return
-    for i in range(steps + 1):
-        t = i / steps
-        x = int(ax + dx * t)
-        y = int(ay + dy * t)
-        _blend_plot(surf, x, y, col)
-        if thickness >= 1:
-            _blend_plot(surf, x + 1, y, col)
-            _blend_plot(surf, x - 1, y, col)
-            _blend_plot(surf, x, y + 1, col)
-            _blend_plot(surf, x, y - 1, col)
+class PixelBatch:
+    # Samlar max-blendade pixlar och ritar allt i ett numpy-pass vid flush()
+    def __init__(self, surface):
+        self.surface = surface
+        self._plots = []
+        self._segments = []
+
+    def plot(self, x, y, col):
+        a = col[3] if len(col) == 4 else 255
+        if a <= 0:
+            return
+        self._plots.append((x, y, col[0], col[1], col[2], a))
+
+    def segment(self, a, b, col, thickness=0):
+        alpha = col[3] if len(col) == 4 else 255
+        if alpha <= 0:
+            return
+        self._segments.append((a[0], a[1], b[0], b[1], col[0], col[1], col[2], alpha, thickness))
+
+    def _segment_points(self):
+        seg = np.array(self._segments, dtype=np.float64)
+        ax, ay, bx, by = seg[:, 0], seg[:, 1], seg[:, 2], seg[:, 3]
+        dx = bx - ax
+        dy = by - ay
+        steps = np.maximum(np.abs(dx), np.abs(dy)).astype(np.int64)
+        counts = np.maximum(steps, 0) + 1
+
+        idx = np.repeat(np.arange(len(seg)), counts)
+        first = np.cumsum(counts) - counts
+        i = np.arange(len(idx)) - first[idx]
+        t = i / np.maximum(steps, 1)[idx]
+
+        x = (ax[idx] + dx[idx] * t).astype(np.int64)
+        y = (ay[idx] + dy[idx] * t).astype(np.int64)
+        cols = seg[idx, 4:8].astype(np.int64)
+
+        thick = seg[idx, 8] >= 1
+        if thick.any():
+            tx, ty, tc = x[thick], y[thick], cols[thick]
+            x = np.concatenate([x, tx + 1, tx - 1, tx, tx])
+            y = np.concatenate([y, ty, ty, ty + 1, ty - 1])
+            cols = np.concatenate([cols, tc, tc, tc, tc])
+        return x, y, cols
+
+    def flush(self):
+        if not self._plots and not self._segments:
+            return
+
+        xs = []
+        ys = []
+        cols = []
+        if self._plots:
+            p = np.array(self._plots, dtype=np.int64)
+            xs.append(p[:, 0])
+            ys.append(p[:, 1])
+            cols.append(p[:, 2:6])
+        if self._segments:
+            x, y, c = self._segment_points()
+            xs.append(x)
+            ys.append(y)
+            cols.append(c)
+        self._plots = []
+        self._segments = []
+
+        x = np.concatenate(xs)
+        y = np.concatenate(ys)
+        c = np.concatenate(cols)
+        inside = (x >= 0) & (y >= 0) & (x < LOW_W) & (y < LOW_H)
+        x, y, c = x[inside], y[inside], c[inside]
+
+        rgb = pygame.surfarray.pixels3d(self.surface)
+        np.maximum.at(rgb, (x, y), c[:, :3].astype(np.uint8))
+        del rgb
+        alpha = pygame.surfarray.pixels_alpha(self.surface)
+        np.maximum.at(alpha, (x, y), c[:, 3].astype(np.uint8))
+        del alpha
 
 
 class Flyby:
@@ -107,17 +147,17 @@ class Flyby:
             return pygame.Vector2(1, 0)
         return v.normalize()
 
-    def draw(self, surf):
+    def draw(self, batch):
         if self.kind == "rocket":
-            self._draw_rocket(surf)
+            self._draw_rocket(batch)
         elif self.kind == "meteor":
-            self._draw_meteor(surf)
+            self._draw_meteor(batch)
         elif self.kind == "shooting_star":
-            self._draw_shooting_star(surf)
+            self._draw_shooting_star(batch)
         else:
-            self._draw_comet(surf)
+            self._draw_comet(batch)
 
-    def _draw_rocket(self, surf):
+    def _draw_rocket(self, batch):
         d = self._safe_norm(self.vel)
         p = pygame.Vector2(-d.y, d.x)
 
@@ -126,13 +166,15 @@ class Flyby:
         left = pygame.Vector2(x, y) - d * 3 + p * 2
         right = pygame.Vector2(x, y) - d * 3 - p * 2
 
+        # Polygonen skriver över pixlar, så tidigare max-plots måste ritas först
+        batch.flush()
         pygame.draw.polygon(
-            surf,
+            batch.surface,
             (235, 235, 245),
             [(int(tip.x), int(tip.y)), (int(left.x), int(left.y)), (int(right.x), int(right.y))],
         )
 
-        _blend_plot(surf, int(x + d.x * 1), int(y + d.y * 1), (200, 210, 230))
+        batch.plot(int(x + d.x * 1), int(y + d.y * 1), (200, 210, 230))
 
         base = pygame.Vector2(x, y) - d * 3
         for i in range(4):
@@ -140,16 +182,16 @@ class Flyby:
             fx = int(base.x + off.x)
             fy = int(base.y + off.y)
             col = (255, 210, 140) if i < 2 else (255, 160, 120)
-            _blend_plot(surf, fx, fy, col)
+            batch.plot(fx, fy, col)
 
-    def _draw_meteor(self, surf):
+    def _draw_meteor(self, batch):
         d = self._safe_norm(self.vel)
         p = pygame.Vector2(-d.y, d.x)
 
         hx, hy = int(self.pos.x), int(self.pos.y)
-        _blend_plot(surf, hx, hy, (255, 210, 150))
-        _blend_plot(surf, hx + 1, hy, (255, 190, 140))
-        _blend_plot(surf, hx, hy + 1, (255, 175, 125))
+        batch.plot(hx, hy, (255, 210, 150))
+        batch.plot(hx + 1, hy, (255, 190, 140))
+        batch.plot(hx, hy + 1, (255, 175, 125))
 
         n = len(self.trail)
         if n < 2:
@@ -165,32 +207,31 @@ class Flyby:
             warm = (255, 170, 120, a) if t < 0.55 else (255, 125, 105, int(a * 0.9))
             a_pt = self.trail[i]
             b_pt = self.trail[i + 1]
-            _draw_segment(surf, (a_pt.x, a_pt.y), (b_pt.x, b_pt.y), warm, thickness=0)
+            batch.segment((a_pt.x, a_pt.y), (b_pt.x, b_pt.y), warm, thickness=0)
 
             if t < 0.45:
                 w = 1 + int(2 * (t ** 0.7))
                 for _ in range(w):
                     s = self.rng.uniform(-1.2, 1.2) * (0.6 + 1.4 * t)
                     off = p * s
-                    _draw_segment(
-                        surf,
+                    batch.segment(
                         (a_pt.x + off.x, a_pt.y + off.y),
                         (b_pt.x + off.x, b_pt.y + off.y),
                         (255, 110, 95, int(a * 0.55)),
                         thickness=0,
                     )
 
-    def _draw_shooting_star(self, surf):
+    def _draw_shooting_star(self, batch):
         d = self._safe_norm(self.vel)
         p = pygame.Vector2(-d.y, d.x)
 
         hx, hy = int(self.pos.x), int(self.pos.y)
 
-        _blend_plot(surf, hx, hy, (245, 250, 255))
+        batch.plot(hx, hy, (245, 250, 255))
         for ox, oy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-            _blend_plot(surf, hx + ox, hy + oy, (210, 235, 255, 210))
+            batch.plot(hx + ox, hy + oy, (210, 235, 255, 210))
         for ox, oy in [(2, 0), (-2, 0), (0, 2), (0, -2)]:
-            _blend_plot(surf, hx + ox, hy + oy, (190, 220, 255, 140))
+            batch.plot(hx + ox, hy + oy, (190, 220, 255, 140))
 
         n = len(self.trail)
         if n >= 2:
@@ -203,13 +244,12 @@ class Flyby:
                 col = (200, 230, 255, a)
                 a_pt = self.trail[i]
                 b_pt = self.trail[i + 1]
-                _draw_segment(surf, (a_pt.x, a_pt.y), (b_pt.x, b_pt.y), col, thickness=0)
+                batch.segment((a_pt.x, a_pt.y), (b_pt.x, b_pt.y), col, thickness=0)
 
                 if t < 0.35 and self.rng.random() < 0.22:
                     s = self.rng.uniform(-1.2, 1.2) * (0.5 + 1.2 * t)
                     off = p * s
-                    _draw_segment(
-                        surf,
+                    batch.segment(
                         (a_pt.x + off.x, a_pt.y + off.y),
                         (b_pt.x + off.x, b_pt.y + off.y),
                         (170, 210, 255, int(a * 0.55)),
@@ -219,20 +259,20 @@ class Flyby:
         if self.twinkle >= 0.14:
             self.twinkle = 0.0
             if self.rng.random() < 0.25:
-                _blend_plot(surf, hx + 1, hy + 1, (245, 250, 255, 160))
-                _blend_plot(surf, hx - 1, hy - 1, (245, 250, 255, 160))
+                batch.plot(hx + 1, hy + 1, (245, 250, 255, 160))
+                batch.plot(hx - 1, hy - 1, (245, 250, 255, 160))
 
-    def _draw_comet(self, surf):
+    def _draw_comet(self, batch):
         d = self._safe_norm(self.vel)
         p = pygame.Vector2(-d.y, d.x)
 
         hx, hy = int(self.pos.x), int(self.pos.y)
 
-        _blend_plot(surf, hx, hy, (255, 245, 225))
-        _blend_plot(surf, hx + 1, hy, (255, 225, 195, 220))
-        _blend_plot(surf, hx, hy + 1, (255, 225, 195, 220))
-        _blend_plot(surf, hx - 1, hy, (220, 235, 255, 140))
-        _blend_plot(surf, hx, hy - 1, (220, 235, 255, 140))
+        batch.plot(hx, hy, (255, 245, 225))
+        batch.plot(hx + 1, hy, (255, 225, 195, 220))
+        batch.plot(hx, hy + 1, (255, 225, 195, 220))
+        batch.plot(hx - 1, hy, (220, 235, 255, 140))
+        batch.plot(hx, hy - 1, (220, 235, 255, 140))
 
         n = len(self.trail)
         if n < 2:
@@ -248,8 +288,7 @@ class Flyby:
 
             ion_a = int(165 * (strength ** 1.9))
             if ion_a > 0:
-                _draw_segment(
-                    surf,
+                batch.segment(
                     (a_pt.x, a_pt.y),
                     (b_pt.x, b_pt.y),
                     (165, 225, 255, ion_a),
@@ -271,8 +310,7 @@ class Flyby:
 
                 off = p * s + (-d) * self.rng.uniform(0.0, 0.7)
                 col = (255, 205, 165, a) if abs(s) > spread * 0.32 else (200, 230, 255, int(a * 0.85))
-                _draw_segment(
-                    surf,
+                batch.segment(
                     (a_pt.x + off.x, a_pt.y + off.y),
                     (b_pt.x + off.x, b_pt.y + off.y),
                     col,
@@ -287,6 +325,7 @@ class MenuScene:
         self.w, self.h = size
 
         self.low = pygame.Surface((LOW_W, LOW_H), pygame.SRCALPHA)
+        self._batch = PixelBatch(self.low)
         self.starfield = Starfield(LOW_W, LOW_H, count=170, seed=1337)
 
         self._t = 0.0
@@ -316,6 +355,12 @@ class MenuScene:
         self._vignette = None
         self._vignette_size = None
 
+        self._title = None
+        self._version_surf = None
+        self._option_cache = {}
+        self._fade_overlay = None
+        self._fade_alpha = None
+
         self.version = "v0.4.0"
 
         self.twinkles = []
@@ -426,9 +471,28 @@ class MenuScene:
             f.update(dt)
         self.flybys = [f for f in self.flybys if f.alive()]
 
-    def _draw_option(self, screen, label, x, y, hovered, out_rect):
+    def _option_surfaces(self, label, hovered):
+        key = (label, hovered)
+        cached = self._option_cache.get(key)
+        if cached is not None:
+            return cached
+
         col = (240, 240, 240) if hovered else (190, 190, 190)
         surf = self.font.render(label, True, col)
+        w = surf.get_width() + self.pad_x * 2
+        h = surf.get_height() + self.pad_y * 2
+
+        box = None
+        if hovered:
+            box = pygame.Surface((w, h), pygame.SRCALPHA)
+            pygame.draw.rect(box, (255, 255, 255, 18), (0, 0, w, h), border_radius=12)
+            pygame.draw.rect(box, (255, 255, 255, 45), (0, 0, w, h), width=1, border_radius=12)
+
+        self._option_cache[key] = (surf, box)
+        return surf, box
+
+    def _draw_option(self, screen, label, x, y, hovered, out_rect):
+        surf, box = self._option_surfaces(label, hovered)
 
         r = pygame.Rect(
             x - self.pad_x,
@@ -438,20 +502,18 @@ class MenuScene:
         )
         out_rect.update(r)
 
-        if hovered:
-            box = pygame.Surface((r.w, r.h), pygame.SRCALPHA)
-            pygame.draw.rect(box, (255, 255, 255, 18), (0, 0, r.w, r.h), border_radius=12)
-            pygame.draw.rect(box, (255, 255, 255, 45), (0, 0, r.w, r.h), width=1, border_radius=12)
+        if box is not None:
             screen.blit(box, (r.x, r.y))
 
         screen.blit(surf, (x, y))
         return y + r.h + self.gap
 
-    def _draw_planet(self, surf):
+    def _draw_planet(self, batch):
         r = self.planet_r
         cx, cy = self.planet_cx, self.planet_cy
 
-        pygame.draw.circle(surf, (6, 8, 14, 255), (cx, cy), r)
+        batch.flush()
+        pygame.draw.circle(batch.surface, (6, 8, 14, 255), (cx, cy), r)
 
         arc_start = 4.20
         arc_len = 0.75
@@ -466,20 +528,40 @@ class MenuScene:
 
             jitter = self._rng.random()
             a = int((16 + 55 * (1.0 - abs(t - 0.5) * 1.9)) * (0.65 + 0.45 * jitter))
-            _blend_plot(surf, x, y, (160, 195, 240, a))
+            batch.plot(x, y, (160, 195, 240, a))
 
             if self._rng.random() < 0.22:
-                _blend_plot(surf, x + 1, y, (110, 145, 210, int(a * 0.55)))
+                batch.plot(x + 1, y, (110, 145, 210, int(a * 0.55)))
 
-    def _draw_twinkles(self, surf):
+    def _draw_twinkles(self, batch):
         for s in self.twinkles:
             v = s["base"] + s["amp"] * (0.5 + 0.5 * math.sin(s["phase"] + self._t * s["rate"]))
             b = int(_clamp_i(v, 90, 235))
             x, y = int(s["x"]), int(s["y"])
-            _blend_plot(surf, x, y, (b, b, b, 220))
+            batch.plot(x, y, (b, b, b, 220))
             if b > 205 and self._rng.random() < 0.12:
-                _blend_plot(surf, x + 1, y, (b, b, b, 120))
-                _blend_plot(surf, x - 1, y, (b, b, b, 120))
+                batch.plot(x + 1, y, (b, b, b, 120))
+                batch.plot(x - 1, y, (b, b, b, 120))
+
+    def _get_title(self):
+        if self._title is None:
+            title_text = "SPACE CADET"
+            glow1 = self.font_title.render(title_text, True, (255, 255, 255))
+            glow2 = self.font_title.render(title_text, True, (255, 255, 255))
+            glow1.set_alpha(28)
+            glow2.set_alpha(18)
+            title = self.font_title.render(title_text, True, (230, 230, 230))
+            self._title = (glow1, glow2, title)
+        return self._title
+
+    def _get_fade_overlay(self, alpha):
+        if self._fade_overlay is None or self._fade_overlay.get_size() != (self.w, self.h):
+            self._fade_overlay = pygame.Surface((self.w, self.h), pygame.SRCALPHA)
+            self._fade_alpha = None
+        if self._fade_alpha != alpha:
+            self._fade_overlay.fill((0, 0, 0, alpha))
+            self._fade_alpha = alpha
+        return self._fade_overlay
 
     def draw(self, screen):
         self.low.fill(self.bg)
@@ -487,11 +569,12 @@ class MenuScene:
         drift = pygame.Vector2(self._t * 3.5, self._t * 2.0)
         self.starfield.draw(self.low, drift, zoom=1.0)
 
-        self._draw_twinkles(self.low)
-        self._draw_planet(self.low)
+        self._draw_twinkles(self._batch)
+        self._draw_planet(self._batch)
 
         for f in self.flybys:
-            f.draw(self.low)
+            f.draw(self._batch)
+        self._batch.flush()
 
         pygame.transform.scale(self.low, (self.w, self.h), screen)
         screen.blit(self._get_vignette((self.w, self.h)), (0, 0))
@@ -499,13 +582,7 @@ class MenuScene:
         cx = self.w // 2
         cy = self.h // 2
 
-        title_text = "SPACE CADET"
-        glow1 = self.font_title.render(title_text, True, (255, 255, 255))
-        glow2 = self.font_title.render(title_text, True, (255, 255, 255))
-        glow1.set_alpha(28)
-        glow2.set_alpha(18)
-
-        title = self.font_title.render(title_text, True, (230, 230, 230))
+        glow1, glow2, title = self._get_title()
         title_x = cx - title.get_width() // 2
         title_y = cy - self.title_offset_y
 
@@ -520,10 +597,10 @@ class MenuScene:
         y = self._draw_option(screen, "Galaxy Demo", x0 + 20, y, self.hover == "DEMO", self._rect_demo)
         y = self._draw_option(screen, "Quit", x0 + 20, y, self.hover == "QUIT", self._rect_quit)
 
-        ver = self.font.render(self.version, True, (160, 160, 170))
+        if self._version_surf is None:
+            self._version_surf = self.font.render(self.version, True, (160, 160, 170))
+        ver = self._version_surf
         screen.blit(ver, (self.w - ver.get_width() - 18, self.h - ver.get_height() - 14))
 
         if self.fade > 0.0:
-            overlay = pygame.Surface((self.w, self.h), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, int(255 * self.fade)))
-            screen.blit(overlay, (0, 0))
+            screen.blit(self._get_fade_overlay(int(255 * self.fade)), (0, 0))
@@ -1,6 +1,9 @@
+import os
+import queue
+import time
+
 import pygame
 
-from bodies import Body
 from camera import (
     world_to_screen,
     screen_to_world,
@@ -8,8 +11,9 @@ from camera import (
     desired_camera_offset_for_target,
     smooth_follow,
 )
-from sim import resolve_collisions, remove_far_bodies
-from orbit_assist import predict_orbit, draw_faded_orbit
+from sim import Simulation, TICK_DT, PLANET_PRESETS
+from orbit_assist import _dominant_star, iter_predict_orbit, draw_faded_orbit
+from launch_solver import LAUNCH_GOALS, iter_solve_launch, solve_launch
 
 try:
     from orbit_assist import classify_orbit
@@ -18,51 +22,61 @@ except ImportError:
         return "UNKNOWN"
 
 from starfield import Starfield
-from hud import HUD
-from physics import G
+from hud import HUD, LabelCache
+from physics import G, SOFTENING, compute_gravity
+from parallel_gravity import gravity_for
 from inspector import InspectorPanel
 from scenes.pause_menu import PauseMenu
+from paths import data_path
+import snapshot
+from replay import Replay, ReplayPlayer, ReplayWriter
+from rewind import RewindBuffer
+from sim_worker import SimWorker
+from diagnostics import ConservationMonitor, DiagnosticsPanel
+from telemetry import TelemetryWriter, tick_record
+from quality import QUALITY_LEVELS, QualityGovernor
+from render_scale import WorldLayer
+from scheduler import FrameScheduler, HIGH, LOW
+from spatial import BodyIndex
 
 
-PLANET_PRESETS = {
-    1: {"mass": 30, "radius": 6, "color": (160, 190, 255)},
-    2: {"mass": 80, "radius": 10, "color": (180, 255, 200)},
-    3: {"mass": 150, "radius": 14, "color": (255, 180, 140)},
-}
-
 MIN_DRAG_DISTANCE = 15
+# Banförutsägelsen räknas så här många steg per skiva i schemaläggaren
+PREDICT_CHUNK = 50
 VELOCITY_SCALE = 0.4
-DESPAWN_DISTANCE = 4000
 DOUBLECLICK_MS = 320
-
-
-def create_central_star(w, h):
-    return Body(
-        (w / 2, h / 2),
-        (0, 0),
-        mass=5000,
-        radius=18,
-        color=(250, 220, 120),
-        is_star=True,
-        name="Sun",
-    )
-
-
-def create_sandbox_demo(w, h):
-    star = create_central_star(w, h)
-    center = star.pos
-
-    result = [star]
-    distances = [130, 200, 270]
-    speeds = [62, 50, 43]
-    presets = [1, 2, 3]
-
-    for d, v, preset in zip(distances, speeds, presets):
-        pos = pygame.Vector2(center.x + d, center.y)
-        vel = pygame.Vector2(0, -v)
-        p = PLANET_PRESETS[preset]
-        result.append(Body(pos, vel, p["mass"], p["radius"], p["color"]))
-    return result
+RESOLVE_DISTANCE = 6.0
+
+AUTOSAVE_INTERVAL_S = 60.0
+AUTOSAVE_FILE = "autosave.scsnap"
+QUICKSAVE_FILE = "quicksave.scsnap"
+REPLAY_FILE = "last.screplay"
+# Hindrar att en långsam frame leder till allt fler tick per frame
+MAX_TICKS_PER_FRAME = 4
+SEEK_TICKS = 300
+# Tick bakåt per frame när man håller in backsteg
+REWIND_SPEED = 2
+NOTICE_S = 2.5
+
+LAUNCH_GOAL_NAMES = {None: "Off", "circular": "Circular", "apsides": "Apsides", "intercept": "Intercept"}
+
+
+def draw_world(screen, sim, starfield, camera_offset, zoom, show_trails=True, quality=QUALITY_LEVELS[0], scale=1.0):
+    # scale < 1 betyder att screen är en nedskalad yta som sedan skalas upp
+    screen.fill((5, 5, 15))
+    starfield.draw(screen, camera_offset, zoom, quality["star_density"], scale)
+    sim.particles.draw(screen, camera_offset, zoom * scale)
+
+    for body in sim.bodies:
+        body.draw(
+            screen,
+            camera_offset,
+            zoom * scale,
+            draw_trail=show_trails,
+            trail_max=quality["trail_max"],
+            trail_step=quality["trail_step"],
+            lod_px=quality["lod_px"],
+        )
 
 
 class SandboxScene:
@@ -79,16 +93,52 @@ class SandboxScene:
 
         # Pause/options overlay (ESC)
         self.pause_menu = PauseMenu(fonts, (self.w, self.h))
+
+        self.inspector.on_tweak = self._tweak_body
+
+        self.sim = Simulation((self.w, self.h))
+        self.sim.diagnostics = ConservationMonitor()
+        self.diagnostics_panel = DiagnosticsPanel(self.font_ui)
+        self.recorder = None
+        self.player = None
+        self.rewind = RewindBuffer()
+        self.compute_gravity = compute_gravity
+        self.worker = None
+        # Med simuleringstråd är det den här bilden som visas och som gränssnittet läser
+        self.frame = None
+        self._replaced = {}
+        # Gränssnittsändringar som simuleringstråden lämnar över, körs i update
+        self._ui_calls = queue.SimpleQueue()
+        self.telemetry = None
+        self._frame_ms = 0.0
+        # Latensen för input i senast visade frame, går med i nästa telemetrirad
+        self._input = (0, float("nan"))
+        self.quality = QualityGovernor()
+        self.world_layer = WorldLayer((self.w, self.h), auto=True)
+        # Sådant som tål att vänta en frame körs efter draw med den tid som blir över
+        self.scheduler = FrameScheduler()
+        self.inspector.scheduler = self.scheduler
+        self.labels = LabelCache(self.font_label)
+        self.body_index = BodyIndex()
+
+        # Skärmstora SRCALPHA-ytor allokeras först när de behövs
+        self.orbit_overlay = None
+        self.autosaver = snapshot.Autosaver()
+
+        self.reset()
+
+    def reset(self):
+        # Nollställer simuleringen utan att allokera om ytor, HUD eller menyer
+        self.pause_menu.close()
+        self.inspector.clear()
         self._paused_before_menu = False
 
-        self.time_scale = 1.0
+        self._run(self._reset_sim)
         self.current_preset = 2
 
         self.camera_offset = pygame.Vector2(0, 0)
         self.zoom = 1.0
 
-        self.bodies = [create_central_star(self.w, self.h)]
-
         self.dragging = False
         self.drag_start_world = None
         self.drag_current_world = None
@@ -97,26 +147,110 @@ class SandboxScene:
         self.pan_start_screen = None
         self.pan_start_offset = None
 
-        self.orbit_overlay = pygame.Surface((self.w, self.h), pygame.SRCALPHA)
-        self.predicted_cache = []
-        self.last_predict_pos = None
-        self.last_predict_vel = None
+        self.scheduler.clear()
+        self._clear_prediction()
         self.last_orbit_kind = "UNKNOWN"
 
+        self.launch_goal = None
+        self.launch_solution = None
+        self._solved_for = None
+
         self.show_labels = False
         self.show_trails = True
 
         self.follow_target = None
         self.hover_target = None
+        # Senaste muspositionen, hovern plockas en gång per frame i update
+        self._hover_pos = None
 
         self.paused = False
 
         self._last_click_ms = 0
         self._last_click_body = None
 
+        self._autosave_timer = 0.0
+        self.notice = None
+        self.notice_timer = 0.0
+
+    def _reset_sim(self):
+        self.stop_recording()
+        self.stop_playback()
+        self.sim.reset()
+        self.sim.diagnostics.reset()
+        self.rewind.clear()
+        self.rewinding = False
+        self._rewind_cursor = 0
+        self._accumulator = 0.0
+
+    def start_sim_thread(self):
+        # Fysiken går i en egen tråd, ritningen läser bara de publicerade bilderna
+        if self.worker is None:
+            self.worker = SimWorker(self.sim, self._tick, self._frame_status)
+            self.worker.start()
+            self.frame = self.worker.frame
+            self._resolve_targets()
+
+    def stop_sim_thread(self):
+        if self.worker is not None:
+            self.worker.stop()
+            self.worker = None
+            self.frame = None
+            self._resolve_targets()
+
+    def _run(self, fn):
+        # Allt som rör simuleringen körs i dess tråd när en sådan finns
+        if self.worker is not None:
+            self.worker.call(fn)
+        else:
+            fn()
+
+    def _on_ui(self, fn):
+        # Kameran och urvalet ägs av gränssnittet, från simuleringstråden körs de i nästa update
+        if self.worker is not None:
+            self._ui_calls.put(fn)
+        else:
+            fn()
+
+    def _frame_status(self, live=False):
+        recorder = self.recorder
+        player = self.player
+        return {
+            "rewinding": self.rewinding,
+            "rewind_cursor": self._rewind_cursor,
+            "rewind_frames": len(self.rewind),
+            "recording_since": recorder.start_tick if recorder is not None else None,
+            "playback": (player.replay.start_tick, player.replay.end_tick) if player is not None else None,
+            "diagnostics": self.sim.diagnostics if live else self.sim.diagnostics.copy(),
+        }
+
+    def _status(self):
+        return self.frame.status if self.frame is not None else self._frame_status(live=True)
+
+    def _orbit_overlay(self):
+        if self.orbit_overlay is None:
+            self.orbit_overlay = pygame.Surface((self.w, self.h), pygame.SRCALPHA)
+        return self.orbit_overlay
+
+    def prewarm_steps(self, surface):
+        # Första renderingen i delar, varje del ryms i det som blir över av en menyframe
+        self._orbit_overlay()
+        yield
+        self.starfield.prewarm((self.w, self.h))
+        yield
+        draw_world(surface, self.sim, self.starfield, self.camera_offset, self.zoom, self.show_trails, self.quality.settings)
+        yield
+        self.draw(surface)
+
+    def _world(self):
+        return self.frame if self.frame is not None else self.sim
+
+    def _rails_enabled(self):
+        return self.frame.rails_enabled if self.frame is not None else self.sim.rails.enabled
+
     def _follow_candidates(self):
-        planets = [b for b in self.bodies if not getattr(b, "is_star", False)]
-        return planets if planets else list(self.bodies)
+        bodies = self._world().bodies
+        planets = [b for b in bodies if not getattr(b, "is_star", False)]
+        return planets if planets else list(bodies)
 
     def _cycle_follow(self):
         candidates = self._follow_candidates()
@@ -132,28 +266,316 @@ class SandboxScene:
         self.follow_target = candidates[(i + 1) % len(candidates)]
         self.inspector.set_selected(self.follow_target)
 
+    def _clear_prediction(self):
+        self.scheduler.cancel("predict")
+        self.predicted_cache = []
+        self.last_predict_pos = None
+        self.last_predict_vel = None
+
+    def _predict_job(self, pos, vel, stars, steps):
+        # Den gamla banan ritas tills den nya är klar, så att linjen inte växer fram
+        pts = []
+        for pts in iter_predict_orbit(pos, vel, stars, steps=steps, G=G, chunk=PREDICT_CHUNK):
+            yield
+        self.predicted_cache = pts
+
+    def _resolve(self, body):
+        # Kroppen som vyn i den visade bilden, None om den inte finns kvar där
+        if body is None:
+            return None
+        key = getattr(body, "body", body)
+        if self.frame is None:
+            return key
+        view = self.frame.view_of(key)
+        if view is None:
+            # Efter en återspolning med nya kroppsobjekt följer urvalet samma index.
+            # Tills tråden publicerat de nya kropparna behålls den gamla vyn
+            replaced = self._replaced.get(id(key))
+            if replaced is not None and replaced[0] is key:
+                view = self.frame.view_of(replaced[1]) or body
+        return view
+
+    def _resolve_targets(self):
+        self.follow_target = self._resolve(self.follow_target)
+        self.hover_target = self._resolve(self.hover_target)
+        selected = self._resolve(self.inspector.selected)
+        if selected is None:
+            self.inspector.clear()
+        elif selected is not self.inspector.selected:
+            self.inspector.set_selected(selected)
+
+    def _check_membership(self):
+        if self.frame is not None:
+            # Vyerna byts med varje bild, det som saknas i den som visas släpps direkt
+            self._resolve_targets()
+            return
+
+        alive = set(map(id, self.sim.bodies))
+        if self.follow_target is not None and id(self.follow_target) not in alive:
+            self.follow_target = None
+        if self.inspector.selected is not None and id(self.inspector.selected) not in alive:
+            self.inspector.clear()
+
     def _center_on_target(self, target):
         if target is None:
             return
         self.camera_offset = desired_camera_offset_for_target(target.pos, (self.w, self.h), self.zoom)
 
     def _pick_body_at_screen(self, screen_pos):
-        p = pygame.Vector2(screen_pos)
-        best = None
-        best_d = 1e9
+        # Listan byts ut varje tick, så tick och lista räcker för att se om indexet är inaktuellt.
+        # Med simuleringstråd plockas vyer ur bilden som visas
+        world = self._world()
+        bodies = world.bodies
+        self.body_index.update(bodies, (world.tick, id(bodies), len(bodies)))
+        world = screen_to_world(pygame.Vector2(screen_pos), self.camera_offset, self.zoom)
+        return self.body_index.pick(world, self.zoom)
+
+    def _cycle_launch_goal(self):
+        goals = (None,) + LAUNCH_GOALS
+        self.launch_goal = goals[(goals.index(self.launch_goal) + 1) % len(goals)]
+        self._clear_launch()
+
+    def _clear_launch(self):
+        self.scheduler.cancel("launch")
+        self.launch_solution = None
+        self._solved_for = None
+
+    def _launch_stale(self):
+        return self._solved_for is None or (self.drag_current_world - self._solved_for).length() >= RESOLVE_DISTANCE
+
+    def _launch_args(self, start, current):
+        stars = self._world().stars()
+        kwargs = {}
+        if self.launch_goal == "apsides":
+            star = _dominant_star(start, stars)
+            if star is not None:
+                kwargs["apoapsis"] = (current - star.pos).length()
+        elif self.launch_goal == "intercept":
+            kwargs["target"] = self.follow_target
+        return dict(start_pos=start, stars=stars, kind=self.launch_goal, G=G, softening=SOFTENING, hint=current - start, **kwargs)
+
+    def _launch_job(self, start, current):
+        # Sökningen lämnar tillbaka kontrollen mellan bitarna, lösningen byts in när den är klar
+        solution = yield from iter_solve_launch(**self._launch_args(start, current))
+        self.launch_solution = solution
+        self._solved_for = current
+
+    def _request_launch_solution(self):
+        # Under dragningen löses målet i schemaläggaren, en bit av sökningen per skiva.
+        # Draw läser bara den senaste lösningen
+        if self.launch_goal is None or not self.dragging or not self._launch_stale():
+            return
+        if self.scheduler.pending("launch"):
+            return
+        self.scheduler.submit("launch", self._launch_job(self.drag_start_world.copy(), self.drag_current_world.copy()), HIGH)
+
+    def _launch_velocity(self, solve_now=False):
+        direction = self.drag_current_world - self.drag_start_world
+        if self.launch_goal is None:
+            return direction * VELOCITY_SCALE
+
+        # Vid släppet ska kroppen få en lösning för just den punkten, hela sökningen direkt
+        if solve_now and self._launch_stale():
+            self.scheduler.cancel("launch")
+            current = self.drag_current_world.copy()
+            self.launch_solution = solve_launch(**self._launch_args(self.drag_start_world.copy(), current))
+            self._solved_for = current
+
+        if self.launch_solution is None:
+            return direction * VELOCITY_SCALE
+        return self.launch_solution.velocity
+
+    def _apply(self, command):
+        # Under uppspelning styr inspelningen, användarens kommandon ignoreras
+        if self.player is not None:
+            return
+        self.sim.apply(command)
+        if self.recorder is not None:
+            self.recorder.command(self.sim.tick, command)
+
+    def command(self, command):
+        self._run(lambda: self._apply(command))
+
+    def load_scenario(self, path):
+        def load():
+            try:
+                self._apply(("scenario", path))
+            except (OSError, ValueError) as e:
+                self._show_notice(f"Scenario failed: {e}")
+                return
+            self._clear_selection()
+            self._show_notice(f"Loaded {os.path.basename(path)}")
+        self._run(load)
+
+    def _tweak_body(self, body, what, dx, dy):
+        body = getattr(body, "body", body)
+
+        def tweak():
+            if body in self.sim.bodies:
+                self._apply(("tweak", self.sim.bodies.index(body), what, dx, dy))
+        self._run(tweak)
+
+    def _view_meta(self):
+        return {
+            "camera": [self.camera_offset.x, self.camera_offset.y],
+            "zoom": self.zoom,
+            "current_preset": self.current_preset,
+        }
+
+    def _clear_selection(self):
+        self.follow_target = None
+        self.hover_target = None
+        self.inspector.clear()
+
+    def start_recording(self):
+        self.stop_playback()
+        try:
+            kernel = getattr(self.compute_gravity, "kernel", "python")
+            self.recorder = ReplayWriter(data_path(REPLAY_FILE), self.sim, gravity=kernel)
+        except OSError as e:
+            self._show_notice(f"Recording failed: {e}")
+            return
+        self._show_notice("Recording")
 
-        for b in self.bodies:
-            sp = world_to_screen(b.pos, self.camera_offset, self.zoom)
-            r = max(8, int((getattr(b, "radius", 10) + 6) * self.zoom))
-            d = (sp - p).length()
-            if d <= r and d < best_d:
-                best = b
-                best_d = d
+    def stop_recording(self):
+        if self.recorder is None:
+            return
+        recorder = self.recorder
+        self.recorder = None
+        recorder.close()
+        self._show_notice(f"Recorded {(recorder.end_tick - recorder.start_tick) * TICK_DT:.1f}s")
+
+    def toggle_recording(self):
+        if self.recorder is None:
+            self.start_recording()
+        else:
+            self.stop_recording()
 
-        return best
+    def toggle_playback(self):
+        if self.player is None:
+            self.start_playback()
+        else:
+            self.stop_playback()
+            self._show_notice("Playback stopped")
+
+    def start_playback(self):
+        self.stop_rewind()
+        self.stop_recording()
+        path = data_path(REPLAY_FILE)
+        if not os.path.exists(path):
+            self._show_notice("No recording found")
+            return
+        try:
+            replay = Replay(path)
+            gravity = self.compute_gravity
+            if getattr(gravity, "kernel", "python") != replay.gravity:
+                gravity = gravity_for(replay.gravity)
+            self.player = ReplayPlayer(replay, self.sim, gravity)
+        except (OSError, ValueError, KeyError) as e:
+            self._show_notice(f"Replay failed: {e}")
+            return
+        self._accumulator = 0.0
+        self.rewind.clear()
+        self._on_ui(self._clear_selection)
+        self._show_notice("Playing back")
+
+    def stop_playback(self):
+        if self.player is None:
+            return
+        self.player.replay.close()
+        self.player = None
+
+    def start_rewind(self):
+        if self.player is not None or not len(self.rewind):
+            return
+        if self.recorder is not None:
+            self.stop_recording()
+        self.rewinding = True
+        self._rewind_cursor = len(self.rewind) - 1
+
+    def stop_rewind(self):
+        if not self.rewinding:
+            return
+        self.rewinding = False
+        self.rewind.truncate(self._rewind_cursor + 1)
+        self._accumulator = 0.0
+
+    def _remap_selection(self, old_bodies):
+        # Efter en återställning är kropparna nya objekt, följ dem via index
+        if self.worker is not None:
+            # Körs i simuleringstråden, gränssnittet byter själv när bilden med dem visas
+            self._replaced = {id(old): (old, new) for old, new in zip(old_bodies, self.sim.bodies)}
+            return
+
+        def remap(body):
+            if body is None or body not in old_bodies:
+                return None
+            i = old_bodies.index(body)
+            return self.sim.bodies[i] if i < len(self.sim.bodies) else None
+
+        self.follow_target = remap(self.follow_target)
+        self.hover_target = None
+        selected = remap(self.inspector.selected)
+        if selected is None:
+            self.inspector.clear()
+        else:
+            self.inspector.set_selected(selected)
+
+    def _step_rewind(self):
+        self._rewind_cursor = max(0, self._rewind_cursor - REWIND_SPEED)
+        old_bodies = self.sim.bodies
+        self.rewind.restore(self.sim, self._rewind_cursor)
+        if self.sim.bodies is not old_bodies:
+            self._remap_selection(old_bodies)
+
+    def seek(self, ticks):
+        if self.player is None:
+            return
+        self.player.seek(self.sim.tick + ticks)
+        self._on_ui(self._clear_selection)
+
+    def _show_notice(self, text):
+        self.notice = text
+        self.notice_timer = NOTICE_S
+
+    def quick_save(self):
+        self.autosaver.submit(data_path(QUICKSAVE_FILE), snapshot.copy_state(self.sim, self._view_meta()))
+        self._show_notice("Saved")
+
+    def quick_load(self):
+        self.stop_rewind()
+        self.stop_recording()
+        self.stop_playback()
+        self.autosaver.wait()
+        for name in (QUICKSAVE_FILE, AUTOSAVE_FILE):
+            path = data_path(name)
+            if not os.path.exists(path):
+                continue
+            try:
+                snap = snapshot.open_snapshot(path)
+                meta = snapshot.restore(self.sim, snap)
+                snap.close()
+            except (OSError, ValueError, KeyError) as e:
+                self._show_notice(f"Load failed: {e}")
+                return
+
+            self._on_ui(lambda: self._apply_view(meta))
+            self._show_notice(f"Loaded {name}")
+            return
+
+        self._show_notice("No save found")
+
+    def _apply_view(self, meta):
+        if "camera" in meta:
+            self.camera_offset = pygame.Vector2(meta["camera"])
+            self.zoom = meta["zoom"]
+            self.current_preset = meta["current_preset"]
+        self._clear_selection()
 
     def _double_clicked(self, body):
         now = pygame.time.get_ticks()
+        # Med simuleringstråd är det en ny vy varje bild, jämför kropparna bakom
+        body = getattr(body, "body", body)
         ok = body is not None and self._last_click_body is body and (now - self._last_click_ms) <= DOUBLECLICK_MS
         self._last_click_ms = now
         self._last_click_body = body
@@ -169,6 +591,10 @@ class SandboxScene:
         self.paused = self._paused_before_menu
 
     def handle_event(self, event):
+        # Släpps backsteg bakom en meny ska spolningen ändå sluta
+        if event.type == pygame.KEYUP and event.key == pygame.K_BACKSPACE:
+            self._run(self.stop_rewind)
+
         # ESC togglar options overlay (alltid prio)
         if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
             if self.pause_menu.open:
@@ -199,6 +625,17 @@ class SandboxScene:
             if event.key == pygame.K_h:
                 self.hud.toggle()
 
+            if event.key == pygame.K_e:
+                self.diagnostics_panel.toggle()
+
+            if event.key == pygame.K_q:
+                self.quality.cycle()
+                self._show_notice(f"Quality {self.quality.label()}")
+
+            if event.key == pygame.K_v:
+                self.world_layer.cycle()
+                self._show_notice(f"Render scale {self.world_layer.label(self.quality.settings['render_scale'])}")
+
             if event.key == pygame.K_TAB:
                 self.hud.toggle_controls()
 
@@ -218,29 +655,55 @@ class SandboxScene:
                 self.current_preset = 3
 
             elif event.key in (pygame.K_RIGHTBRACKET, pygame.K_PERIOD):
-                self.time_scale = min(15.0, self.time_scale * 1.3)
+                self.command(("time_scale", min(15.0, self._world().time_scale * 1.3)))
             elif event.key in (pygame.K_LEFTBRACKET, pygame.K_COMMA):
-                self.time_scale = max(0.1, self.time_scale / 1.3)
+                self.command(("time_scale", max(0.1, self._world().time_scale / 1.3)))
+
+            elif event.key == pygame.K_F5:
+                self._run(self.quick_save)
+            elif event.key == pygame.K_F9:
+                self._run(self.quick_load)
+
+            elif event.key == pygame.K_F6:
+                self._run(self.toggle_recording)
+            elif event.key == pygame.K_F7:
+                self._run(self.toggle_playback)
+            elif event.key == pygame.K_BACKSPACE:
+                self._run(self.start_rewind)
+            elif event.key == pygame.K_LEFT:
+                self._run(lambda: self.seek(-SEEK_TICKS))
+            elif event.key == pygame.K_RIGHT:
+                self._run(lambda: self.seek(SEEK_TICKS))
+
+            elif event.key == pygame.K_b:
+                center = screen_to_world(pygame.Vector2(pygame.mouse.get_pos()), self.camera_offset, self.zoom)
+                self.command(("belt", center.x, center.y))
 
             elif event.key == pygame.K_r:
-                self.bodies = [create_central_star(self.w, self.h)]
-                self.time_scale = 1.0
+                self.command(("clear",))
                 self.follow_target = None
                 self.inspector.clear()
 
             elif event.key == pygame.K_d:
-                self.bodies = create_sandbox_demo(self.w, self.h)
+                self.command(("demo",))
                 self.follow_target = None
                 self.inspector.clear()
 
             elif event.key == pygame.K_f:
                 self._cycle_follow()
 
+            elif event.key == pygame.K_o:
+                self._cycle_launch_goal()
+
+            elif event.key == pygame.K_k:
+                self.command(("rails", not self._rails_enabled()))
+
             elif event.key == pygame.K_c:
                 target = self.follow_target
                 if target is None:
-                    stars = [b for b in self.bodies if getattr(b, "is_star", False)]
-                    target = stars[0] if stars else (self.bodies[0] if self.bodies else None)
+                    world = self._world()
+                    stars = world.stars()
+                    target = stars[0] if stars else (world.bodies[0] if world.bodies else None)
                 self._center_on_target(target)
 
         if event.type == pygame.MOUSEWHEEL:
@@ -257,7 +720,10 @@ class SandboxScene:
             self.camera_offset += before - after
 
         if event.type == pygame.MOUSEMOTION:
-            self.hover_target = self._pick_body_at_screen(event.pos) if not self.dragging else None
+            if self.dragging:
+                self.hover_target = None
+            else:
+                self._hover_pos = event.pos
 
             if self.dragging:
                 self.drag_current_world = screen_to_world(pygame.Vector2(event.pos), self.camera_offset, self.zoom)
@@ -279,9 +745,7 @@ class SandboxScene:
                 self.dragging = False
                 self.drag_start_world = None
                 self.drag_current_world = None
-                self.predicted_cache = []
-                self.last_predict_pos = None
-                self.last_predict_vel = None
+                self._clear_prediction()
             else:
                 self.inspector.clear()
                 self._double_clicked(None)
@@ -289,9 +753,8 @@ class SandboxScene:
                 self.dragging = True
                 self.drag_start_world = screen_to_world(pygame.Vector2(event.pos), self.camera_offset, self.zoom)
                 self.drag_current_world = self.drag_start_world
-                self.predicted_cache = []
-                self.last_predict_pos = None
-                self.last_predict_vel = None
+                self._clear_launch()
+                self._clear_prediction()
 
         elif event.type == pygame.MOUSEBUTTONUP and event.button == 1 and self.dragging:
             drag_end_world = screen_to_world(pygame.Vector2(event.pos), self.camera_offset, self.zoom)
@@ -299,16 +762,17 @@ class SandboxScene:
 
             if direction.length() >= MIN_DRAG_DISTANCE:
                 preset = PLANET_PRESETS[self.current_preset]
-                vel = direction * VELOCITY_SCALE
-                self.bodies.append(Body(self.drag_start_world, vel, preset["mass"], preset["radius"], preset["color"]))
+                self.drag_current_world = drag_end_world
+                vel = self._launch_velocity(solve_now=True)
+                start = self.drag_start_world
+                self.command(("spawn", start.x, start.y, vel.x, vel.y, preset["mass"], preset["radius"], preset["color"]))
 
             self.dragging = False
             self.drag_start_world = None
             self.drag_current_world = None
-            self.predicted_cache = []
-            self.last_predict_pos = None
-            self.last_predict_vel = None
+            self._clear_prediction()
             self.last_orbit_kind = "UNKNOWN"
+            self._clear_launch()
 
         if event.type == pygame.MOUSEBUTTONDOWN and event.button == 3:
             self.panning = True
@@ -321,43 +785,96 @@ class SandboxScene:
 
         return None
 
-    def update(self, dt, compute_gravity):
-        stars = [b for b in self.bodies if getattr(b, "is_star", False)]
-        self.inspector.set_context_stars(stars)
-
-        if self.paused:
-            if self.follow_target is not None:
-                ui_dt = max(0.0, min(1 / 30, dt))
-                self.camera_offset = smooth_follow(
-                    self.camera_offset,
-                    self.follow_target.pos,
-                    (self.w, self.h),
-                    self.zoom,
-                    ui_dt,
-                    strength=12.0,
-                )
-            return None
+    def start_telemetry(self, fmt="jsonl"):
+        if self.telemetry is None:
+            base = data_path("telemetry", time.strftime("run_%Y%m%d-%H%M%S"))
+            self.telemetry = TelemetryWriter(base, fmt)
 
-        dt *= self.time_scale
+    def stop_telemetry(self):
+        if self.telemetry is not None:
+            self.telemetry.close()
+            self.telemetry = None
 
-        forces = compute_gravity(self.bodies)
-        for body, force in zip(self.bodies, forces):
-            body.apply_force(force, dt)
+    def note_input(self, kinds, ms):
+        self._input = (kinds, ms)
 
-        for body in self.bodies:
-            body.update(dt)
+    def _step(self, step):
+        if self.telemetry is None:
+            step()
+            return
+        t0 = time.perf_counter()
+        step()
+        step_ms = (time.perf_counter() - t0) * 1000.0
+        kinds, input_ms = self._input
+        self._input = (0, float("nan"))
+        self.telemetry.record(tick_record(self.sim, self._frame_ms, step_ms, self.telemetry.t0, kinds, input_ms))
+
+    def _tick(self):
+        if self.player is not None:
+            if self.player.done:
+                self.paused = True
+                self._show_notice("Replay finished")
+                return
+            self._step(self.player.step)
+            return
 
-        self.bodies = resolve_collisions(self.bodies)
-        self.bodies = remove_far_bodies(self.bodies, despawn_distance=DESPAWN_DISTANCE)
+        self._step(lambda: self.sim.step(self.compute_gravity))
+        self.rewind.push(self.sim)
+        if self.recorder is not None:
+            self.recorder.after_tick(self.sim)
 
-        if self.follow_target is not None and self.follow_target not in self.bodies:
-            self.follow_target = None
+    def _autosave(self):
+        self.autosaver.submit(data_path(AUTOSAVE_FILE), snapshot.copy_state(self.sim, self._view_meta()))
 
-        if self.inspector.selected is not None and self.inspector.selected not in self.bodies:
-            self.inspector.clear()
+    def update(self, dt, compute_gravity):
+        self.compute_gravity = compute_gravity
+        self._frame_ms = dt * 1000.0
+        if self.worker is not None:
+            # Samma bild för plockning, ringar, inspektör och ritning hela framen
+            self.frame = self.worker.frame
+            while not self._ui_calls.empty():
+                self._ui_calls.get_nowait()()
+            self._check_membership()
+        self.inspector.set_context_stars(self._world().stars())
+        self.notice_timer = max(0.0, self.notice_timer - dt)
+
+        if self._hover_pos is not None:
+            self.hover_target = self._pick_body_at_screen(self._hover_pos) if not self.dragging else None
+            self._hover_pos = None
+        self._request_launch_solution()
+
+        if self.worker is not None and self.worker.last_error is not None:
+            raise self.worker.last_error
+
+        warning = self.sim.diagnostics.pop_warning()
+        if warning is not None:
+            self._show_notice(warning)
+
+        if self.rewinding:
+            self._run(self._step_rewind)
+
+        elif not self.paused:
+            # Autosave skrivs av en bakgrundstråd, här tas bara en kopia av tillståndet
+            self._autosave_timer += dt
+            if self._autosave_timer >= AUTOSAVE_INTERVAL_S:
+                self._autosave_timer = 0.0
+                self._run(self._autosave)
+
+            if self.worker is not None:
+                self.worker.advance(dt)
+            else:
+                # Fasta tick oberoende av bildfrekvensen, det som inte hinns med släpps
+                self._accumulator = min(self._accumulator + dt, MAX_TICKS_PER_FRAME * TICK_DT)
+                while self._accumulator >= TICK_DT and not self.paused:
+                    self._accumulator -= TICK_DT
+                    self._tick()
+
+            # Borttagna kroppar släpps en frame senare, kontrollen går igenom hela listan
+            if self.worker is None and (self.follow_target is not None or self.inspector.selected is not None):
+                self.scheduler.submit_once("membership", self._check_membership, LOW)
 
         if self.follow_target is not None:
-            ui_dt = max(0.0, min(1 / 30, dt / max(0.0001, self.time_scale)))
+            ui_dt = max(0.0, min(1 / 30, dt))
             self.camera_offset = smooth_follow(
                 self.camera_offset,
                 self.follow_target.pos,
@@ -369,12 +886,36 @@ class SandboxScene:
 
         return None
 
-    def draw(self, screen):
-        screen.fill((5, 5, 15))
-        self.starfield.draw(screen, self.camera_offset, self.zoom)
+    def animating(self):
+        # Falskt när bilden bara kan ändras av input, då får huvudloopen gå på tomgång
+        return not self.paused or self.rewinding or self.dragging or len(self.scheduler) > 0
+
+    def _draw_labels(self, screen, world):
+        for body in world.bodies:
+            if getattr(body, "is_star", False) or not body.name:
+                continue
+
+            sp = world_to_screen(body.pos, self.camera_offset, self.zoom)
+            r = max(6, int(body.radius * self.zoom))
+            surfaces = self.labels.get(str(body.name), self.scheduler)
+            if surfaces is None:
+                continue
+            label, shadow = surfaces
 
-        for body in self.bodies:
-            body.draw(screen, self.camera_offset, self.zoom, draw_trail=self.show_trails)
+            x = int(sp.x - label.get_width() // 2)
+            y = int(sp.y - r - 14)
+            screen.blit(shadow, (x + 1, y + 1))
+            screen.blit(label, (x, y))
+
+    def draw(self, screen):
+        world = self._world()
+        quality = self.quality.settings
+        scale = self.world_layer.current(quality["render_scale"])
+        target = self.world_layer.target(screen, scale)
+        draw_world(target, world, self.starfield, self.camera_offset, self.zoom, self.show_trails, quality, scale)
+        self.world_layer.present(screen, target)
+        if self.show_labels and quality["labels"]:
+            self._draw_labels(screen, world)
 
         if self.hover_target is not None and self.hover_target is not self.follow_target:
             sp = world_to_screen(self.hover_target.pos, self.camera_offset, self.zoom)
@@ -399,8 +940,7 @@ class SandboxScene:
         orbit_color = (120, 140, 255)
 
         if self.dragging and self.drag_start_world and self.drag_current_world:
-            direction = self.drag_current_world - self.drag_start_world
-            initial_velocity = direction * VELOCITY_SCALE
+            initial_velocity = self._launch_velocity()
 
             need_recalc = (
                 self.last_predict_pos is None
@@ -409,12 +949,12 @@ class SandboxScene:
                 or (initial_velocity - self.last_predict_vel).length() >= 0.8
             )
 
-            stars = [b for b in self.bodies if getattr(b, "is_star", False)]
+            stars = world.stars()
 
             if need_recalc:
                 orbit_kind = classify_orbit(self.drag_start_world, initial_velocity, stars, G=G)
                 self.last_orbit_kind = orbit_kind
-                self.predicted_cache = predict_orbit(self.drag_start_world, initial_velocity, stars, G=G)
+                self.scheduler.submit("predict", self._predict_job(self.drag_start_world.copy(), initial_velocity.copy(), stars, quality["predict_steps"]), HIGH)
                 self.last_predict_pos = self.drag_start_world.copy()
                 self.last_predict_vel = initial_velocity.copy()
             else:
@@ -427,24 +967,37 @@ class SandboxScene:
 
             draw_faded_orbit(
                 screen,
-                self.orbit_overlay,
+                self._orbit_overlay(),
                 self.predicted_cache,
                 self.camera_offset,
                 self.zoom,
                 orbit_color,
             )
 
+        sim_status = self._status()
         follow_text = "Off" if self.follow_target is None else (self.follow_target.name or "Object")
+        rails_text = "Off" if not self._rails_enabled() else f"{sum(1 for b in world.bodies if getattr(b, 'orbit', None) is not None)}/{len(world.bodies)}"
         orbit_text = {"BOUND": "Bound", "ESCAPE": "Escape", "UNKNOWN": "-"}[orbit_kind] if self.dragging else "-"
 
         status = [
-            f"Zoom {self.zoom:.2f}   Time x{self.time_scale:.1f}   Preset {self.current_preset}   Follow {follow_text}",
-            f"Orbit {orbit_text}" + ("   PAUSED" if self.paused else ""),
+            f"Zoom {self.zoom:.2f}   Time x{world.time_scale:.1f}   Preset {self.current_preset}   Follow {follow_text}   Rails {rails_text}   Particles {len(world.particles)}   Quality {self.quality.label()}   Render {self.world_layer.label(self.quality.settings['render_scale'])}",
+            f"Orbit {orbit_text}   Assist {LAUNCH_GOAL_NAMES[self.launch_goal]}" + ("   PAUSED" if self.paused else ""),
         ]
+        if sim_status["rewinding"]:
+            status.append(f"REWIND {sim_status['rewind_cursor'] * TICK_DT:.1f}s / {sim_status['rewind_frames'] * TICK_DT:.1f}s")
+        if sim_status["recording_since"] is not None:
+            status.append(f"REC {(world.tick - sim_status['recording_since']) * TICK_DT:.1f}s")
+        elif sim_status["playback"] is not None:
+            start_tick, end_tick = sim_status["playback"]
+            status.append(f"PLAY {(world.tick - start_tick) * TICK_DT:.1f}s / {(end_tick - start_tick) * TICK_DT:.1f}s   Left/Right seek   F7 take over")
+        if self.diagnostics_panel.visible:
+            status.append(self.scheduler.label())
+        if self.notice and self.notice_timer > 0:
+            status.append(self.notice)
 
         controls = (
             "LMB drag create / click inspect+follow   Doubleclick: center   RMB pan   Scroll zoom   "
-            "SPACE pause   F cycle   C center   T trails   L labels   R reset   D demo   TAB help   ESC options"
+            "SPACE pause   E energy   Q quality   V render scale   F cycle   O launch assist   K rails   B belt at cursor   F5 save   F9 load   BACKSPACE rewind   F6 record   F7 replay   C center   T trails   L labels   R reset   D demo   TAB help   ESC options"
         )
 
         right_margin = self.inspector.panel_w + 30 if self.inspector.selected is not None else 0
@@ -458,6 +1011,7 @@ class SandboxScene:
         screen.set_clip(None)
 
         self.inspector.draw(screen)
+        self.diagnostics_panel.draw(screen, sim_status["diagnostics"], (16, self.h - 340))
 
         # IMPORTANT: ensure no clipping affects the overlay
         screen.set_clip(None)
@@ -0,0 +1,145 @@
+import heapq
+import inspect
+import itertools
+import time
+from collections import deque
+
+# Lägre tal körs först, inom samma prioritet i den ordning jobben lades till
+HIGH = 0
+NORMAL = 1
+LOW = 2
+
+# Jobben får det som blir över av framen, men alltid lite så att inget svälter
+# och aldrig så mycket att en enstaka frame blir lång
+MIN_SLICE_MS = 1.0
+MAX_SLICE_MS = 6.0
+# Så många avslutade jobb räknas in i medelväntan
+HISTORY = 120
+
+
+class _Task:
+    __slots__ = ("key", "priority", "job", "on_done", "submitted", "slices", "cancelled")
+
+    def __init__(self, key, priority, job, on_done, submitted):
+        self.key = key
+        self.priority = priority
+        self.job = job
+        self.on_done = on_done
+        self.submitted = submitted
+        self.slices = 0
+        self.cancelled = False
+
+
+class FrameScheduler:
+    def __init__(self, min_slice_ms=MIN_SLICE_MS, max_slice_ms=MAX_SLICE_MS):
+        self.min_slice_ms = min_slice_ms
+        self.max_slice_ms = max_slice_ms
+
+        self._heap = []
+        self._by_key = {}
+        self._seq = itertools.count()
+        self._waits = deque(maxlen=HISTORY)
+
+        self.completed = 0
+        self.replaced = 0
+        self.last_ms = 0.0
+        self.last_slices = 0
+        self.max_deferred_ms = 0.0
+
+    def __len__(self):
+        return len(self._by_key)
+
+    def submit(self, key, job, priority=NORMAL, on_done=None):
+        # job är en funktion eller en generator som lämnar tillbaka kontrollen med yield.
+        # Samma nyckel ersätter ett väntande jobb, bara det senaste svaret är intressant
+        old = self._by_key.get(key)
+        if old is not None:
+            old.cancelled = True
+            self.replaced += 1
+        task = _Task(key, priority, job, on_done, time.perf_counter())
+        self._by_key[key] = task
+        heapq.heappush(self._heap, (priority, next(self._seq), task))
+        return task
+
+    def submit_once(self, key, job, priority=NORMAL, on_done=None):
+        # Som submit, men ett jobb som redan väntar får gå klart i stället för att börja om
+        if key in self._by_key:
+            return self._by_key[key]
+        return self.submit(key, job, priority, on_done)
+
+    def pending(self, key):
+        return key in self._by_key
+
+    def cancel(self, key):
+        task = self._by_key.pop(key, None)
+        if task is not None:
+            task.cancelled = True
+
+    def clear(self):
+        for task in self._by_key.values():
+            task.cancelled = True
+        self._by_key.clear()
+        self._heap.clear()
+
+    def _finish(self, task, result):
+        del self._by_key[task.key]
+        wait = (time.perf_counter() - task.submitted) * 1000.0
+        self._waits.append(wait)
+        self.max_deferred_ms = max(self.max_deferred_ms, wait)
+        self.completed += 1
+        if task.on_done is not None:
+            task.on_done(result)
+
+    def _slice(self, task):
+        # Sant när jobbet är klart
+        task.slices += 1
+        job = task.job
+        if not inspect.isgenerator(job):
+            result = job()
+            if not inspect.isgenerator(result):
+                self._finish(task, result)
+                return True
+            task.job = job = result
+        try:
+            next(job)
+        except StopIteration as e:
+            self._finish(task, e.value)
+            return True
+        return False
+
+    def run(self, budget_ms):
+        # Körs efter update och draw, med den tid som är kvar av framen
+        budget = max(self.min_slice_ms, min(self.max_slice_ms, budget_ms))
+        start = time.perf_counter()
+        deadline = start + budget / 1000.0
+        slices = 0
+
+        while self._heap and time.perf_counter() < deadline:
+            entry = heapq.heappop(self._heap)
+            task = entry[2]
+            if task.cancelled:
+                continue
+            slices += 1
+            if not self._slice(task):
+                # Samma plats i kön, ett påbörjat jobb går före nyare med samma prioritet
+                heapq.heappush(self._heap, entry)
+
+        self.last_ms = (time.perf_counter() - start) * 1000.0
+        self.last_slices = slices
+        return slices
+
+    def metrics(self):
+        waits = self._waits
+        return {
+            "depth": len(self._by_key),
+            "completed": self.completed,
+            "replaced": self.replaced,
+            "last_ms": self.last_ms,
+            "last_slices": self.last_slices,
+            "deferred_ms": sum(waits) / len(waits) if waits else 0.0,
+            "max_deferred_ms": self.max_deferred_ms,
+        }
+
+    def label(self):
+        m = self.metrics()
+        return f"Jobs {m['depth']}   {m['last_ms']:.1f} ms/frame   deferred {m['deferred_ms']:.1f} ms (max {m['max_deferred_ms']:.0f})"
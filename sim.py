@@ -1,7 +1,60 @@
+import numpy as np
+import pygame
+
 from bodies import Body
+from orbit_assist import _dominant_star
+from particles import ParticleField, scatter_ring, scatter_debris
+from physics import G, SOFTENING
+from rails import RailsManager
+import scenario
+
+# Fast tidssteg, samma kommandon i samma tick ger exakt samma förlopp
+TICK_DT = 1 / 60
+DESPAWN_DISTANCE = 4000
+
+BELT_PARTICLES = 20000
+BELT_WIDTH = 0.12
+BELT_COLOR = (170, 160, 150)
+DEBRIS_PER_MERGE = 400
+DEBRIS_SPEED = 0.35
+
+PLANET_PRESETS = {
+    1: {"mass": 30, "radius": 6, "color": (160, 190, 255)},
+    2: {"mass": 80, "radius": 10, "color": (180, 255, 200)},
+    3: {"mass": 150, "radius": 14, "color": (255, 180, 140)},
+}
+
+
+def create_central_star(w, h):
+    return Body(
+        (w / 2, h / 2),
+        (0, 0),
+        mass=5000,
+        radius=18,
+        color=(250, 220, 120),
+        is_star=True,
+        name="Sun",
+    )
 
 
-def resolve_collisions(bodies):
+def create_sandbox_demo(w, h, presets=PLANET_PRESETS):
+    star = create_central_star(w, h)
+    center = star.pos
+
+    result = [star]
+    distances = [130, 200, 270]
+    speeds = [62, 50, 43]
+    preset_ids = [1, 2, 3]
+
+    for d, v, preset in zip(distances, speeds, preset_ids):
+        pos = pygame.Vector2(center.x + d, center.y)
+        vel = pygame.Vector2(0, -v)
+        p = presets[preset]
+        result.append(Body(pos, vel, p["mass"], p["radius"], p["color"]))
+    return result
+
+
+def resolve_collisions(bodies, events=None):
     new_bodies = []
     merged = set()
 
@@ -28,9 +81,13 @@ def resolve_collisions(bodies):
             # stjärna absorberar planet
             if a.is_star and not b.is_star:
                 merged.add(j)
+                if events is not None:
+                    events.append(("absorb", a, b))
                 continue
             if b.is_star and not a.is_star:
                 merged.add(i)
+                if events is not None:
+                    events.append(("absorb", b, a))
                 a = b
                 continue
 
@@ -45,7 +102,10 @@ def resolve_collisions(bodies):
             color = a.color if a.mass >= b.mass else b.color
             name = a.name if (a.mass >= b.mass) else b.name
 
-            a = Body(new_pos, new_vel, total_mass, new_radius, color, name=name)
+            merged_body = Body(new_pos, new_vel, total_mass, new_radius, color, name=name)
+            if events is not None:
+                events.append(("merge", merged_body, a, b))
+            a = merged_body
             merged.add(j)
 
         new_bodies.append(a)
@@ -53,17 +113,18 @@ def resolve_collisions(bodies):
     return new_bodies
 
 
+def despawn_center(bodies):
+    for b in bodies:
+        if b.is_star:
+            return b.pos
+    return bodies[0].pos if bodies else None
+
+
 def remove_far_bodies(bodies, despawn_distance=4000):
     if not bodies:
         return bodies
 
-    center = None
-    for b in bodies:
-        if b.is_star:
-            center = b.pos
-            break
-    if center is None:
-        center = bodies[0].pos
+    center = despawn_center(bodies)
 
     kept = []
     for b in bodies:
@@ -73,3 +134,161 @@ def remove_far_bodies(bodies, despawn_distance=4000):
         if (b.pos - center).length() < despawn_distance:
             kept.append(b)
     return kept
+
+
+class Simulation:
+    def __init__(self, size, seed=0, softening=SOFTENING, presets=PLANET_PRESETS):
+        self.w, self.h = size
+        self.softening = softening
+        self.presets = presets
+        self.rails = RailsManager(G, softening)
+        self.particles = ParticleField()
+        # Valfri ConservationMonitor, får potentialen från kraftberäkningen var K:e tick
+        self.diagnostics = None
+        self.stats = {}
+        self.reset(seed)
+
+    def reset(self, seed=0):
+        self.bodies = [create_central_star(self.w, self.h)]
+        self.particles.clear()
+        self.rails.enabled = True
+        self.rails._slice = 0
+        self.rng = np.random.default_rng(seed)
+        self.tick = 0
+        self.sim_time = 0.0
+        self.time_scale = 1.0
+
+    def stars(self):
+        return [b for b in self.bodies if getattr(b, "is_star", False)]
+
+    def apply(self, command):
+        # Allt som ändrar simuleringen går genom hit så att det kan spelas in
+        kind = command[0]
+
+        if kind == "spawn":
+            _, x, y, vx, vy, mass, radius, color = command
+            self.bodies.append(Body((x, y), (vx, vy), mass, radius, tuple(color)))
+
+        elif kind == "tweak":
+            _, index, what, dx, dy = command
+            body = self.bodies[index]
+            if what == "vel":
+                body.vel += (dx, dy)
+            elif what == "thrust":
+                body.user_acc += (dx, dy)
+            elif what == "reset_thrust":
+                body.user_acc.update(0, 0)
+
+        elif kind == "clear":
+            self.bodies = [create_central_star(self.w, self.h)]
+            self.particles.clear()
+            self.time_scale = 1.0
+
+        elif kind == "demo":
+            self.bodies = create_sandbox_demo(self.w, self.h, self.presets)
+            self.particles.clear()
+
+        elif kind == "scenario":
+            # Filen läses om vid uppspelning, keyframes efteråt gör sökningen oberoende av den
+            scenario.load(command[1], self)
+
+        elif kind == "belt":
+            self._scatter_belt(pygame.Vector2(command[1], command[2]))
+
+        elif kind == "time_scale":
+            self.time_scale = command[1]
+
+        elif kind == "rails":
+            self.rails.enabled = bool(command[1])
+            if not self.rails.enabled:
+                self.rails.demote_all(self.bodies)
+
+        else:
+            raise ValueError(f"unknown command {kind!r}")
+
+    def _scatter_belt(self, center):
+        star = _dominant_star(center, self.stars())
+        if star is None:
+            return
+
+        r = (center - star.pos).length()
+        if r <= star.radius:
+            return
+
+        pos, vel, cols = scatter_ring(
+            star.pos,
+            r * (1.0 - BELT_WIDTH),
+            r * (1.0 + BELT_WIDTH),
+            BELT_PARTICLES,
+            G * star.mass,
+            self.softening,
+            self.rng,
+            BELT_COLOR,
+        )
+        self.particles.add(pos, vel + (star.vel.x, star.vel.y), cols)
+
+    def _spawn_debris(self, events):
+        for event in events:
+            if event[0] != "merge":
+                continue
+            merged, a, b = event[1], event[2], event[3]
+            speed = (a.vel - b.vel).length() * DEBRIS_SPEED
+            pos, vel, cols = scatter_debris(merged.pos, merged.vel, DEBRIS_PER_MERGE, speed, self.rng, merged.color)
+            self.particles.add(pos, vel, cols)
+
+    def step(self, compute_gravity):
+        dt = TICK_DT * self.time_scale
+        self.tick += 1
+        self.sim_time += dt
+        stars = self.stars()
+
+        # Ostörda kroppar går på Kepler-räls och slipper N-body-integrationen
+        self.rails.release_tweaked(self.bodies)
+        active, railed = self.rails.split(self.bodies)
+
+        monitor = self.diagnostics
+        if monitor is not None and monitor.due(self.tick):
+            stats = {}
+            forces = compute_gravity(active, stats=stats)
+            if railed:
+                self.rails.add_rail_forces(active, forces, railed, stats)
+            # Läget före kicken, så att rörelse- och lägesenergin hör till samma tillstånd
+            monitor.record(self, stats["potential"])
+        else:
+            forces = compute_gravity(active)
+            if railed:
+                self.rails.add_rail_forces(active, forces, railed)
+        self.rails.observe(active, forces, stars)
+
+        for body, force in zip(active, forces):
+            body.apply_force(force, dt)
+
+        for body in active:
+            body.update(dt)
+
+        self.rails.advance(railed, self.sim_time, dt)
+        self.rails.promote(active, self.sim_time)
+        self.rails.check(self.bodies, stars)
+
+        # Testpartiklar känner gravitationen men påverkar ingen
+        self.particles.step(dt, self.bodies, G, self.softening)
+
+        events = []
+        self.bodies = resolve_collisions(self.bodies, events)
+        self._spawn_debris(events)
+        count = len(self.bodies)
+        self.bodies = remove_far_bodies(self.bodies, despawn_distance=DESPAWN_DISTANCE)
+
+        # Räknare för det senaste ticket, telemetrin läser dem efteråt
+        n = len(active)
+        self.stats = {
+            "active": n,
+            "railed": len(railed),
+            "force_pairs": n * (n - 1) // 2 + n * len(railed),
+            "collisions": len(events),
+            "despawned": count - len(self.bodies),
+        }
+
+        self.particles.absorb([b for b in self.bodies if b.is_star])
+        self.particles.remove_far(despawn_center(self.bodies), DESPAWN_DISTANCE)
+        return events
@@ -0,0 +1,144 @@
+import queue
+import threading
+
+import numpy as np
+
+from bodies import Body
+from particles import ParticleField
+from sim import TICK_DT
+
+# Så mycket tid som får ligga och vänta innan resten släpps, som MAX_TICKS_PER_FRAME
+MAX_LAG_S = 4 * TICK_DT
+
+
+class BodyView:
+    # Samma ritkod som Body, men på en kopia som tråden inte längre rör
+    draw = Body.draw
+    draw_vectors = Body.draw_vectors
+    _draw_arrow = Body._draw_arrow
+
+    def __init__(self, body):
+        self.body = body
+        self.pos = body.pos.copy()
+        self.vel = body.vel.copy()
+        self.last_acc = body.last_acc.copy()
+        self.user_acc = body.user_acc.copy()
+        self.orbit = getattr(body, "orbit", None)
+        self.trail = tuple(body.trail)
+        self.mass = body.mass
+        self.radius = body.radius
+        self.color = body.color
+        self.is_star = body.is_star
+        self.name = body.name
+
+
+class SimFrame:
+    def __init__(self, sim, status=None):
+        self.tick = sim.tick
+        self.sim_time = sim.sim_time
+        self.time_scale = sim.time_scale
+        self.rails_enabled = sim.rails.enabled
+        self.bodies = tuple(BodyView(b) for b in sim.bodies)
+        self._views = None
+
+        # Färgerna byts bara ut, aldrig i plats, så de kan delas utan kopia
+        self.particles = ParticleField()
+        self.particles.pos = sim.particles.pos.copy()
+        self.particles.color = sim.particles.color
+        self.particles.vel = np.zeros((0, 2))
+
+        # Det gränssnittet visar utöver världen, taget i samma tråd som tillståndet
+        self.status = status() if status is not None else None
+
+    def stars(self):
+        return [b for b in self.bodies if b.is_star]
+
+    def view_of(self, body):
+        # Vyn för en kropp i simuleringen, None om kroppen inte fanns när bilden togs
+        if self._views is None:
+            self._views = {id(v.body): v for v in self.bodies}
+        return self._views.get(id(body))
+
+
+class SimWorker:
+    def __init__(self, sim, tick, status=None):
+        self.sim = sim
+        self._tick = tick
+        self._status = status
+        self._queue = queue.SimpleQueue()
+        self._accumulator = 0.0
+        self._thread = None
+        self._running = False
+
+        self.frame = SimFrame(sim, status)
+        self.ticks = 0
+        self.dropped_s = 0.0
+        self.last_error = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="simulation", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._running = False
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def advance(self, dt):
+        self._queue.put(float(dt))
+
+    def call(self, fn):
+        # Körs i simuleringstråden mellan två tick, i samma ordning som de lades
+        self._queue.put(fn)
+
+    def sync(self):
+        done = threading.Event()
+        self.call(lambda: done.set())
+        done.wait()
+
+    def _handle(self, item):
+        if isinstance(item, float):
+            total = self._accumulator + item
+            self._accumulator = min(total, MAX_LAG_S)
+            self.dropped_s += total - self._accumulator
+            return False
+        item()
+        return True
+
+    def _drain(self):
+        item = self._queue.get()
+        changed = False
+        while item is not None:
+            changed |= self._handle(item)
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return changed
+        self._running = False
+        return changed
+
+    def _run(self):
+        while self._running:
+            try:
+                changed = self._drain()
+                while self._accumulator >= TICK_DT:
+                    self._accumulator -= TICK_DT
+                    self._tick()
+                    self.ticks += 1
+                    changed = True
+            except Exception as e:
+                # Huvudtråden kastar felet vidare, som om det hänt där
+                self.last_error = e
+                self._running = False
+                return
+
+            if changed:
+                # Bakre bufferten byggs färdigt innan den byts in som den främre
+                back = SimFrame(self.sim, self._status)
+                self.frame = back
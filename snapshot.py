@@ -0,0 +1,413 @@
+import json
+import os
+import queue
+import struct
+import threading
+
+import numpy as np
+import pygame
+
+from bodies import Body
+from kepler import KeplerOrbit
+
+MAGIC = b"SCSNAP\0\0"
+VERSION = 2
+ALIGN = 64
+_HEADER = struct.Struct("<8sII")
+
+BODY_COLUMNS = (
+    "body_pos",
+    "body_vel",
+    "body_mass",
+    "body_radius",
+    "body_color",
+    "body_is_star",
+    "body_user_acc",
+    "body_trail_timer",
+    "body_rails",
+    "body_rails_vel",
+    "body_parent",
+    "body_rails_star",
+    "body_calm_ticks",
+    "trail_offsets",
+    "trail_points",
+)
+PARTICLE_COLUMNS = ("particle_pos", "particle_vel", "particle_color")
+
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _index_of(index, body):
+    return index.get(id(body), -1) if body is not None else -1
+
+
+# Kroppsfälten som tas i ett enda svep, i den här ordningen
+_NUMBERS = ("pos_x", "pos_y", "vel_x", "vel_y", "mass", "radius", "user_acc_x", "user_acc_y", "trail_timer", "calm_ticks")
+
+
+def copy_state(sim, view=None, trails=True):
+    # Det som måste tas i simuleringstråden: ett svep över kropparna till en array och
+    # grunda kopior av svansarna, punkterna i dem byts aldrig i plats. build_state gör resten
+    bodies = list(sim.bodies)
+    numbers = np.array(
+        [
+            c
+            for b in bodies
+            for c in (b.pos.x, b.pos.y, b.vel.x, b.vel.y, b.mass, b.radius, b.user_acc.x, b.user_acc.y, b.trail_timer, getattr(b, "calm_ticks", 0))
+        ],
+        dtype=np.float64,
+    ).reshape(-1, len(_NUMBERS))
+    # Banor, räls-hastigheter och färger byts ut men ändras aldrig, referenser räcker
+    refs = [
+        (b.color, b.is_star, getattr(b, "orbit", None), getattr(b, "rails_vel", None), getattr(b, "parent", None), getattr(b, "rails_star", None))
+        for b in bodies
+    ]
+
+    meta = {
+        "names": [b.name for b in bodies],
+        "tick": sim.tick,
+        "time_scale": sim.time_scale,
+        "sim_time": sim.sim_time,
+        "rails_enabled": sim.rails.enabled,
+        "rails_slice": sim.rails._slice,
+        "rng": sim.rng.bit_generator.state,
+    }
+    if view:
+        meta.update(view)
+
+    return {
+        "meta": meta,
+        "bodies": bodies,
+        "numbers": numbers,
+        "refs": refs,
+        "trails": [tuple(b.trail) for b in bodies] if trails else None,
+        "particles": (sim.particles.pos.copy(), sim.particles.vel.copy(), sim.particles.color.copy()),
+    }
+
+
+def build_state(copy):
+    bodies = copy["bodies"]
+    numbers = copy["numbers"]
+    n = len(bodies)
+    index = {id(b): i for i, b in enumerate(bodies)}
+
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    trails = copy["trails"]
+    if trails is not None:
+        np.cumsum([len(t) for t in trails], out=offsets[1:])
+        points = np.array([(p.x, p.y) for t in trails for p in t], dtype=np.float64).reshape(-1, 2)
+    else:
+        points = np.zeros((0, 2), dtype=np.float64)
+
+    rails = np.full((n, 6), np.nan)
+    rails_vel = np.full((n, 2), np.nan)
+    for i, (_, _, orbit, vel, _, _) in enumerate(copy["refs"]):
+        if orbit is not None:
+            rails[i] = orbit.init
+            if vel is not None:
+                rails_vel[i] = (vel.x, vel.y)
+
+    refs = copy["refs"]
+    particle_pos, particle_vel, particle_color = copy["particles"]
+    columns = {
+        "body_pos": numbers[:, 0:2].copy(),
+        "body_vel": numbers[:, 2:4].copy(),
+        "body_mass": numbers[:, 4].copy(),
+        "body_radius": numbers[:, 5].copy(),
+        "body_color": np.array([r[0][:3] for r in refs], dtype=np.uint8).reshape(-1, 3),
+        "body_is_star": np.array([bool(r[1]) for r in refs], dtype=np.uint8),
+        "body_user_acc": numbers[:, 6:8].copy(),
+        "body_trail_timer": numbers[:, 8].copy(),
+        "body_rails": rails,
+        "body_rails_vel": rails_vel,
+        "body_parent": np.array([_index_of(index, r[4]) for r in refs], dtype=np.int64),
+        "body_rails_star": np.array([_index_of(index, r[5]) for r in refs], dtype=np.int64),
+        "body_calm_ticks": numbers[:, 9].astype(np.int64),
+        "trail_offsets": offsets,
+        "trail_points": points,
+        "particle_pos": particle_pos,
+        "particle_vel": particle_vel,
+        "particle_color": particle_color,
+    }
+    return {"meta": copy["meta"], "columns": columns}
+
+
+def capture(sim, view=None, trails=True):
+    return build_state(copy_state(sim, view, trails))
+
+
+def encode(state):
+    layout = {}
+    offset = 0
+    for name, arr in state["columns"].items():
+        arr = np.ascontiguousarray(arr)
+        layout[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        offset = _align(offset + arr.nbytes)
+
+    meta = json.dumps({"meta": state["meta"], "columns": layout}).encode("utf-8")
+    data_start = _align(_HEADER.size + len(meta))
+
+    buf = bytearray(data_start + offset)
+    _HEADER.pack_into(buf, 0, MAGIC, VERSION, len(meta))
+    buf[_HEADER.size:_HEADER.size + len(meta)] = meta
+    for name, arr in state["columns"].items():
+        start = data_start + layout[name]["offset"]
+        raw = np.ascontiguousarray(arr).tobytes()
+        buf[start:start + len(raw)] = raw
+    return bytes(buf)
+
+
+def save(path, state):
+    data = encode(state)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _read_header(f):
+    head = f.read(_HEADER.size)
+    if len(head) < _HEADER.size:
+        raise ValueError("truncated snapshot")
+    magic, version, meta_len = _HEADER.unpack(head)
+    if magic != MAGIC:
+        raise ValueError("not a snapshot file")
+    if version > VERSION:
+        raise ValueError(f"snapshot version {version} is newer than supported ({VERSION})")
+    info = json.loads(f.read(meta_len).decode("utf-8"))
+    return info, _align(_HEADER.size + meta_len)
+
+
+class Snapshot:
+    def __init__(self, path=None, buffer=None):
+        self.path = path
+        self._buffer = buffer
+        self._columns = {}
+
+        if buffer is not None:
+            magic, version, meta_len = _HEADER.unpack_from(buffer, 0)
+            if magic != MAGIC or version > VERSION:
+                raise ValueError("not a snapshot buffer")
+            info = json.loads(bytes(buffer[_HEADER.size:_HEADER.size + meta_len]).decode("utf-8"))
+            self._data_start = _align(_HEADER.size + meta_len)
+        else:
+            with open(path, "rb") as f:
+                info, self._data_start = _read_header(f)
+
+        self.meta = info["meta"]
+        self.layout = info["columns"]
+
+    def __len__(self):
+        return len(self.meta["names"])
+
+    def column(self, name):
+        arr = self._columns.get(name)
+        if arr is not None:
+            return arr
+
+        spec = self.layout[name]
+        dtype = np.dtype(spec["dtype"])
+        shape = tuple(spec["shape"])
+        count = int(np.prod(shape)) if shape else 1
+        offset = self._data_start + spec["offset"]
+
+        if count == 0:
+            arr = np.zeros(shape, dtype=dtype)
+        elif self._buffer is not None:
+            arr = np.frombuffer(self._buffer, dtype=dtype, count=count, offset=offset).reshape(shape)
+        else:
+            # Kolumnerna mappas först när de läses, så även stora filer öppnas direkt
+            arr = np.memmap(self.path, dtype=dtype, mode="r", offset=offset, shape=shape)
+        self._columns[name] = arr
+        return arr
+
+    def body(self, i):
+        pos = self.column("body_pos")[i]
+        vel = self.column("body_vel")[i]
+        color = tuple(int(c) for c in self.column("body_color")[i])
+        radius = float(self.column("body_radius")[i])
+        if radius.is_integer():
+            radius = int(radius)
+
+        b = Body(
+            (float(pos[0]), float(pos[1])),
+            (float(vel[0]), float(vel[1])),
+            float(self.column("body_mass")[i]),
+            radius,
+            color,
+            is_star=bool(self.column("body_is_star")[i]),
+            name=self.meta["names"][i],
+        )
+        ua = self.column("body_user_acc")[i]
+        b.user_acc.update(float(ua[0]), float(ua[1]))
+        b.trail_timer = float(self.column("body_trail_timer")[i])
+
+        offsets = self.column("trail_offsets")
+        pts = self.column("trail_points")[offsets[i]:offsets[i + 1]]
+        b.trail = [pygame.Vector2(float(x), float(y)) for x, y in pts]
+        return b
+
+    def bodies(self):
+        # Kolumnerna omvandlas i klump, body(i) per kropp blir för långsamt vid tusentals
+        pos = self.column("body_pos").tolist()
+        vel = self.column("body_vel").tolist()
+        mass = self.column("body_mass").tolist()
+        radius = self.column("body_radius").tolist()
+        color = self.column("body_color").tolist()
+        is_star = self.column("body_is_star").tolist()
+        user_acc = self.column("body_user_acc").tolist()
+        trail_timer = self.column("body_trail_timer").tolist()
+        offsets = self.column("trail_offsets").tolist()
+        points = self.column("trail_points").tolist()
+        names = self.meta["names"]
+
+        for i in range(len(self)):
+            r = radius[i]
+            b = Body(pos[i], vel[i], mass[i], int(r) if r.is_integer() else r, tuple(color[i]), is_star=bool(is_star[i]), name=names[i])
+            b.user_acc.update(user_acc[i])
+            b.trail_timer = trail_timer[i]
+            if offsets[i + 1] > offsets[i]:
+                b.trail = [pygame.Vector2(p) for p in points[offsets[i]:offsets[i + 1]]]
+            yield b
+
+    def update_bodies(self, bodies):
+        # Skriver över kroppar med samma medlemmar och ordning som när snapshoten togs,
+        # att bygga tusentals nya Body är den dyra delen av en återställning
+        pos = self.column("body_pos").tolist()
+        vel = self.column("body_vel").tolist()
+        mass = self.column("body_mass").tolist()
+        radius = self.column("body_radius").tolist()
+        color = self.column("body_color").tolist()
+        user_acc = self.column("body_user_acc").tolist()
+        trail_timer = self.column("body_trail_timer").tolist()
+        offsets = self.column("trail_offsets").tolist()
+        points = self.column("trail_points").tolist()
+
+        for i, b in enumerate(bodies):
+            r = radius[i]
+            b.pos.update(pos[i])
+            b.vel.update(vel[i])
+            b.mass = mass[i]
+            b.radius = int(r) if r.is_integer() else r
+            b.color = tuple(color[i])
+            b.user_acc.update(user_acc[i])
+            b.trail_timer = trail_timer[i]
+            # Utan sparade svansar behåller kropparna sina, som i bodies()
+            if points:
+                b.trail = [pygame.Vector2(p) for p in points[offsets[i]:offsets[i + 1]]]
+
+    def close(self):
+        self._columns = {}
+        self._buffer = None
+
+
+def open_snapshot(path):
+    return Snapshot(path=path)
+
+
+def decode(data):
+    return Snapshot(buffer=data)
+
+
+def _restore_rails(bodies, snap):
+    # Räls-tillståndet fanns inte i version 1, då börjar alla kroppar fritt
+    if "body_rails" not in snap.layout:
+        return
+
+    rails = snap.column("body_rails")
+    rails_vel = snap.column("body_rails_vel")
+    parents = snap.column("body_parent").tolist()
+    rails_stars = snap.column("body_rails_star").tolist()
+    calm = snap.column("body_calm_ticks").tolist()
+    railed = (~np.isnan(rails[:, 0]) & (snap.column("body_parent") >= 0)).tolist()
+
+    for i, b in enumerate(bodies):
+        b.calm_ticks = calm[i]
+        if rails_stars[i] >= 0:
+            b.rails_star = bodies[rails_stars[i]]
+        if not railed[i]:
+            # Återanvända kroppar kan ha legat på räls när de skrevs över
+            if getattr(b, "orbit", None) is not None:
+                b.orbit = None
+                b.parent = None
+            continue
+
+        mu, x, y, vx, vy, epoch = rails[i].tolist()
+        b.orbit = KeplerOrbit(mu, (x, y), (vx, vy), epoch)
+        b.parent = bodies[parents[i]]
+        b.rails_vel = None if np.isnan(rails_vel[i, 0]) else pygame.Vector2(float(rails_vel[i, 0]), float(rails_vel[i, 1]))
+
+
+def restore(sim, snap, bodies=None):
+    # bodies är befintliga kroppar med samma medlemmar som snapshoten, de skrivs över
+    # i stället för att byggas nya
+    if isinstance(snap, dict):
+        snap = decode(encode(snap))
+
+    if bodies is None:
+        sim.bodies = list(snap.bodies())
+    else:
+        snap.update_bodies(bodies)
+        sim.bodies = bodies
+    _restore_rails(sim.bodies, snap)
+
+    sim.particles.clear()
+    if len(snap.column("particle_pos")):
+        sim.particles.add(
+            np.array(snap.column("particle_pos")),
+            np.array(snap.column("particle_vel")),
+            np.array(snap.column("particle_color")),
+        )
+
+    meta = snap.meta
+    sim.time_scale = meta["time_scale"]
+    sim.sim_time = meta["sim_time"]
+    sim.tick = meta.get("tick", 0)
+    sim.rails.enabled = meta.get("rails_enabled", True)
+    sim.rails._slice = meta.get("rails_slice", 0)
+    if "rng" in meta:
+        sim.rng.bit_generator.state = meta["rng"]
+    return meta
+
+
+class Autosaver:
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=1)
+        self._thread = None
+        self.saved = 0
+        self.dropped = 0
+        self.last_error = None
+
+    def _run(self):
+        while True:
+            # Kopian från simuleringstråden görs om till kolumner här
+            path, copy = self._queue.get()
+            try:
+                save(path, build_state(copy))
+                self.saved += 1
+            except OSError as e:
+                self.last_error = e
+            finally:
+                self._queue.task_done()
+
+    def submit(self, path, copy):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+            self._thread.start()
+
+        # Hinner inte tråden med ersätts den äldre väntande snapshoten
+        try:
+            self._queue.put_nowait((path, copy))
+        except queue.Full:
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            self._queue.put_nowait((path, copy))
+
+    def wait(self):
+        self._queue.join()
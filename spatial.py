@@ -0,0 +1,85 @@
+import numpy as np
+
+# Rutnät i världskoordinater, ungefär en kropp plus plockmarginal per ruta vid zoom 1
+CELL_SIZE = 64.0
+# Cellkoordinaterna flyttas till positiva tal och packas i en int64, x i de höga bitarna
+_OFFSET = 1 << 30
+_SHIFT = 1 << 31
+
+
+class SpatialHash:
+    # Punkterna sorteras efter cell, en kolumn av celler blir ett sammanhängande
+    # nyckelintervall så att en cirkelfråga bara behöver två searchsorted per kolumn
+    def __init__(self, cell=CELL_SIZE):
+        self.cell = float(cell)
+        self.positions = np.zeros((0, 2), dtype=np.float64)
+        self._keys = np.zeros(0, dtype=np.int64)
+        self._order = np.zeros(0, dtype=np.intp)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _cells(self, positions):
+        return np.floor(positions / self.cell).astype(np.int64) + _OFFSET
+
+    def build(self, positions):
+        self.positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        cells = self._cells(self.positions)
+        keys = cells[:, 0] * _SHIFT + cells[:, 1]
+        self._order = np.argsort(keys, kind="stable")
+        self._keys = keys[self._order]
+
+    def query(self, x, y, radius):
+        # Index och avstånd för alla punkter inom radius från (x, y), i ingen särskild ordning
+        if not len(self.positions):
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.float64)
+
+        (cx0, cy0), (cx1, cy1) = self._cells(np.array([[x - radius, y - radius], [x + radius, y + radius]]))
+        lo = np.arange(cx0, cx1 + 1, dtype=np.int64) * _SHIFT
+        starts = np.searchsorted(self._keys, lo + cy0, side="left")
+        ends = np.searchsorted(self._keys, lo + cy1, side="right")
+        if not (ends > starts).any():
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.float64)
+
+        idx = self._order[np.concatenate([np.arange(s, e) for s, e in zip(starts, ends) if e > s])]
+        d = self.positions[idx] - (x, y)
+        dist = np.hypot(d[:, 0], d[:, 1])
+        near = dist <= radius
+        return idx[near], dist[near]
+
+
+class BodyIndex:
+    # Byggs om först när någon frågar och kropparna har ändrats sedan förra bygget,
+    # en pausad scen bygger alltså en gång oavsett hur mycket musen rör sig
+    def __init__(self, cell=CELL_SIZE):
+        self.hash = SpatialHash(cell)
+        self.bodies = []
+        self.radii = np.zeros(0, dtype=np.float64)
+        self.max_radius = 0.0
+        self.rebuilds = 0
+        self._version = None
+
+    def update(self, bodies, version):
+        if version == self._version:
+            return
+        self._version = version
+        self.bodies = list(bodies)
+        n = len(self.bodies)
+        self.hash.build(np.fromiter((c for b in self.bodies for c in (b.pos.x, b.pos.y)), dtype=np.float64, count=2 * n))
+        self.radii = np.fromiter((getattr(b, "radius", 10) for b in self.bodies), dtype=np.float64, count=n)
+        self.max_radius = float(self.radii.max()) if n else 0.0
+        self.rebuilds += 1
+
+    def pick(self, world_pos, zoom, margin=6, min_px=8):
+        # Samma träffyta som förut, max(min_px, (radie + margin) * zoom) pixlar runt kroppen
+        reach = max(min_px / zoom, self.max_radius + margin)
+        idx, dist = self.hash.query(world_pos[0], world_pos[1], reach)
+        if not len(idx):
+            return None
+
+        limit = np.maximum(min_px, ((self.radii[idx] + margin) * zoom).astype(np.int64)) / zoom
+        hit = dist <= limit
+        if not hit.any():
+            return None
+        idx = idx[hit]
+        return self.bodies[int(idx[np.argmin(dist[hit])])]
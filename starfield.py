@@ -30,16 +30,31 @@ class Starfield:
 
             self.stars.append((x, y, size, alpha, parallax))
 
-        self._overlay = pygame.Surface((width, height), pygame.SRCALPHA)
+        self._overlay = None
 
-    def draw(self, screen, camera_offset, zoom):
-        self._overlay.fill((0, 0, 0, 0))
+    def _overlay_for(self, size):
+        # Nedskalad rendering får ett eget överlägg i sin storlek
+        if self._overlay is None or self._overlay.get_size() != size:
+            self._overlay = pygame.Surface(size, pygame.SRCALPHA)
+        return self._overlay
+
+    def prewarm(self, size):
+        self._overlay_for(size)
+
+    def draw(self, screen, camera_offset, zoom, density=1.0, scale=1.0):
+        # Stjärnorna ligger i slumpad ordning, så en början av listan är ett jämnt urval
+        count = int(len(self.stars) * density)
+        if count <= 0:
+            return
+
+        overlay = self._overlay_for(screen.get_size())
+        overlay.fill((0, 0, 0, 0))
 
         w, h = self.width, self.height
         cx, cy = camera_offset.x, camera_offset.y
         ox, oy = w * 0.5, h * 0.5
 
-        for x, y, size, alpha, parallax in self.stars:
+        for x, y, size, alpha, parallax in self.stars[:count]:
             
             sx = ((x - cx * parallax) - ox) * zoom + ox
             sy = ((y - cy * parallax) - oy) * zoom + oy
@@ -48,10 +63,10 @@ class Starfield:
                 continue
 
             pygame.draw.circle(
-                self._overlay,
+                overlay,
                 (255, 255, 255, alpha),
-                (int(sx), int(sy)),
-                size,
+                (int(sx * scale), int(sy * scale)),
+                max(1, int(size * scale + 0.5)),
             )
 
-        screen.blit(self._overlay, (0, 0))
+        screen.blit(overlay, (0, 0))
@@ -0,0 +1,24 @@
+import time
+
+
+class StartupTimer:
+    def __init__(self, t0=None):
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self._last = self.t0
+        self.phases = []
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    def total(self):
+        return self._last - self.t0
+
+    def report(self):
+        width = max((len(name) for name, _ in self.phases), default=0)
+        lines = ["Startup times:"]
+        for name, secs in self.phases:
+            lines.append(f"  {name:<{width}}  {secs * 1000:8.1f} ms")
+        lines.append(f"  {'total':<{width}}  {self.total() * 1000:8.1f} ms")
+        return "\n".join(lines)
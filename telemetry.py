@@ -0,0 +1,176 @@
+import glob
+import json
+import os
+import queue
+import struct
+import threading
+import time
+
+import numpy as np
+
+MAGIC = b"SCTELEM\0"
+VERSION = 1
+# Raderna samlas i minnet och lämnas till skrivtråden i klump
+BATCH_RECORDS = 256
+# Ny fil när den aktuella blivit så här stor
+ROTATE_MB = 64
+
+FIELDS = (
+    ("tick", "<u8"),
+    ("sim_time", "<f8"),
+    ("wall", "<f8"),
+    ("frame_ms", "<f4"),
+    ("step_ms", "<f4"),
+    ("bodies", "<u4"),
+    ("active", "<u4"),
+    ("railed", "<u4"),
+    ("particles", "<u4"),
+    ("collisions", "<u4"),
+    ("despawned", "<u4"),
+    ("force_pairs", "<u8"),
+    ("energy_drift", "<f8"),
+    # Input som visades i framen före det här ticket, bitar enligt latency.KINDS
+    ("input_kinds", "<u1"),
+    ("input_ms", "<f4"),
+)
+DTYPE = np.dtype(list(FIELDS))
+NAMES = tuple(name for name, _ in FIELDS)
+EXTENSIONS = {"jsonl": ".jsonl", "bin": ".sctl"}
+
+_HEADER = struct.Struct("<8sII")
+
+
+def tick_record(sim, frame_ms, step_ms, t0=0.0, input_kinds=0, input_ms=float("nan")):
+    # Samma ordning som FIELDS, en tupel är billigare än en dict per tick
+    stats = sim.stats
+    monitor = sim.diagnostics
+    return (
+        sim.tick,
+        sim.sim_time,
+        time.perf_counter() - t0,
+        frame_ms,
+        step_ms,
+        len(sim.bodies),
+        stats.get("active", 0),
+        stats.get("railed", 0),
+        len(sim.particles),
+        stats.get("collisions", 0),
+        stats.get("despawned", 0),
+        stats.get("force_pairs", 0),
+        monitor.drift["energy"] if monitor is not None else float("nan"),
+        input_kinds,
+        input_ms,
+    )
+
+
+class TelemetryWriter:
+    def __init__(self, base, fmt="jsonl", rotate_mb=ROTATE_MB, batch=BATCH_RECORDS):
+        if fmt not in EXTENSIONS:
+            raise ValueError(f"unknown telemetry format {fmt!r}")
+        self.base = base
+        self.fmt = fmt
+        self.rotate_bytes = int(rotate_mb * 1024 * 1024)
+        self.batch = batch
+        self.t0 = time.perf_counter()
+
+        self.records = 0
+        self.files = []
+        self.last_error = None
+
+        self._pending = []
+        self._queue = queue.Queue()
+        self._file = None
+        self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self._thread.start()
+
+    def record(self, row):
+        self._pending.append(row)
+        self.records += 1
+        if len(self._pending) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self._queue.put(self._pending)
+            self._pending = []
+
+    def close(self):
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+
+    def _open_next(self):
+        if self._file is not None:
+            self._file.close()
+        path = f"{self.base}.{len(self.files):03d}{EXTENSIONS[self.fmt]}"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "wb")
+        self.files.append(path)
+        if self.fmt == "bin":
+            head = json.dumps({"fields": FIELDS}).encode("utf-8")
+            self._file.write(_HEADER.pack(MAGIC, VERSION, len(head)) + head)
+
+    def _encode(self, rows):
+        if self.fmt == "bin":
+            return np.array(rows, dtype=DTYPE).tobytes()
+        lines = [json.dumps(dict(zip(NAMES, row))) for row in rows]
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    def _run(self):
+        while True:
+            rows = self._queue.get()
+            if rows is None:
+                break
+            try:
+                if self._file is None or self._file.tell() >= self.rotate_bytes:
+                    self._open_next()
+                self._file.write(self._encode(rows))
+                self._file.flush()
+            except OSError as e:
+                self.last_error = e
+
+        if self._file is not None:
+            self._file.close()
+
+
+def read(path):
+    if path.endswith(EXTENSIONS["bin"]):
+        with open(path, "rb") as f:
+            head = f.read(_HEADER.size)
+            magic, version, head_len = _HEADER.unpack(head)
+            if magic != MAGIC:
+                raise ValueError(f"{path}: not a telemetry file")
+            if version > VERSION:
+                raise ValueError(f"{path}: telemetry version {version} is newer than supported ({VERSION})")
+            info = json.loads(f.read(head_len).decode("utf-8"))
+            dtype = np.dtype([tuple(field) for field in info["fields"]])
+            data = f.read()
+        # En avbruten skrivning kan lämna en halv post på slutet
+        usable = len(data) - len(data) % dtype.itemsize
+        return np.frombuffer(data[:usable], dtype=dtype)
+
+    rows = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            rows.append(tuple(record.get(name, 0) for name in NAMES))
+    return np.array(rows, dtype=DTYPE)
+
+
+def parts(base):
+    found = []
+    for ext in EXTENSIONS.values():
+        found += glob.glob(glob.escape(base) + ".[0-9][0-9][0-9]" + ext)
+    return sorted(found)
+
+
+def load(base):
+    # Alla roterade delar av en körning i ordning, som en strukturerad array
+    paths = parts(base) if not os.path.isfile(base) else [base]
+    if not paths:
+        raise FileNotFoundError(f"no telemetry files for {base}")
+    arrays = [read(p) for p in paths]
+    return np.concatenate(arrays) if len(arrays) > 1 else arrays[0]